@@ -2,16 +2,67 @@
 
 import sys
 from pathlib import Path
-from jsonargparse import auto_cli
 from dispatcher import Dispatcher as Dispatch
 from logs import ConsoleLog as Console
+from models import RunOptions
+from storage import default_cache_dir
 
 
-def run(flow: str, config_path: Path):
-    """Validates file and run synchronization."""
+def run(
+        flow: str,
+        config_path: Path,
+        workers: int = 4,
+        no_cache: bool = False,
+        full: bool = False,
+        persistent_shell: bool = False,
+        no_prefetch: bool = False,
+        trace: Path | None = None,
+        metrics: Path | None = None,
+        out: Path | None = None,
+        plan: Path | None = None,
+        hosts: str | None = None,
+        fanout: int = 8,
+        transport: str = "ssh",
+        debounce: float = 1.0
+):
+    """Validates file and run synchronization.
 
-    # Checks if the file exists and is a file.
-    if not Path(config_path).is_file():
+    Parameters
+    ----------
+    flow : str
+        StateSync case (plan, apply, agent).
+    config_path : Path
+        Path to config file or directory of config files.
+    workers : int
+        Limit of concurrently running probes.
+    no_cache : bool
+        Disables on-disk caches (installed packages are queried from scratch).
+    full : bool
+        Evaluates all units, including units unchanged since the last sync.
+    persistent_shell : bool
+        Executes commands of a group with one long-lived shell (commands stdin is '/dev/null').
+    no_prefetch : bool
+        Disables downloading packages to install while earlier units are synchronized ('apply' only).
+    trace : Path | None
+        Writes timing spans of every step to the file (Chrome trace-event format).
+    metrics : Path | None
+        Writes run metrics to the file (Prometheus node_exporter textfile).
+    out : Path | None
+        Writes the plan to the file ('plan' only).
+    plan : Path | None
+        Applies the plan file without probing packages while the system is unchanged ('apply' only).
+    hosts : str | None
+        Synchronizes remote hosts instead of this host: comma-separated hosts or a file with a host per line.
+    fanout : int
+        Limit of concurrently synchronized hosts.
+    transport : str
+        Transport to the hosts (ssh).
+    debounce : float
+        Seconds without changes before the agent synchronizes ('agent' only).
+    """
+
+    # Checks if the file (or directory of files) exists.
+    if not Path(config_path).is_file() and not Path(config_path).is_dir():
         Console().log(
             level="error",
             message="It seems like file not exists. Please, set correct file path."
@@ -19,19 +70,135 @@ def run(flow: str, config_path: Path):
         sys.exit(1)
 
     # Checks whether the config file is supported.
-    if Path(config_path).suffix not in {".yml", ".yaml"}:
+    if Path(config_path).is_file() and Path(config_path).suffix not in {".yml", ".yaml"}:
         Console().log(
             level="error",
             message="Sorry, but file with this extension is not supported."
         )
         sys.exit(1)
 
-    Dispatch().now(
+    # Checks whether plan file options match the flow.
+    if (out and flow != "plan") or (plan and flow != "apply"):
+        Console().log(
+            level="error",
+            message="Plan file is written by 'plan' (--out) and applied by 'apply' (--plan)."
+        )
+        sys.exit(1)
+
+    # Plan files and the agent describe one host.
+    if hosts and (out or plan or flow == "agent"):
+        Console().log(
+            level="error",
+            message="Plan file and agent can't be used with hosts."
+        )
+        sys.exit(1)
+
+    Dispatch(
+        options=RunOptions(
+            workers=workers,
+            cache_dir=None if no_cache else default_cache_dir(),
+            full=full,
+            persistent_shell=persistent_shell,
+            prefetch=not no_prefetch,
+            trace=trace,
+            metrics=metrics,
+            out=out,
+            plan=plan,
+            hosts=hosts_from(hosts) if hosts else None,
+            fanout=fanout,
+            transport=transport,
+            debounce=debounce
+        )
+    ).now(
         file=Path(config_path),
         arg=flow
     )
     sys.exit(0)
 
 
+def hosts_from(value: str) -> list[str]:
+    """Returns hosts of the file (a host per line, '#' comments) or of the comma-separated list."""
+    if Path(value).is_file():
+        lines = Path(value).read_text(encoding="utf-8").splitlines()
+        return [line.split("#")[0].strip() for line in lines if line.split("#")[0].strip()]
+    return [host.strip() for host in value.split(",") if host.strip()]
+
+
+def boolean(value: str) -> bool | None:
+    """Returns bool option value or 'None' when the value is not a bool."""
+    return {"true": True, "yes": True, "false": False, "no": False}.get(value.lower())
+
+
+# Options of 'run' with their value converters.
+OPTIONS = {
+    "workers": int,
+    "no_cache": boolean,
+    "full": boolean,
+    "persistent_shell": boolean,
+    "no_prefetch": boolean,
+    "trace": Path,
+    "metrics": Path,
+    "out": Path,
+    "plan": Path,
+    "hosts": str,
+    "fanout": int,
+    "transport": str,
+    "debounce": float
+}
+
+
+def parse_args(argv: list[str]) -> dict | None:
+    """Parses 'flow config_path [--option value ...]' without jsonargparse.
+
+    jsonargparse takes a noticeable part of the startup time,
+    so it is loaded only for other arguments (e.g. '--help') and for errors.
+
+    Parameters
+    ----------
+    argv : list[str]
+        Command line arguments.
+
+    Returns
+    -------
+    dict | None
+        'run' arguments or 'None' when the arguments need the full parser.
+    """
+    positional = []
+    arguments = {}
+    argv = list(argv)
+
+    while argv:
+        argument = argv.pop(0)
+        if not argument.startswith("--"):
+            positional.append(argument)
+            continue
+
+        name, separator, value = argument[2:].partition("=")
+        if name not in OPTIONS:
+            return None
+        if not separator:
+            if not argv:
+                return None
+            value = argv.pop(0)
+
+        try:
+            arguments[name] = OPTIONS[name](value)
+        except ValueError:
+            return None
+        if arguments[name] is None:
+            return None
+
+    if len(positional) != 2:
+        return None
+
+    arguments["flow"], arguments["config_path"] = positional[0], Path(positional[1])
+    return arguments
+
+
 if __name__ == "__main__":
-    auto_cli(run)
+    arguments = parse_args(sys.argv[1:])
+    if arguments is None:
+        from jsonargparse import auto_cli
+        auto_cli(run)
+    else:
+        run(**arguments)
@@ -0,0 +1,182 @@
+"""Provides long-running agent functionality."""
+
+import copy
+import time
+from pathlib import Path
+
+from loader import ConfigLoader
+from logs import ConsoleLog as Console
+from models import Command, ItemCase, RunOptions, Stack
+from services import StateManager as State, SyncManager as Sync
+from storage import default_signals
+from tracing import Tracer
+from watcher import Watcher
+
+
+class Agent:
+    """Keeps the host synchronized with the config while running.
+
+    The stack and the installed packages index are kept in memory.
+    Config files and distributor state files are watched, once a burst
+    of changes settles ('debounce') only the affected units are synchronized:
+    units added or changed in the config and applications of the changed distributors.
+    Units failed to synchronize are retried with the next changes.
+    """
+
+    # Seconds between checks of the stop request while nothing changes.
+    TICK = 0.5
+
+    def __init__(self, options: RunOptions, loader: ConfigLoader):
+        self._options = options
+        self._loader = loader
+        self._state = State(options)
+        self._console = Console()
+        self._config: Path = None
+        self._stack = Stack()
+        self._signals: dict[Path, str] = {}
+        self._pending: list = []
+
+    def run(self, config: Path, stack: Stack, stop=None) -> None:
+        """Synchronizes the stack, then the affected units after every change until stopped.
+
+        Parameters
+        ----------
+        config : Path
+            Config file or directory.
+        stack : Stack
+            Stack of the config.
+        stop : threading.Event
+            Stops the agent when set, runs until interrupted by default.
+        """
+        self._config = Path(config)
+        self._stack = stack
+        paths = self._paths()
+        watcher = Watcher(paths, poll_interval=max(self._options.debounce, self.TICK))
+
+        try:
+            self._console.log(
+                level="info",
+                message=f"Agent started --> Watching {len(paths)} paths"
+                        f"{"" if watcher.inotify else " (polling)"}."
+            )
+            self._reconcile(self._stack.units())
+
+            while stop is None or not stop.is_set():
+                changed = watcher.wait(timeout=self.TICK)
+                if not changed:
+                    continue
+
+                changed |= self._settle(watcher)
+                affected = self._affected(changed)
+                watcher.update(self._paths())
+                if affected or self._pending:
+                    self._reconcile(affected)
+        finally:
+            watcher.close()
+
+    def _settle(self, watcher: Watcher) -> set[Path]:
+        """Collects changes until none happen for 'debounce' seconds (at most ten times longer)."""
+        changed = set()
+        deadline = time.monotonic() + self._options.debounce * 10
+
+        while time.monotonic() < deadline:
+            more = watcher.wait(timeout=min(self._options.debounce, deadline - time.monotonic()))
+            if not more:
+                break
+            changed |= more
+
+        return changed
+
+    def _paths(self) -> list[Path]:
+        """Returns config files and state files of the stack distributors."""
+        distributors = self._stack.distributors()
+        self._signals = {
+            Path(signal).expanduser(): distributor
+            for distributor, signals in default_signals().items() if distributor in distributors
+            for signal in signals
+        }
+
+        config = [self._config, *self._loader.sources]
+        return [*dict.fromkeys(config), *self._signals]
+
+    def _affected(self, changed: set[Path]) -> list:
+        """Returns units affected by the changed paths.
+
+        Config is loaded again when its files changed,
+        inventory of the changed distributors is queried again.
+        """
+        affected = {}
+
+        if any(path not in self._signals for path in changed):
+            try:
+                stack = self._loader.stack(self._config)
+            except RuntimeError as error:
+                self._console.log(
+                    level="error",
+                    message=f"{repr(error)} --> Config not reloaded."
+                )
+            else:
+                known = {unit.digest() for unit in self._stack}
+                self._stack = stack
+                affected.update({
+                    unit.digest(): unit for unit in stack
+                    if unit.digest() not in known
+                })
+                self._console.log(
+                    level="info",
+                    message=f"Config reloaded --> {len(affected)} units changed."
+                )
+
+        for distributor in sorted({self._signals[path] for path in changed if path in self._signals}):
+            self._state.invalidate(distributor)
+            affected.update({unit.digest(): unit for unit in self._stack.applications(distributor)})
+
+        return list(affected.values())
+
+    def _reconcile(self, units: list) -> None:
+        """Synchronizes the units (and units failed before), other units are ignored."""
+        digests = {unit.digest() for unit in [*units, *self._pending]}
+        stack = copy.deepcopy(self._stack)
+        affected = [unit for unit in stack if unit.digest() in digests]
+
+        try:
+            with Tracer.span("reconcile", units=len(digests)):
+                self._state.sync_from(stack=stack, plan_only=False, units=affected)
+
+                for unit in stack:
+                    if unit.digest() not in digests:
+                        for item in unit.items:
+                            unit.set_item_sync_case(item=item, case=ItemCase.IGNORE)
+
+                if self._drifted(stack):
+                    Sync(self._options).state_from(stack)
+                else:
+                    self._console.log(
+                        level="info",
+                        message=f"{len(digests)} units checked --> no drift."
+                    )
+        except RuntimeError as error:
+            self._console.log(
+                level="error",
+                message=f"{repr(error)} --> Retried with the next changes."
+            )
+            self._pending = [unit for unit in self._stack if unit.digest() in digests]
+            return
+
+        self._pending = []
+
+    @staticmethod
+    def _drifted(stack: Stack) -> bool:
+        """Checks if any unit needs to be synchronized."""
+        if any(
+                stack.count(distributor, case)
+                for distributor in stack.distributors()
+                for case in (ItemCase.TO_INSTALL, ItemCase.TO_REMOVE)
+        ):
+            return True
+
+        return any(
+            isinstance(unit, Command) and unit.additionally.get("execute")
+            and not all(case == ItemCase.IGNORE for case in unit.items.values())
+            for unit in stack
+        )
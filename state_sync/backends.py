@@ -0,0 +1,458 @@
+"""Provides native backends (package manager state without processes).
+
+Backend checks if it can be used ('available'), returns installed packages
+('inventory') and tells if packages can be changed through it ('can_change'),
+such backend also has async 'install' and 'remove'.
+"""
+
+import json
+import mmap
+import os
+import stat
+import threading
+from pathlib import Path
+
+from helpers import LazyModule
+from tracing import Tracer
+
+asyncio = LazyModule("asyncio")
+http_client = LazyModule("http.client")
+socket = LazyModule("socket")
+
+
+class DpkgStatus:
+    """Reads apt inventory from the dpkg status database.
+
+    The file is memory-mapped and only 'Package', 'Status', 'Version' and
+    'Architecture' fields of every stanza are parsed. The index is kept
+    while the file is unchanged.
+    """
+
+    def __init__(self, path: Path = None):
+        self._path = Path(path) if path else self.default_path()
+        self._stamp = None
+        self._index: dict[str, dict] = {}
+
+    @staticmethod
+    def default_path() -> Path:
+        """Returns status database path (DPKG_ADMINDIR aware, as dpkg itself)."""
+        return Path(os.environ.get("DPKG_ADMINDIR") or "/var/lib/dpkg") / "status"
+
+    def available(self) -> bool:
+        """Checks if the status database can be read."""
+        return os.access(self._path, os.R_OK)
+
+    @staticmethod
+    def can_change() -> bool:
+        """Packages are changed by apt."""
+        return False
+
+    def index(self) -> dict[str, dict]:
+        """Returns packages known to dpkg.
+
+        Returns
+        -------
+        dict[str, dict]
+            Package name with its 'status' (e.g. 'install ok installed'),
+            'version' and 'architecture'. When several architectures
+            of a package are known, the installed one is kept.
+
+        Raises
+        ----------
+        RuntimeError
+            When the status database can't be read.
+        """
+        try:
+            with open(self._path, "rb") as status:
+                info = os.fstat(status.fileno())
+                stamp = (info.st_ino, info.st_size, info.st_mtime_ns)
+                if stamp != self._stamp:
+                    self._index = self._parse(status) if info.st_size else {}
+                    self._stamp = stamp
+        except OSError as error:
+            raise RuntimeError(f"Can't read dpkg status database '{self._path}' --> {error}") from error
+
+        return self._index
+
+    def inventory(self) -> set[str]:
+        """Returns names of installed packages.
+
+        Returns
+        -------
+        set[str]
+            Packages with 'installed' status (e.g. 'install ok installed', 'hold ok installed').
+
+        Raises
+        ----------
+        RuntimeError
+            When the status database can't be read.
+        """
+        return {name for name, package in self.index().items() if self.installed(package)}
+
+    @staticmethod
+    def installed(package: dict) -> bool:
+        """Checks if the package status is 'installed' (want, error flag and status words)."""
+        words = package.get("status", "").split()
+        return len(words) == 3 and words[2] == "installed"
+
+    def _parse(self, status) -> dict[str, dict]:
+        """Parses stanzas of the opened status database."""
+        index = {}
+
+        with mmap.mmap(status.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            position = 0
+
+            while position < size:
+                end = data.find(b"\n\n", position)
+                if end == -1:
+                    end = size
+                stanza = data[position:end]
+                position = end + 2
+
+                name = self._field(stanza, b"Package")
+                if not name:
+                    continue
+
+                package = {
+                    "status": self._field(stanza, b"Status") or "",
+                    "version": self._field(stanza, b"Version"),
+                    "architecture": self._field(stanza, b"Architecture")
+                }
+                known = index.get(name)
+                if known is None or (self.installed(package) and not self.installed(known)):
+                    index[name] = package
+
+        return index
+
+    @staticmethod
+    def _field(stanza: bytes, name: bytes) -> str | None:
+        """Returns value of the stanza field (continuation lines are not parsed)."""
+        if stanza.startswith(name + b":"):
+            start = len(name) + 1
+        else:
+            start = stanza.find(b"\n" + name + b":")
+            if start == -1:
+                return None
+            start += len(name) + 2
+
+        end = stanza.find(b"\n", start)
+        if end == -1:
+            end = len(stanza)
+        return stanza[start:end].decode("utf-8", errors="replace").strip()
+
+
+class FlatpakInstallations:
+    """Reads flatpak inventory from the installation directories.
+
+    Installed ref is 'app' or 'runtime' directory '{id}/{arch}/{branch}'
+    with the 'active' deploy link. System and user installations are read,
+    the index is kept while flatpak doesn't mark them changed.
+    """
+
+    KINDS = ("app", "runtime")
+
+    def __init__(self, directories: list[Path] = None):
+        self._directories = [Path(directory) for directory in directories or self.default_directories()]
+        self._stamp = None
+        self._index: dict[str, list[str]] = {}
+
+    @staticmethod
+    def default_directories() -> list[Path]:
+        """Returns system and user installations (FLATPAK_SYSTEM_DIR and FLATPAK_USER_DIR aware, as flatpak itself)."""
+        data = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+        return [
+            Path(os.environ.get("FLATPAK_SYSTEM_DIR") or "/var/lib/flatpak"),
+            Path(os.environ.get("FLATPAK_USER_DIR") or Path(data) / "flatpak")
+        ]
+
+    def signals(self) -> list[Path]:
+        """Returns files changed with every installation change ('.changed' is touched by flatpak)."""
+        return [
+            directory / name
+            for directory in self._directories
+            for name in (".changed", *self.KINDS)
+        ]
+
+    def available(self) -> bool:
+        """Checks if any installation directory exists."""
+        return any(directory.is_dir() for directory in self._directories)
+
+    @staticmethod
+    def can_change() -> bool:
+        """Refs are changed by flatpak."""
+        return False
+
+    def index(self) -> dict[str, list[str]]:
+        """Returns installed refs by application ID.
+
+        Returns
+        -------
+        dict[str, list[str]]
+            Application (or runtime) ID with its refs (e.g. 'app/org.gimp.GIMP/x86_64/stable').
+        """
+        stamp = []
+        for signal in self.signals():
+            try:
+                stamp.append(os.stat(signal).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+
+        if stamp != self._stamp:
+            self._index = self._scan()
+            self._stamp = stamp
+        return self._index
+
+    def inventory(self) -> set[str]:
+        """Returns IDs of installed applications and runtimes."""
+        return set(self.index())
+
+    def _scan(self) -> dict[str, list[str]]:
+        """Walks installations, refs without the 'active' deployment are skipped."""
+        index = {}
+
+        for directory in self._directories:
+            for kind in self.KINDS:
+                for ref in self._children(directory / kind, depth=3):
+                    if os.path.exists(ref / "active"):
+                        name, arch, branch = ref.parts[-3:]
+                        index.setdefault(name, []).append(f"{kind}/{name}/{arch}/{branch}")
+
+        return index
+
+    def _children(self, directory: Path, depth: int) -> list[Path]:
+        """Returns subdirectories at the depth (symlinks like 'current' are not followed)."""
+        try:
+            entries = [
+                Path(entry.path) for entry in os.scandir(directory)
+                if entry.is_dir(follow_symlinks=False)
+            ]
+        except OSError:
+            return []
+
+        if depth == 1:
+            return entries
+        return [child for entry in entries for child in self._children(entry, depth - 1)]
+
+
+class SnapdClient:
+    """Client of the snapd REST API with a pool of keep-alive connections.
+
+    Requests can be sent from several threads, every request
+    takes an idle connection or opens a new one. Socket path
+    may be set with 'SNAPD_SOCKET' (e.g. for tests).
+    """
+
+    SOCKET = "/run/snapd.socket"
+
+    def __init__(self, socket_path: str = None, pool_size: int = 4, timeout: float = 30):
+        self.socket_path = socket_path or os.environ.get("SNAPD_SOCKET") or self.SOCKET
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._idle: list['http_client.HTTPConnection'] = []
+        self._lock = threading.Lock()
+
+    def request(self, method: str, path: str, body: dict = None) -> dict:
+        """Sends request and returns the response envelope.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        path : str
+            API path (e.g. '/v2/snaps').
+        body : dict
+            JSON body.
+
+        Returns
+        -------
+        dict
+            Response envelope ('type', 'status-code', 'result', 'change').
+
+        Raises
+        ----------
+        RuntimeError
+            When snapd is not reachable or returned an error.
+        """
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+
+        # Idle connection may be closed by snapd, such request is retried once with a new connection.
+        for attempt in range(2):
+            connection, reused = None, False
+            try:
+                connection, reused = self._acquire(fresh=attempt > 0)
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http_client.HTTPException) as error:
+                if attempt == 0 and reused:
+                    connection.close()
+                    continue
+                raise RuntimeError(f"snapd --> {method} {path} failed: {error!r}") from error
+
+            self._release(connection, reusable=not response.will_close)
+            break
+
+        try:
+            envelope = json.loads(data)
+        except ValueError as error:
+            raise RuntimeError(f"snapd --> {method} {path} returned not a JSON response.") from error
+
+        if envelope.get("type") == "error":
+            result = envelope.get("result") or {}
+            raise RuntimeError(f"snapd --> {result.get("message") or envelope.get("status")}")
+        return envelope
+
+    def _acquire(self, fresh: bool = False) -> tuple['http_client.HTTPConnection', bool]:
+        """Returns idle connection (when not fresh) or a new one, and whether it is reused.
+
+        Raises
+        ----------
+        OSError
+            When the socket can't be connected.
+        """
+        with self._lock:
+            if self._idle and not fresh:
+                return self._idle.pop(), True
+
+        connection = http_client.HTTPConnection("localhost", timeout=self._timeout)
+        # Connection must never reconnect by itself, it would go to TCP 'localhost'.
+        connection.auto_open = 0
+        unix = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        unix.settimeout(self._timeout)
+        try:
+            unix.connect(self.socket_path)
+        except OSError:
+            unix.close()
+            raise
+        connection.sock = unix
+        return connection, False
+
+    def _release(self, connection: 'http_client.HTTPConnection', reusable: bool) -> None:
+        """Returns connection to the pool."""
+        with self._lock:
+            if reusable and len(self._idle) < self._pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        """Closes idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class SnapdBackend:
+    """Reads and changes snaps through the snapd REST API.
+
+    Inventory is available to every user, changes need root
+    (otherwise the snap CLI with sudo is used).
+    """
+
+    def __init__(self, client: SnapdClient = None, poll_interval: float = 0.5):
+        self._client = client or SnapdClient()
+        self._poll_interval = poll_interval
+
+    def available(self) -> bool:
+        """Checks if the snapd socket exists."""
+        try:
+            return stat.S_ISSOCK(os.stat(self._client.socket_path).st_mode)
+        except OSError:
+            return False
+
+    @staticmethod
+    def can_change() -> bool:
+        """Checks if snaps can be changed through the API (root only)."""
+        return os.geteuid() == 0
+
+    def inventory(self) -> set[str]:
+        """Returns names of installed snaps.
+
+        Raises
+        ----------
+        RuntimeError
+            When snapd is not reachable or returned an error.
+        """
+        return {snap.get("name") for snap in self._client.request("GET", "/v2/snaps").get("result") or []}
+
+    async def install(self, packages: list[str], classic: bool = False) -> None:
+        """Installs snaps and waits for the changes.
+
+        Snaps are installed with one change, classic snaps need a change per snap
+        (they are submitted at once and run by snapd concurrently).
+
+        Raises
+        ----------
+        RuntimeError
+            When snapd is not reachable or a change failed.
+        """
+        installed = await asyncio.to_thread(self.inventory)
+        packages = [package for package in packages if package not in installed]
+
+        if classic:
+            await self._change(*(
+                ("POST", f"/v2/snaps/{package}", {"action": "install", "classic": True})
+                for package in packages
+            ))
+        elif packages:
+            await self._change(("POST", "/v2/snaps", {"action": "install", "snaps": packages}))
+
+    async def remove(self, packages: list[str]) -> None:
+        """Removes snaps with their data and waits for the change.
+
+        Raises
+        ----------
+        RuntimeError
+            When snapd is not reachable or the change failed.
+        """
+        installed = await asyncio.to_thread(self.inventory)
+        packages = [package for package in packages if package in installed]
+
+        if packages:
+            await self._change(("POST", "/v2/snaps", {"action": "remove", "snaps": packages, "purge": True}))
+
+    async def _change(self, *requests: tuple[str, str, dict]) -> None:
+        """Submits changes and waits for all of them.
+
+        Raises
+        ----------
+        RuntimeError
+            The first failed change.
+        """
+        changes = await asyncio.gather(*(
+            asyncio.to_thread(self._client.request, method, path, body)
+            for method, path, body in requests
+        ))
+        await asyncio.gather(*(self._wait(change.get("change")) for change in changes))
+
+    async def _wait(self, change: str) -> None:
+        """Polls change until it is ready.
+
+        Raises
+        ----------
+        RuntimeError
+            When the change is not done (error, undone, etc.).
+        """
+        with Tracer.span("snapd change", change=change):
+            while True:
+                result = (await asyncio.to_thread(self._client.request, "GET", f"/v2/changes/{change}")).get("result")
+                if result.get("ready"):
+                    break
+                await asyncio.sleep(self._poll_interval)
+
+        if result.get("status") != "Done":
+            raise RuntimeError(
+                f"{result.get("summary") or change} --> snapd change {change} {result.get("status")}: {result.get("err")}"
+            )
+
+
+def native_backends() -> dict:
+    """Returns native backends by distributor."""
+    return {
+        "apt": DpkgStatus(),
+        "snap": SnapdBackend(),
+        "flatpak": FlatpakInstallations()
+    }
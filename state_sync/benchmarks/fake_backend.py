@@ -0,0 +1,316 @@
+"""Provides local stand-ins of apt, snap and flatpak.
+
+Fake tools are shell scripts placed first in PATH, every call is appended
+to 'calls.log'. All state lives in the backend root, so no root, network
+or real package manager is needed. Installed packages are files there,
+mirrored the way the native readers expect them (dpkg status database,
+flatpak installation), and downloaded packages stay in a cache that
+installations reuse. Like dpkg, fake apt holds a lock while it runs, so
+overlapping apt calls fail. FakeFleet gives every simulated host its own backend.
+"""
+
+import os
+import shlex
+import stat
+import threading
+from pathlib import Path
+
+COMMON = """#!/bin/sh
+DB="$FAKE_PM_ROOT/db"
+# Calls are NUL-separated, arguments may contain newlines.
+printf '%s\\0' "$(basename "$0") $*" >> "$FAKE_PM_ROOT/calls.log"
+
+latency() {
+    [ "${FAKE_PM_LATENCY:-0}" = "0" ] || sleep "$FAKE_PM_LATENCY"
+}
+
+# Installation cost of one package.
+pay() {
+    [ "${FAKE_PM_INSTALL_COST:-0}" = "0" ] || sleep "$FAKE_PM_INSTALL_COST"
+}
+
+# Downloads package into the cache unless it is there already.
+fetch() {
+    [ -e "$FAKE_PM_ROOT/cache/$1/$2" ] && return
+    [ "${FAKE_PM_DOWNLOAD_COST:-0}" = "0" ] || sleep "$FAKE_PM_DOWNLOAD_COST"
+    mkdir -p "$FAKE_PM_ROOT/cache/$1"
+    touch "$FAKE_PM_ROOT/cache/$1/$2"
+}
+
+# Takes the lock (e.g. dpkg frontend lock) until the tool exits.
+lock() {
+    if ! mkdir "$FAKE_PM_ROOT/$1.lock" 2>/dev/null; then
+        echo "E: Could not get lock $FAKE_PM_ROOT/$1.lock. It is held by another process." >&2
+        exit 100
+    fi
+    trap 'rmdir "$FAKE_PM_ROOT/'"$1"'.lock"' EXIT
+    trap 'exit 143' TERM INT
+}
+
+# Checks if the arguments have the flag.
+has() {
+    flag="$1"
+    shift
+    case " $* " in *" $flag "*) return 0;; esac
+    return 1
+}
+
+# Fails the whole transaction if one of the packages is broken.
+check_broken() {
+    for package in "$@"; do
+        case " $FAKE_PM_BROKEN " in
+            *" $package "*) echo "E: Package '$package' is broken." >&2; exit 100;;
+        esac
+    done
+}
+
+# Rewrites dpkg status database from the installed apt packages.
+write_status() {
+    for package in $(ls "$DB/apt"); do
+        printf 'Package: %s\\nStatus: install ok installed\\nVersion: 1.0\\n\\n' "$package"
+    done > "$DPKG_ADMINDIR/status.new"
+    mv "$DPKG_ADMINDIR/status.new" "$DPKG_ADMINDIR/status"
+}
+
+# Deploys flatpak ref (or removes it) the way flatpak lays out installations.
+deploy() {
+    mkdir -p "$FLATPAK_SYSTEM_DIR/app/$1/x86_64/stable/fake"
+    ln -sfn fake "$FLATPAK_SYSTEM_DIR/app/$1/x86_64/stable/active"
+    touch "$FLATPAK_SYSTEM_DIR/.changed"
+}
+undeploy() {
+    rm -rf "$FLATPAK_SYSTEM_DIR/app/$1"
+    touch "$FLATPAK_SYSTEM_DIR/.changed"
+}
+
+# Splits arguments into the subcommand and packages, flags are skipped.
+parse() {
+    command=""
+    packages=""
+    for arg in "$@"; do
+        case "$arg" in
+            -*) ;;
+            *) if [ -z "$command" ]; then command="$arg"; else packages="$packages $arg"; fi;;
+        esac
+    done
+}
+"""
+
+TOOLS = {
+    "sudo": """
+exec "$@"
+""",
+    "apt": """
+latency
+parse "$@"
+case "$command" in
+    install)
+        lock apt
+        check_broken $packages
+        for package in $packages; do fetch apt "$package"; done
+        has --download-only "$@" && exit 0
+        for package in $packages; do pay; touch "$DB/apt/$package"; done
+        write_status;;
+    purge|remove|autoremove)
+        lock apt
+        for package in $packages; do rm -f "$DB/apt/$package"; done
+        write_status;;
+esac
+""",
+    "dpkg-query": """
+latency
+ls "$DB/apt" | sed 's/$/ install ok installed/'
+""",
+    "dpkg": """
+latency
+ls "$DB/apt" | sed 's/^\\(.*\\)$/ii  \\1  1.0  amd64  fake package/'
+""",
+    "snap": """
+latency
+parse "$@"
+case "$command" in
+    list)
+        if [ -n "$packages" ]; then
+            for package in $packages; do [ -e "$DB/snap/$package" ] || exit 1; done
+        fi
+        echo "Name  Version  Rev  Tracking  Publisher  Notes"
+        ls "$DB/snap" | sed 's/$/  1.0  1  latest\\/stable  fake  -/';;
+    install)
+        check_broken $packages
+        for package in $packages; do fetch snap "$package"; pay; touch "$DB/snap/$package"; done;;
+    remove)
+        for package in $packages; do rm -f "$DB/snap/$package"; done;;
+esac
+""",
+    "flatpak": """
+latency
+parse "$@"
+# Drops remote name.
+packages=$(echo $packages | sed 's/^flathub *//')
+case "$command" in
+    list)
+        ls "$DB/flatpak";;
+    install)
+        check_broken $packages
+        for package in $packages; do fetch flatpak "$package"; done
+        has --no-deploy "$@" && exit 0
+        for package in $packages; do pay; touch "$DB/flatpak/$package"; deploy "$package"; done;;
+    uninstall)
+        for package in $packages; do rm -f "$DB/flatpak/$package"; undeploy "$package"; done;;
+esac
+exit 0
+"""
+}
+TOOLS["apt-get"] = TOOLS["apt"]
+
+
+class FakeBackend:
+    """Local package managers stand-in."""
+
+    DISTRIBUTORS = ("apt", "snap", "flatpak")
+
+    def __init__(
+            self,
+            root: Path,
+            latency: float = 0.0,
+            install_cost: float = 0.0,
+            download_cost: float = 0.0,
+            broken: list[str] = None
+    ):
+        self.root = Path(root)
+        self.latency = latency
+        self.install_cost = install_cost
+        self.download_cost = download_cost
+        self.broken = broken or []
+
+        (self.root / "bin").mkdir(parents=True, exist_ok=True)
+        for distributor in self.DISTRIBUTORS:
+            (self.root / "db" / distributor).mkdir(parents=True, exist_ok=True)
+        (self.root / "calls.log").touch()
+        (self.root / "dpkg").mkdir(exist_ok=True)
+        (self.root / "flatpak" / "app").mkdir(parents=True, exist_ok=True)
+        self._write_dpkg_status()
+
+        for name, body in TOOLS.items():
+            tool = self.root / "bin" / name
+            tool.write_text(COMMON + body, encoding="utf-8")
+            tool.chmod(tool.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    def environ(self, base: dict[str, str] = None) -> dict[str, str]:
+        """Returns environment where fake tools shadow the real ones."""
+        environ = dict(os.environ if base is None else base)
+        environ.update({
+            "PATH": f"{self.root / "bin"}{os.pathsep}{environ.get("PATH", "")}",
+            "FAKE_PM_ROOT": str(self.root),
+            "DPKG_ADMINDIR": str(self.root / "dpkg"),
+            "FLATPAK_SYSTEM_DIR": str(self.root / "flatpak"),
+            "FLATPAK_USER_DIR": str(self.root / "flatpak-user"),
+            # Fake snap has no daemon, so the snap CLI is used.
+            "SNAPD_SOCKET": str(self.root / "snapd.socket"),
+            "FAKE_PM_LATENCY": str(self.latency),
+            "FAKE_PM_INSTALL_COST": str(self.install_cost),
+            "FAKE_PM_DOWNLOAD_COST": str(self.download_cost),
+            "FAKE_PM_BROKEN": " ".join(self.broken)
+        })
+        return environ
+
+    def preinstall(self, distributor: str, packages: list[str]) -> None:
+        """Marks packages as installed."""
+        for package in packages:
+            (self.root / "db" / distributor / package).touch()
+        if distributor == "apt":
+            self._write_dpkg_status()
+        if distributor == "flatpak":
+            for package in packages:
+                self._deploy_flatpak(package)
+
+    def _write_dpkg_status(self) -> None:
+        """Rewrites dpkg status database from the installed apt packages."""
+        (self.root / "dpkg" / "status").write_text(
+            "".join(
+                f"Package: {package}\nStatus: install ok installed\nVersion: 1.0\n\n"
+                for package in sorted(self.installed("apt"))
+            ),
+            encoding="utf-8"
+        )
+
+    def _deploy_flatpak(self, package: str) -> None:
+        """Deploys flatpak ref with the 'active' link."""
+        ref = self.root / "flatpak" / "app" / package / "x86_64" / "stable"
+        (ref / "fake").mkdir(parents=True, exist_ok=True)
+        if not (ref / "active").is_symlink():
+            (ref / "active").symlink_to("fake")
+        (self.root / "flatpak" / ".changed").touch()
+
+    def installed(self, distributor: str) -> set[str]:
+        """Returns installed packages."""
+        return {path.name for path in (self.root / "db" / distributor).iterdir()}
+
+    def downloaded(self, distributor: str) -> set[str]:
+        """Returns packages in the download cache."""
+        cache = self.root / "cache" / distributor
+        return {path.name for path in cache.iterdir()} if cache.is_dir() else set()
+
+    def calls(self) -> list[str]:
+        """Returns all calls of fake tools."""
+        return (self.root / "calls.log").read_text(encoding="utf-8").split("\0")[:-1]
+
+
+class FakeHostTransport:
+    """Local-process stand-in of a remote host transport (see transports).
+
+    Commands run locally with the environment of the host backend.
+    """
+
+    def __init__(self, host: str, backend: FakeBackend, on_close=None):
+        self.host = host
+        self._environ = backend.environ(base={"PATH": os.environ.get("PATH", "")})
+        self._on_close = on_close
+
+    def _env(self) -> list[str]:
+        """Returns 'env' arguments with the host backend environment."""
+        return ["env", *(f"{name}={value}" for name, value in self._environ.items())]
+
+    def wrap(self, command: str) -> str:
+        """Returns command that runs the command on the host."""
+        return shlex.join([*self._env(), "/bin/sh", "-c", command])
+
+    def shell(self) -> list[str]:
+        """Returns arguments of a long-lived shell on the host."""
+        return [*self._env(), "/bin/sh"]
+
+    def close(self) -> None:
+        """Closes the transport."""
+        if self._on_close:
+            self._on_close()
+
+
+class FakeFleet:
+    """Hosts simulated by fake backends ('host-0', 'host-1', ...)."""
+
+    def __init__(self, root: Path, hosts: int, **backend_options):
+        self.backends = {
+            f"host-{number}": FakeBackend(Path(root) / f"host-{number}", **backend_options)
+            for number in range(hosts)
+        }
+        self._lock = threading.Lock()
+        self._open = 0
+        # The most transports open at the same time.
+        self.max_open = 0
+
+    @property
+    def hosts(self) -> list[str]:
+        """Returns host names."""
+        return list(self.backends)
+
+    def transport(self, host: str) -> FakeHostTransport:
+        """Opens transport of the host (transport factory of Dispatcher)."""
+        with self._lock:
+            self._open += 1
+            self.max_open = max(self.max_open, self._open)
+        return FakeHostTransport(host, self.backends[host], on_close=self._close)
+
+    def _close(self) -> None:
+        """Counts closed transport."""
+        with self._lock:
+            self._open -= 1
@@ -0,0 +1,173 @@
+"""Benchmarks 'plan' and 'apply' at scale against a simulated package manager backend.
+
+Usage (from the 'state_sync' directory):
+
+    python benchmarks/scale.py --sizes 10 100 1000 10000 --latency 0.01 --out benchmark.json
+
+Every measurement runs 'Dispatcher.now' in a fresh Python process with fake
+apt, snap and flatpak in PATH and reports wall time, process spawn count
+and peak RSS. No root and no network are needed.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.fake_backend import FakeBackend  # noqa: E402
+
+FLOWS = ("plan", "apply")
+UNIT_SIZE = 10
+
+
+def package_name(distributor: str, number: int) -> str:
+    """Returns package name in the distributor naming style."""
+    if distributor == "flatpak":
+        return f"org.bench.App{number}"
+    return f"bench-{distributor}-{number}"
+
+
+def generate(backend: FakeBackend, config_path: Path, packages: int) -> None:
+    """Writes config with packages and commands groups, preinstalls half of the packages.
+
+    Packages are split between apt (60%), snap (20%) and flatpak (20%),
+    every 5th unit is not 'presented', so plan has all cases.
+    """
+    distributors = ["apt", "apt", "apt", "snap", "flatpak"]
+    units = []
+
+    for number in range(0, packages, UNIT_SIZE):
+        index = number // UNIT_SIZE
+        distributor = distributors[index % len(distributors)]
+        names = [package_name(distributor, n) for n in range(number, min(number + UNIT_SIZE, packages))]
+
+        backend.preinstall(distributor, names[::2])
+        units.append({
+            "app": f"Unit {index}",
+            "presented": index % 5 != 4,
+            "distributor": distributor,
+            "packages": names
+        })
+
+    groups = [
+        {
+            "group": f"Group {index}",
+            "commands": ["true", "true", "true"],
+            "execute": True
+        }
+        for index in range(max(1, packages // UNIT_SIZE))
+    ]
+
+    config = {
+        "global": {"pool_to_synchronize": ["applications", "commands"]},
+        "applications": {"bench": units},
+        "commands": {"bench": groups}
+    }
+    # JSON is a subset of YAML.
+    config_path.write_text(json.dumps(config), encoding="utf-8")
+
+
+def measure(flow: str, config_path: str, workers: int) -> dict:
+    """Runs one flow in the current process and returns its measurements."""
+    from dispatcher import Dispatcher
+    from models import RunOptions
+
+    logging.disable(logging.CRITICAL)
+
+    spawns = 0
+    popen_init = subprocess.Popen.__init__
+
+    def counting_init(self, *args, **kwargs):
+        nonlocal spawns
+        spawns += 1
+        popen_init(self, *args, **kwargs)
+
+    subprocess.Popen.__init__ = counting_init
+
+    started = time.perf_counter()
+    Dispatcher(options=RunOptions(workers=workers)).now(file=Path(config_path), arg=flow)
+    wall = time.perf_counter() - started
+
+    return {
+        "wall_s": round(wall, 4),
+        "python_spawns": spawns,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+
+def run(sizes: list[int], latency: float, install_cost: float, download_cost: float, workers: int) -> list[dict]:
+    """Measures every flow for every size in separate processes."""
+    results = []
+
+    for size in sizes:
+        for flow in FLOWS:
+            with tempfile.TemporaryDirectory() as directory:
+                backend = FakeBackend(
+                    Path(directory), latency=latency, install_cost=install_cost, download_cost=download_cost
+                )
+                config_path = Path(directory) / "config.yml"
+                generate(backend, config_path, size)
+
+                process = subprocess.run(
+                    args=[sys.executable, __file__, "--measure", flow, str(config_path), "--workers", str(workers)],
+                    env=backend.environ(),
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
+                result = {
+                    "packages": size,
+                    "flow": flow,
+                    **json.loads(process.stdout.splitlines()[-1]),
+                    "tool_calls": len(backend.calls())
+                }
+
+            results.append(result)
+            print(
+                f"{flow:>5} {size:>6} packages: {result["wall_s"]:>8.3f} s, "
+                f"{result["python_spawns"]:>6} spawns, {result["tool_calls"]:>6} tool calls, "
+                f"{result["peak_rss_kb"] / 1024:>6.1f} MiB",
+                file=sys.stderr
+            )
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per fake tool call.")
+    parser.add_argument("--install-cost", type=float, default=0.0, help="Seconds per installed package.")
+    parser.add_argument("--download-cost", type=float, default=0.0, help="Seconds per downloaded package.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--out", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--measure", nargs=2, metavar=("FLOW", "CONFIG"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, workers=args.workers)))
+        return
+
+    report = {
+        "benchmark": "scale",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "latency": args.latency,
+        "install_cost": args.install_cost,
+        "download_cost": args.download_cost,
+        "workers": args.workers,
+        "results": run(args.sizes, args.latency, args.install_cost, args.download_cost, args.workers)
+    }
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
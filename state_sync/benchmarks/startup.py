@@ -0,0 +1,140 @@
+"""Benchmarks CLI startup of 'plan' on a host without drift.
+
+Usage (from the 'state_sync' directory):
+
+    python benchmarks/startup.py --runs 20 --out startup.json
+
+Runs 'python state_sync plan' in fresh processes against fake apt, snap
+and flatpak with every package already installed and warm caches,
+reports wall time next to a bare interpreter start and the slowest
+imports from 'python -X importtime'.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.fake_backend import FakeBackend  # noqa: E402
+from benchmarks.scale import package_name  # noqa: E402
+
+PACKAGE = Path(__file__).resolve().parents[1]
+
+
+def generate(backend: FakeBackend, config_path: Path, packages: int) -> None:
+    """Writes config where every package is presented and installed."""
+    units = []
+
+    for index, distributor in enumerate(["apt", "snap", "flatpak"]):
+        names = [package_name(distributor, number) for number in range(packages)]
+        backend.preinstall(distributor, names)
+        units.append({
+            "app": f"Unit {index}",
+            "presented": True,
+            "distributor": distributor,
+            "packages": names
+        })
+
+    config = {
+        "global": {"pool_to_synchronize": ["applications"]},
+        "applications": {"bench": units}
+    }
+    config_path.write_text(json.dumps(config), encoding="utf-8")
+
+
+def timings(args: list[str], environ: dict[str, str], runs: int) -> dict:
+    """Runs the command several times and returns its wall time statistics (ms)."""
+    walls = []
+
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(args=args, env=environ, capture_output=True, check=True)
+        walls.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "min_ms": round(min(walls), 1),
+        "median_ms": round(statistics.median(walls), 1)
+    }
+
+
+def imports(args: list[str], environ: dict[str, str], top: int) -> dict:
+    """Returns total and the slowest imports (self time, ms) of the command."""
+    process = subprocess.run(
+        args=[args[0], "-X", "importtime", *args[1:]],
+        env=environ,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    modules = []
+
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.append((name.strip(), int(own) / 1000))
+
+    modules.sort(key=lambda module: module[1], reverse=True)
+    return {
+        "total_ms": round(sum(own for _, own in modules), 1),
+        "slowest": [{"module": name, "self_ms": round(own, 2)} for name, own in modules[:top]]
+    }
+
+
+def run(runs: int, packages: int, top: int) -> dict:
+    """Measures interpreter start and 'plan' without drift."""
+    with tempfile.TemporaryDirectory() as directory:
+        backend = FakeBackend(Path(directory) / "backend")
+        config_path = Path(directory) / "config.yml"
+        generate(backend, config_path, packages)
+
+        environ = backend.environ()
+        environ["XDG_CACHE_HOME"] = str(Path(directory) / "cache")
+        plan = [sys.executable, str(PACKAGE), "plan", str(config_path)]
+
+        # Fills inventory cache and journal.
+        subprocess.run(args=plan, env=environ, capture_output=True, check=True)
+
+        return {
+            "interpreter": timings([sys.executable, "-c", "pass"], environ, runs),
+            "plan": timings(plan, environ, runs),
+            "imports": imports(plan, environ, top)
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--packages", type=int, default=10, help="Packages per distributor.")
+    parser.add_argument("--top", type=int, default=15, help="Number of the slowest imports to report.")
+    parser.add_argument("--out", type=Path, default=Path("startup.json"))
+    args = parser.parse_args()
+
+    result = run(args.runs, args.packages, args.top)
+    report = {
+        "benchmark": "startup",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        **result
+    }
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(
+        f"interpreter: {result["interpreter"]["min_ms"]} ms, "
+        f"plan: {result["plan"]["min_ms"]} ms (median {result["plan"]["median_ms"]} ms), "
+        f"imports: {result["imports"]["total_ms"]} ms",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,29 @@
 
 import sys
 
+from collections.abc import Callable
 from pathlib import Path
-from tools import Parsers, Converters
+from loader import ConfigLoader
 from services import SyncManager as Sync
 from services import StateManager as State
 from logs import ConsoleLog as Console
+from metrics import Metrics
+from models import RunOptions, Stack
+from tracing import Tracer
+from transports import TRANSPORTS
 
 
 class Dispatcher:
     """Distributes input commands."""
 
-    def __init__(self):
-        self._tools = {
-            "parser": Parsers,
-            "converter": Converters
-        }
+    def __init__(self, options: RunOptions = None, transport: Callable[[str], any] = None):
+        self._options = options or RunOptions()
+        # Creates transport of the host ('hosts' option).
+        self._transport = transport or TRANSPORTS.get(self._options.transport)
+        self._loader = ConfigLoader(
+            cache_dir=self._options.cache_dir,
+            workers=self._options.workers
+        )
         self._console = Console()
 
     def now(self, file: Path, arg: str) -> None:
@@ -24,15 +32,29 @@ class Dispatcher:
 
         Parameters
         ----------
-        file : str
-            Path to config file.
+        file : Path
+            Path to config file or directory.
         arg : str
             Target operation (plan, apply)
         """
-        # Parse config file.
-        parse = self._tools.get("parser")
+        if self._options.trace:
+            Tracer.start()
+        if self._options.metrics:
+            Metrics.start(flow=arg)
+
+        succeeded = False
+        try:
+            self._now(file, arg)
+            succeeded = True
+        finally:
+            self._save_trace()
+            self._save_metrics(succeeded)
+
+    def _now(self, file: Path, arg: str) -> None:
+        """Loads and dispatches config (see 'now')."""
+        # Parses config fragments, converts them to objects and checks units dependencies.
         try:
-            config = parse.yaml(file)
+            stack = self._loader.stack(file)
         except RuntimeError as error:
             self._console.log(
                 level="error",
@@ -40,19 +62,184 @@ class Dispatcher:
             )
             sys.exit(1)
 
-        # Converts config dict to objects.
-        convert = self._tools.get("converter")
-        stack = convert.raw_config_to_stack(config)
-
         # Dispatch
-        self._dispatch(stack, arg)
+        with Tracer.span(arg):
+            if self._options.hosts:
+                self._dispatch_hosts(stack, arg)
+            elif arg == "agent":
+                self._run_agent(file, stack)
+            else:
+                self._dispatch(stack, arg)
+
+    def _save_trace(self) -> None:
+        """Stops tracing and writes the trace file."""
+        tracer = Tracer.stop()
+        if tracer is None:
+            return
+
+        try:
+            tracer.save(self._options.trace)
+        except OSError as error:
+            self._console.log(
+                level="error",
+                message=f"Trace not saved --> {repr(error)}"
+            )
+            return
+
+        self._console.log(
+            level="info",
+            message=f"Trace saved to '{self._options.trace}'."
+        )
+
+    def _save_metrics(self, succeeded: bool) -> None:
+        """Stops collecting metrics and writes the textfile.
+
+        Parameters
+        ----------
+        succeeded : bool
+            Whether the run finished without errors.
+        """
+        metrics = Metrics.stop()
+        if metrics is None:
+            return
+
+        try:
+            metrics.save(self._options.metrics, succeeded=succeeded)
+        except OSError as error:
+            self._console.log(
+                level="error",
+                message=f"Metrics not saved --> {repr(error)}"
+            )
+
+    def _save_plan(self, stack: Stack, fingerprint: dict[str, str]) -> None:
+        """Writes the plan file.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack with update cases.
+        fingerprint : dict[str, str]
+            Inventory fingerprint taken before probing.
+        """
+        from plans import PlanFile
+
+        try:
+            PlanFile.create(stack, fingerprint).save(self._options.out)
+        except OSError as error:
+            self._console.log(
+                level="error",
+                message=f"Plan not saved --> {repr(error)}"
+            )
+            sys.exit(1)
+
+        self._console.log(
+            level="info",
+            message=f"Plan saved to '{self._options.out}'."
+        )
+
+    @staticmethod
+    def _fingerprint(stack: Stack) -> dict[str, str]:
+        """Returns inventory fingerprint of the stack distributors (see PlanFile.fingerprint)."""
+        from plans import PlanFile
+
+        return PlanFile.fingerprint(stack)
+
+    def _planned(self, stack: Stack) -> Stack | None:
+        """Returns stack with cases of the plan file, 'None' when the system drifted since the plan.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack of all pools.
+
+        Raises
+        ----------
+        RuntimeError
+            When the plan file can't be read.
+        """
+        from plans import PlanFile
+
+        with Tracer.span("plan file"):
+            plan = PlanFile.load(self._options.plan)
+            drift = plan.drift(stack)
+
+        if drift is not None:
+            self._console.log(
+                level="warning",
+                message=f"Plan '{self._options.plan}' is outdated ({drift}) --> Packages are probed again."
+            )
+            return None
+
+        self._console.log(
+            level="info",
+            message=f"Plan '{self._options.plan}' is up to date --> Packages are not probed."
+        )
+        return plan.apply_to(stack)
+
+    def _run_agent(self, file: Path, stack: Stack) -> None:
+        """Runs the agent until interrupted (SIGINT, SIGTERM).
+
+        Parameters
+        ----------
+        file : Path
+            Path to config file or directory.
+        stack : Stack
+            Prepared configuration data.
+        """
+        # Flow modules are imported by their flows only, so 'plan' and 'apply' start faster.
+        import signal
+        import threading
+        from agent import Agent
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        try:
+            Agent(self._options, self._loader).run(file, stack, stop=stop)
+        except KeyboardInterrupt:
+            pass
+
+        self._console.log(
+            level="info",
+            message="Agent stopped."
+        )
+
+    def _dispatch_hosts(self, stack: Stack, arg: str) -> None:
+        """Starts dispatch process on the remote hosts.
+
+        Parameters
+        ----------
+        stack : Stack
+            Prepared configuration data.
+        arg : str
+            StateSync case (plan, apply)
+        """
+        if arg not in ("plan", "apply"):
+            self._console.log(
+                level="error",
+                message="Case not supported."
+            )
+            sys.exit(1)
+
+        if self._transport is None:
+            self._console.log(
+                level="error",
+                message=f"Transport '{self._options.transport}' not supported."
+            )
+            sys.exit(1)
+
+        from fleet import Fleet
 
-    def _dispatch(self, stack: list[dict], arg: str) -> None:
+        results = Fleet(self._options, transport=self._transport).run(stack, arg)
+        if any(error is not None for error in results.values()):
+            sys.exit(1)
+
+    def _dispatch(self, stack: Stack, arg: str) -> None:
         """Starts dispatch process.
 
         Parameters
         ----------
-        stack : list[dict]
+        stack : Stack
             Prepared configuration data.
         arg : str
             StateSync case (plan, apply)
@@ -62,10 +249,13 @@ class Dispatcher:
             case "plan":
                 # Defines state without sync.
                 try:
-                    State().sync_from(
-                        stack=stack,
-                        plan_only=True
-                    )
+                    # Taken before probing, so changes made while probing are drift too.
+                    fingerprint = self._fingerprint(stack) if self._options.out else None
+                    with Tracer.span("state"):
+                        stack = State(self._options).sync_from(
+                            stack=stack,
+                            plan_only=True
+                        )
                 except RuntimeError as error:
                     self._console.log(
                         level="error",
@@ -73,14 +263,23 @@ class Dispatcher:
                     )
                     sys.exit(1)
 
+                if self._options.out:
+                    self._save_plan(stack, fingerprint)
+
             case "apply":
                 # Begins 'apply' flow.
                 try:
-                    stack = State().sync_from(
-                        stack=stack,
-                        plan_only=False
-                    )
-                    Sync().state_from(stack)
+                    planned = self._planned(stack) if self._options.plan else None
+                    if planned is not None:
+                        stack = planned
+                    else:
+                        with Tracer.span("state"):
+                            stack = State(self._options).sync_from(
+                                stack=stack,
+                                plan_only=False
+                            )
+                    with Tracer.span("sync"):
+                        Sync(self._options).state_from(stack)
                 except RuntimeError as error:
                     self._console.log(
                         level="error",
@@ -0,0 +1,103 @@
+"""Provides multi-host functionality."""
+
+import copy
+import dataclasses
+import logging
+from collections.abc import Callable
+
+from helpers import LazyModule
+from logs import ConsoleLog as Console, LogBuffer
+from models import RunOptions, Stack
+from services import StateManager as State, SyncManager as Sync
+from tracing import Tracer
+
+concurrent_futures = LazyModule("concurrent.futures")
+
+
+class Fleet:
+    """Runs the flow (plan, apply) on several hosts with one parsed config.
+
+    Hosts run concurrently, at most 'fanout' at once, so at most 'fanout'
+    transport connections are open. Inside a host probes and lanes are limited
+    by the 'workers' option as on a single host. Output of every host
+    is held and printed at once when the host is done, prefixed with the host name.
+    """
+
+    def __init__(self, options: RunOptions, transport: Callable[[str], any]):
+        # On-disk caches describe this host, remote hosts are probed every run.
+        self._options = dataclasses.replace(options, cache_dir=None)
+        self._transport = transport
+        self._buffer = LogBuffer()
+        self._console = Console()
+
+    def run(self, stack: Stack, flow: str) -> dict[str, str | None]:
+        """Runs the flow on every host.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack of all pools (every host gets its own copy).
+        flow : str
+            StateSync case (plan, apply).
+
+        Returns
+        -------
+        dict[str, str | None]
+            Host with its error or 'None' when the flow succeeded, in hosts order.
+        """
+        hosts = list(dict.fromkeys(self._options.hosts))
+        results = {}
+
+        logger = logging.getLogger("StateSync")
+        logger.addFilter(self._buffer)
+        try:
+            with concurrent_futures.ThreadPoolExecutor(
+                    max_workers=max(1, min(self._options.fanout, len(hosts)))
+            ) as executor:
+                futures = {
+                    executor.submit(self._host, host, copy.deepcopy(stack), flow): host
+                    for host in hosts
+                }
+                for future in concurrent_futures.as_completed(futures):
+                    host = futures[future]
+                    results[host], records = future.result()
+                    self._buffer.replay(records, prefix=f"[{host}] ")
+        finally:
+            logger.removeFilter(self._buffer)
+
+        for host in hosts:
+            if results[host] is None:
+                self._console.log(level="info", message=f"{host} --> {flow} succeeded.")
+            else:
+                self._console.log(level="error", message=f"{host} --> {flow} failed: {results[host]}")
+
+        return {host: results[host] for host in hosts}
+
+    def _host(self, host: str, stack: Stack, flow: str) -> tuple[str | None, list[logging.LogRecord]]:
+        """Runs the flow on the host, returns its error and held output.
+
+        Any error (e.g. unreachable host) is the error of this host only,
+        other hosts keep running.
+        """
+        Tracer.track(host)
+
+        with self._buffer.capture() as records:
+            transport = None
+            try:
+                transport = self._transport(host)
+                with Tracer.span("host", host=host):
+                    stack = State(self._options, transport=transport).sync_from(
+                        stack=stack,
+                        plan_only=flow == "plan"
+                    )
+                    if flow == "apply":
+                        Sync(self._options, transport=transport).state_from(stack)
+                error = None
+            except Exception as exception:
+                self._console.log(level="error", message=repr(exception))
+                error = repr(exception)
+            finally:
+                if transport is not None:
+                    transport.close()
+
+        return error, records
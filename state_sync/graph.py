@@ -0,0 +1,163 @@
+"""Provides units dependency graph."""
+
+from models import Command, Stack
+
+
+class UnitGraph:
+    """Dependency graph of stack units.
+
+    Unit declares dependencies by names of other units:
+    'requires' - units must exist in the stack and be synchronized before;
+    'after' - units are synchronized before if they are in the stack.
+
+    Units keep the pools order: unit goes after all units of the previous
+    pools, declared dependencies are added to it. Commands group without
+    declarations also goes after the previous group of its pool.
+    A declaration may point to a unit of a later pool (e.g. application
+    after the group adding its repository), then the pool order between
+    the two units is dropped.
+    """
+
+    def __init__(self, stack: Stack):
+        """Builds graph and checks it for cycles.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack of all pools.
+
+        Raises
+        -------
+        RuntimeError
+            When dependency not found, ambiguous or dependencies have a cycle.
+        """
+        self._units = []
+        self._dependencies: list[set[int]] = []
+
+        names: dict[str, list[int]] = {}
+        previous_pools: list[int] = []
+        # Pool number of every node.
+        pools: list[int] = []
+
+        for number, pool in enumerate(stack.pools()):
+            pool_units = []
+            previous_group = None
+
+            for unit in stack.units(pool):
+                node = len(self._units)
+                self._units.append(unit)
+                names.setdefault(unit.name, []).append(node)
+                pool_units.append(node)
+                pools.append(number)
+
+                implicit = set(previous_pools)
+                declared = "after" in unit.additionally or "requires" in unit.additionally
+                if not declared and isinstance(unit, Command) and previous_group is not None:
+                    implicit.add(previous_group)
+                self._dependencies.append(implicit)
+
+                if isinstance(unit, Command):
+                    previous_group = node
+
+            previous_pools.extend(pool_units)
+
+        declared: list[set[int]] = [set() for _ in self._units]
+
+        for node, unit in enumerate(self._units):
+            for key in ("requires", "after"):
+                for name in unit.additionally.get(key) or []:
+                    found = names.get(name, [])
+
+                    if not found:
+                        if key == "requires":
+                            raise RuntimeError(f"{unit.name} --> Required unit '{name}' not found in stack.")
+                        continue
+                    if len(found) > 1:
+                        raise RuntimeError(f"{unit.name} --> Unit name '{name}' is ambiguous.")
+                    if found[0] == node:
+                        raise RuntimeError(f"{unit.name} --> Unit depends on itself.")
+
+                    declared[node].add(found[0])
+
+        self._drop_reversed_pool_order(declared, pools)
+        for node, dependencies in enumerate(declared):
+            self._dependencies[node].update(dependencies)
+
+        self._waves = self._sort()
+
+    def _drop_reversed_pool_order(self, declared: list[set[int]], pools: list[int]) -> None:
+        """Drops pool order where declarations reverse it.
+
+        When a unit depends (through declarations) on a unit of a later pool,
+        that unit and the units depending on it don't wait for the earlier pool unit.
+
+        Parameters
+        ----------
+        declared : list[set[int]]
+            Declared dependencies of every node.
+        pools : list[int]
+            Pool number of every node.
+        """
+        for node in range(len(self._units)):
+            if not declared[node]:
+                continue
+
+            # Declared dependencies of the node, transitively.
+            reached, pending = set(), list(declared[node])
+            while pending:
+                dependency = pending.pop()
+                if dependency not in reached:
+                    reached.add(dependency)
+                    pending.extend(declared[dependency])
+
+            for dependency in reached:
+                if pools[dependency] > pools[node]:
+                    # Later pool units implicitly wait for the whole earlier pool, this node included.
+                    self._dependencies[dependency].discard(node)
+
+    def _sort(self) -> list[list[int]]:
+        """Sorts nodes into waves, every wave depends only on the previous ones.
+
+        Raises
+        -------
+        RuntimeError
+            When dependencies have a cycle.
+        """
+        remaining = {node: set(dependencies) for node, dependencies in enumerate(self._dependencies)}
+        waves = []
+
+        while remaining:
+            ready = [node for node, dependencies in remaining.items() if not dependencies]
+            if not ready:
+                cycle = ", ".join(self._units[node].name for node in sorted(remaining))
+                raise RuntimeError(f"Units dependencies have a cycle: {cycle}.")
+
+            for node in ready:
+                del remaining[node]
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+
+            waves.append(ready)
+
+        return waves
+
+    def units(self) -> list:
+        """Returns units in stack order (nodes are their positions)."""
+        return list(self._units)
+
+    def dependencies(self) -> list[set[int]]:
+        """Returns nodes every node depends on."""
+        return [set(dependencies) for dependencies in self._dependencies]
+
+    def waves(self) -> list[list]:
+        """Returns units grouped into waves.
+
+        Units of one wave don't depend on each other and can be synchronized
+        concurrently once all previous waves are done. Stack order is kept inside a wave.
+
+        Returns
+        -------
+        list[list]
+            Waves of units.
+        """
+        return [[self._units[node] for node in wave] for wave in self._waves]
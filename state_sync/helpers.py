@@ -1,8 +1,26 @@
 """Provides helpers for StateSync functionality."""
 
+import importlib
 import logging
 
 
+class LazyModule:
+    """Module that is imported on the first attribute access.
+
+    Keeps startup fast: modules needed only by some flows
+    (e.g. asyncio for 'apply') are not loaded by the others.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
 class ConsoleLogFormatter(logging.Formatter):
     """Logs formatter."""
 
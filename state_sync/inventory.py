@@ -0,0 +1,123 @@
+"""Provides installed packages inventory."""
+
+from helpers import LazyModule
+from tracing import Tracer
+
+concurrent_futures = LazyModule("concurrent.futures")
+
+
+class Inventory:
+    """Keeps an index of installed packages per distributor.
+
+    Each distributor is queried once per run,
+    all following checks are exact-name lookups in the index.
+    """
+
+    def __init__(self, runner, store=None):
+        self._run = runner
+        # Optional InventoryStore, checked before querying the distributor.
+        self._store = store
+        self._index: dict[str, set[str]] = {}
+
+    def load(self, distributor: str) -> set[str]:
+        """Returns installed packages of the distributor.
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+
+        Returns
+        -------
+        set[str]
+            Names of installed packages.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor failure.
+        """
+        if distributor not in self._index:
+            with Tracer.span("probe", distributor=distributor, cached=self._store is not None):
+                if self._store is None:
+                    self._index[distributor] = self._run.app_inventory(distributor)
+                else:
+                    self._index[distributor] = self._store.load(
+                        distributor=distributor,
+                        scan=lambda: self._scan(distributor)
+                    )
+        return self._index[distributor]
+
+    def _scan(self, distributor: str) -> set[str]:
+        """Queries the distributor, bypassing the store."""
+        with Tracer.span("scan", distributor=distributor):
+            return self._run.app_inventory(distributor)
+
+    def generation(self, distributor: str) -> int | None:
+        """Returns inventory generation of the distributor.
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+
+        Returns
+        -------
+        int | None
+            Generation from the store or 'None' when the store is not used.
+        """
+        if self._store is None:
+            return None
+        self.load(distributor)
+        return self._store.generation(distributor)
+
+    def invalidate(self, distributor: str) -> None:
+        """Drops the distributor index, so it is queried again by the next lookup."""
+        self._index.pop(distributor, None)
+
+    def prefetch(self, distributors: list[str], workers: int) -> None:
+        """Queries several distributors concurrently.
+
+        Failed queries are not cached, so the error is raised
+        again by the following lookup with the package context.
+
+        Parameters
+        ----------
+        distributors : list[str]
+            Distributors names.
+        workers : int
+            Limit of concurrent queries.
+        """
+        pending = [d for d in dict.fromkeys(distributors) if d not in self._index]
+        if not pending:
+            return
+
+        with concurrent_futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(self.load, distributor) for distributor in pending]
+
+        for future in futures:
+            future.exception()
+
+    def contains(self, context: dict) -> bool:
+        """Checks if a package is installed on the system.
+
+        Parameters
+        ----------
+        context : dict
+            Unit context.
+
+        Returns
+        -------
+        bool
+            Is package present in OS or not.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor failure.
+        """
+        try:
+            installed = self.load(context.get("distributor"))
+        except RuntimeError as error:
+            raise RuntimeError(f"{context.get("package")} --> {error}") from error
+        return context.get("package") in installed
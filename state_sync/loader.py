@@ -0,0 +1,218 @@
+"""Provides config loading functionality."""
+
+from pathlib import Path
+
+from graph import UnitGraph
+from helpers import LazyModule
+from logs import ConsoleLog as Console
+from models import Stack
+from storage import Snapshot
+from tools import Converters, Parsers
+from tracing import Tracer
+
+concurrent_futures = LazyModule("concurrent.futures")
+pickle = LazyModule("pickle")
+
+
+class ConfigLoader:
+    """Loads config into the stack.
+
+    Config is a file, a directory of files or a file with the 'include' list
+    (paths or glob patterns relative to the file). Fragments are parsed concurrently
+    and merged into one stack in order: file, then its includes.
+
+    With the cache directory every fragment is parsed only after its content
+    changes, and the stack is converted only after any fragment changes.
+    """
+
+    SUFFIXES = (".yml", ".yaml")
+
+    def __init__(self, cache_dir: Path = None, workers: int = 4):
+        self._fragments = Snapshot(cache_dir / "fragments") if cache_dir else None
+        self._stacks = Snapshot(cache_dir / "stacks") if cache_dir else None
+        self._workers = workers
+        self._console = Console()
+        # Fragment files of the last loaded stack (e.g. to watch them).
+        self.sources: list[Path] = []
+
+    def stack(self, path: Path) -> Stack:
+        """Returns stack of the config.
+
+        Parameters
+        ----------
+        path : Path
+            Config file or directory.
+
+        Returns
+        -------
+        Stack
+            Stack of all pools.
+
+        Raises
+        -------
+        RuntimeError
+            When a fragment can't be read, units conflict or dependencies are invalid.
+        """
+        fragments = self._load(Path(path))
+        self.sources = [source for source, _, _ in fragments]
+
+        # Stack depends on every fragment path and content.
+        key = b"".join(f"{source}\0".encode("utf-8") + content + b"\0" for source, content, _ in fragments)
+        if self._stacks:
+            with Tracer.span("snapshot", file=str(path)):
+                stack = self._stacks.load(path, key)
+            if stack is not None:
+                return stack
+
+        with Tracer.span("convert", fragments=len(fragments)):
+            config = Converters.merge_configs([(str(source), config) for source, _, config in fragments])
+            stack = Converters.raw_config_to_stack(config)
+            UnitGraph(stack)
+
+        if self._stacks:
+            self._save(self._stacks, path, key, stack)
+        return stack
+
+    def files(self, directory: Path) -> list[Path]:
+        """Returns config files of the directory (with subdirectories) in name order.
+
+        Parameters
+        ----------
+        directory : Path
+            Config directory.
+
+        Returns
+        -------
+        list[Path]
+            Config files.
+
+        Raises
+        -------
+        RuntimeError
+            When the directory has no config files.
+        """
+        files = sorted(
+            file.resolve() for file in Path(directory).rglob("*")
+            if file.suffix in self.SUFFIXES and file.is_file()
+        )
+        if not files:
+            raise RuntimeError(f"No config files found in '{directory}'.")
+        return files
+
+    def _load(self, path: Path) -> list[tuple[Path, bytes, dict]]:
+        """Parses config fragments, every level of includes concurrently.
+
+        Parameters
+        ----------
+        path : Path
+            Config file or directory.
+
+        Returns
+        -------
+        list[tuple[Path, bytes, dict]]
+            Fragment path, content and parsed config in merge order.
+        """
+        roots = self.files(path) if path.is_dir() else [path.resolve()]
+        loaded: dict[Path, tuple[bytes, dict]] = {}
+        includes: dict[Path, list[Path]] = {}
+
+        pending = roots
+        while pending:
+            for source, (content, config) in zip(pending, self._parse_all(pending)):
+                loaded[source] = (content, config)
+                includes[source] = self._includes(source, config)
+
+            pending = list(dict.fromkeys(
+                include for source in pending for include in includes[source]
+                if include not in loaded
+            ))
+
+        ordered = []
+
+        def visit(source: Path) -> None:
+            if source in ordered:
+                return
+            ordered.append(source)
+            for include in includes[source]:
+                visit(include)
+
+        for root in roots:
+            visit(root)
+
+        return [(source, *loaded[source]) for source in ordered]
+
+    def _parse_all(self, sources: list[Path]) -> list[tuple[bytes, dict]]:
+        """Parses fragments concurrently, keeps their order."""
+        if len(sources) == 1:
+            return [self._parse(sources[0])]
+
+        with concurrent_futures.ThreadPoolExecutor(max_workers=max(1, min(self._workers, len(sources)))) as executor:
+            return list(executor.map(self._parse, sources))
+
+    def _parse(self, source: Path) -> tuple[bytes, dict]:
+        """Returns fragment content and parsed config.
+
+        Raises
+        -------
+        RuntimeError
+            When the file can't be read or is not a mapping.
+        """
+        try:
+            content = source.read_bytes()
+        except OSError as error:
+            raise RuntimeError(f"An error occurred while reading the file '{source}'.") from error
+
+        if self._fragments:
+            config = self._fragments.load(source, content)
+            if config is not None:
+                return content, config
+
+        with Tracer.span("parse", file=str(source)):
+            config = Parsers.yaml(source, content)
+
+        if config is None:
+            config = {}
+        if not isinstance(config, dict):
+            raise RuntimeError(f"{source} --> Config must be a mapping.")
+
+        if self._fragments:
+            self._save(self._fragments, source, content, config)
+        return content, config
+
+    def _includes(self, source: Path, config: dict) -> list[Path]:
+        """Returns files included by the fragment.
+
+        Raises
+        -------
+        RuntimeError
+            When an included file not found.
+        """
+        entries = config.get("include") or []
+        if isinstance(entries, str):
+            entries = [entries]
+
+        includes = []
+        for entry in entries:
+            if any(symbol in entry for symbol in "*?["):
+                includes.extend(sorted(
+                    file.resolve() for file in source.parent.glob(entry)
+                    if file.suffix in self.SUFFIXES and file.is_file()
+                ))
+                continue
+
+            include = (source.parent / entry).resolve()
+            if not include.is_file():
+                raise RuntimeError(f"{source} --> Included file '{entry}' not found.")
+            includes.append(include)
+
+        return [include for include in includes if include != source]
+
+    def _save(self, snapshots: Snapshot, file: Path, content: bytes, value: any) -> None:
+        """Saves snapshot, the run goes on without it on failure."""
+        try:
+            snapshots.save(file, content, value)
+        except (OSError, pickle.PicklingError) as error:
+            self._console.log(
+                level="warning",
+                message=f"Config snapshot not saved --> {repr(error)}"
+            )
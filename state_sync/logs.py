@@ -1,6 +1,9 @@
 """Provides console log functionality."""
 
 import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from helpers import ConsoleLogFormatter as LogFormat
 
 
@@ -39,3 +42,38 @@ class ConsoleLog:
                 self.__logger.warning(message)
             case "error":
                 self.__logger.error(message)
+
+
+class LogBuffer(logging.Filter):
+    """Holds records logged inside 'capture' instead of printing them.
+
+    Records are held per context (thread or task started inside it),
+    so output of several concurrent runs can be printed run by run.
+    """
+
+    _records: ContextVar[list | None] = ContextVar("log_buffer", default=None)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        records = self._records.get()
+        if records is None:
+            return True
+        records.append(record)
+        return False
+
+    @contextmanager
+    def capture(self) -> Iterator[list[logging.LogRecord]]:
+        """Collects records of the current context into the yielded list."""
+        records = []
+        token = self._records.set(records)
+        try:
+            yield records
+        finally:
+            self._records.reset(token)
+
+    @staticmethod
+    def replay(records: list[logging.LogRecord], prefix: str = "") -> None:
+        """Logs held records with the prefix."""
+        logger = logging.getLogger("StateSync")
+        for record in records:
+            record.msg = f"{prefix}{record.msg}"
+            logger.handle(record)
@@ -0,0 +1,166 @@
+"""Provides run metrics functionality."""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from helpers import LazyModule
+from tracing import Tracer
+
+tempfile = LazyModule("tempfile")
+
+
+class Metrics:
+    """Collects run metrics and writes them as a node_exporter textfile.
+
+    Timings are taken from the finished tracing spans,
+    items cases are counted by the state manager.
+    """
+
+    PREFIX = "state_sync"
+    PHASES = ("snapshot", "parse", "convert", "state", "sync")
+    # Probe latency histogram buckets (seconds).
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    _active: 'Metrics' = None
+
+    def __init__(self, flow: str):
+        self._flow = flow
+        self._lock = threading.Lock()
+        self._phases: dict[str, float] = {}
+        self._probes: dict[str, list[float]] = defaultdict(list)
+        self._items: dict[tuple[str, str], int] = defaultdict(int)
+        self._commands = {"executed": 0, "failed": 0}
+
+    @classmethod
+    def start(cls, flow: str) -> 'Metrics':
+        """Starts collecting metrics of the flow (plan, apply)."""
+        cls.stop()
+        cls._active = cls(flow)
+        Tracer.subscribe(cls._active.on_span)
+        return cls._active
+
+    @classmethod
+    def stop(cls) -> 'Metrics | None':
+        """Stops collecting, returns the stopped metrics."""
+        metrics, cls._active = cls._active, None
+        if metrics is not None:
+            Tracer.unsubscribe(metrics.on_span)
+        return metrics
+
+    @classmethod
+    def count_item(cls, distributor: str, case: str) -> None:
+        """Counts application item with its sync case (to_install, to_remove, ignore)."""
+        metrics = cls._active
+        if metrics is None:
+            return
+
+        with metrics._lock:
+            metrics._items[(distributor, case)] += 1
+
+    def on_span(self, name: str, seconds: float, attributes: dict) -> None:
+        """Takes timings from the finished span.
+
+        Parameters
+        ----------
+        name : str
+            Span name.
+        seconds : float
+            Span duration.
+        attributes : dict
+            Span attributes.
+        """
+        with self._lock:
+            if name in self.PHASES:
+                self._phases[name] = self._phases.get(name, 0.0) + seconds
+            elif name == "probe":
+                self._probes[attributes.get("distributor")].append(seconds)
+            elif name == "command":
+                self._commands["executed"] += 1
+                if "error" in attributes:
+                    self._commands["failed"] += 1
+
+    def render(self, succeeded: bool) -> str:
+        """Returns metrics in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        succeeded : bool
+            Whether the run finished without errors.
+
+        Returns
+        -------
+        str
+            Textfile content.
+        """
+        flow = f'flow="{self._flow}"'
+        lines = []
+
+        def metric(name: str, kind: str, description: str, samples: list[tuple[str, str, float]]) -> None:
+            lines.append(f"# HELP {self.PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {self.PREFIX}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{self.PREFIX}_{name}{suffix}{{{labels}}} {value:g}")
+
+        with self._lock:
+            metric("run_success", "gauge", "Whether the last run finished without errors.", [
+                ("", flow, int(succeeded))
+            ])
+            metric("run_timestamp_seconds", "gauge", "Time the last run finished.", [
+                ("", flow, time.time())
+            ])
+            metric("phase_duration_seconds", "gauge", "Duration of the run phase.", [
+                ("", f'{flow},phase="{phase}"', self._phases[phase])
+                for phase in self.PHASES if phase in self._phases
+            ])
+
+            probes = []
+            for distributor, durations in sorted(self._probes.items()):
+                labels = f'{flow},distributor="{distributor}"'
+                for bucket in self.BUCKETS:
+                    observed = sum(1 for duration in durations if duration <= bucket)
+                    probes.append(("_bucket", f'{labels},le="{bucket:g}"', observed))
+                probes.append(("_bucket", f'{labels},le="+Inf"', len(durations)))
+                probes.append(("_sum", labels, sum(durations)))
+                probes.append(("_count", labels, len(durations)))
+            metric("probe_duration_seconds", "histogram", "Installed packages query latency.", probes)
+
+            metric("items", "gauge", "Application items per sync case.", [
+                ("", f'{flow},distributor="{distributor}",case="{case}"', count)
+                for (distributor, case), count in sorted(self._items.items())
+            ])
+            # Counted per run (the textfile is rewritten), so these are gauges.
+            metric("commands_executed", "gauge", "Shell commands executed by the run.", [
+                ("", flow, self._commands["executed"])
+            ])
+            metric("commands_failed", "gauge", "Shell commands of the run finished with error.", [
+                ("", flow, self._commands["failed"])
+            ])
+
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: Path, succeeded: bool) -> None:
+        """Writes textfile atomically, so the exporter never reads a half-written file.
+
+        Parameters
+        ----------
+        path : Path
+            Textfile path (node_exporter textfile collector files end with '.prom').
+        succeeded : bool
+            Whether the run finished without errors.
+        """
+        path = Path(path)
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as textfile:
+                textfile.write(self.render(succeeded))
+                textfile.flush()
+                os.fsync(textfile.fileno())
+            # Temporary files are private, the exporter may run as another user.
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
@@ -1,22 +1,63 @@
 """Provides model classes."""
 
+import hashlib
+import json
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
 
 
-@dataclass()
+class ItemCase(StrEnum):
+    """Item synchronization case (equal to its value, e.g. 'to_install')."""
+
+    NOT_DEFINED = "not_defined"
+    TO_INSTALL = "to_install"
+    TO_REMOVE = "to_remove"
+    IGNORE = "ignore"
+    AS_UNIT = "as_unit"
+
+
+@dataclass(slots=True)
 class AbstractUnit(ABC):
     name: str = None
-    items: dict[str, str] = field(default_factory=dict)
+    items: dict[str, ItemCase] = field(default_factory=dict)
     additionally: dict[str, any] = field(default_factory=dict)
+    # Stack the unit belongs to and its position there (see Stack.add).
+    _stack: 'Stack' = field(default=None, init=False, repr=False, compare=False)
+    _node: int = field(default=None, init=False, repr=False, compare=False)
 
     @classmethod
     @abstractmethod
     def create_from_config(cls, data: dict) -> 'AbstractUnit':
         pass
 
+    def set_item_sync_case(self, item: str, case: str) -> None:
+        """Sets item updating case (and updates the cases index of the stack)."""
+        case = ItemCase(case)
+        previous = self.items.get(item)
+        self.items[item] = case
 
-@dataclass()
+        if self._stack is not None:
+            self._stack.recase(self, item, previous, case)
+
+    def set_dependencies(self, data: dict) -> None:
+        """Sets names of units this unit depends on ('after', 'requires')."""
+        for key in ("after", "requires"):
+            if key in data:
+                self.additionally.update({key: list(data.get(key) or [])})
+
+    def digest(self) -> str:
+        """Returns content hash of the unit config (item cases are not included)."""
+        config = json.dumps(
+            [type(self).__name__, self.name, list(self.items), self.additionally],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+
+@dataclass(slots=True)
 class Application(AbstractUnit):
     """Application unit model."""
 
@@ -28,18 +69,15 @@ class Application(AbstractUnit):
         unit.additionally.update({"classic": data.get("classic")}),
         unit.additionally.update({"distributor": data.get("distributor")}),
         unit.additionally.update({"presented": data.get("presented")}),
+        unit.set_dependencies(data)
 
         for package in data.get("packages", []):
-            unit.items.update({package: "not_defined"})
+            unit.items.update({package: ItemCase.NOT_DEFINED})
 
         return unit
 
-    def set_item_sync_case(self, item: str, case: str) -> None:
-        """Sets item updating case."""
-        self.items.update({item: case})
-
 
-@dataclass()
+@dataclass(slots=True)
 class Command(AbstractUnit):
     """Command unit model."""
 
@@ -49,8 +87,181 @@ class Command(AbstractUnit):
         unit = cls(name=data.get("group"))
 
         unit.additionally.update({"execute": data.get("execute")})
+        unit.set_dependencies(data)
 
         for command in data.get("commands", []):
-            unit.items.update({command: "as_unit"})
+            unit.items.update({command: ItemCase.AS_UNIT})
 
         return unit
+
+
+class Stack:
+    """Units of all pools in config order with their indexes.
+
+    Units are kept in one list, indexes hold their positions: units
+    of a pool, applications of a distributor, applications of a package
+    and application items of a case (e.g. all 'apt' items to install),
+    so lookups don't scan the stack. Units report changes of their item
+    cases (see AbstractUnit.set_item_sync_case), so the cases index
+    is always up to date. Unit belongs to one stack.
+    """
+
+    __slots__ = ("_units", "_pools", "_distributors", "_packages", "_cases")
+
+    def __init__(self, pools: dict[str, list[AbstractUnit]] = None):
+        self._units: list[AbstractUnit] = []
+        # Pool name with positions of its units.
+        self._pools: dict[str, list[int]] = {}
+        # Distributor with positions of its applications.
+        self._distributors: dict[str, list[int]] = {}
+        # Distributor and package with positions of applications containing it.
+        self._packages: dict[tuple[str, str], list[int]] = {}
+        # Distributor and case with positions and packages of the items (ordered set).
+        self._cases: dict[tuple[str, ItemCase], dict[tuple[int, str], None]] = {}
+
+        for pool, units in (pools or {}).items():
+            self.add_pool(pool)
+            for unit in units:
+                self.add(pool, unit)
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Stack):
+            return NotImplemented
+        return self._layout() == other._layout()
+
+    def __repr__(self) -> str:
+        return f"Stack({dict(self._layout())})"
+
+    def _layout(self) -> list[tuple[str, list[AbstractUnit]]]:
+        """Returns pools with their units."""
+        return [(pool, self.units(pool)) for pool in self._pools]
+
+    def __iter__(self):
+        return iter(self.units())
+
+    def add_pool(self, pool: str) -> None:
+        """Adds empty pool (pools keep their adding order)."""
+        self._pools.setdefault(pool, [])
+
+    def add(self, pool: str, unit: AbstractUnit) -> None:
+        """Adds unit to the end of the pool.
+
+        Raises
+        ----------
+        RuntimeError
+            When the unit belongs to a stack already.
+        """
+        if unit._stack is not None:
+            raise RuntimeError(f"{unit.name} --> Unit belongs to a stack already.")
+
+        node = len(self._units)
+        self._units.append(unit)
+        unit._stack, unit._node = self, node
+        self._pools.setdefault(pool, []).append(node)
+
+        if not isinstance(unit, Application):
+            return
+
+        distributor = unit.additionally.get("distributor")
+        self._distributors.setdefault(distributor, []).append(node)
+        for package, case in unit.items.items():
+            self._packages.setdefault((distributor, package), []).append(node)
+            self._cases.setdefault((distributor, ItemCase(case)), {})[(node, package)] = None
+
+    def recase(self, unit: AbstractUnit, item: str, previous: ItemCase | None, case: ItemCase) -> None:
+        """Moves the unit item to its new case in the index (see AbstractUnit.set_item_sync_case)."""
+        if not isinstance(unit, Application):
+            return
+
+        distributor = unit.additionally.get("distributor")
+        if previous is not None:
+            self._cases.get((distributor, ItemCase(previous)), {}).pop((unit._node, item), None)
+        self._cases.setdefault((distributor, case), {})[(unit._node, item)] = None
+
+    def discard(self, unit: AbstractUnit, item: str) -> None:
+        """Removes item from the unit and from the indexes."""
+        case = unit.items.pop(item, None)
+        if case is None or not isinstance(unit, Application):
+            return
+
+        distributor = unit.additionally.get("distributor")
+        self._packages.get((distributor, item), []).remove(unit._node)
+        self._cases.get((distributor, ItemCase(case)), {}).pop((unit._node, item), None)
+
+    def shared(self) -> dict[tuple[str, str], list[Application]]:
+        """Returns distributor packages contained in several applications with the applications."""
+        return {
+            key: [self._units[node] for node in nodes]
+            for key, nodes in self._packages.items() if len(nodes) > 1
+        }
+
+    def pools(self) -> list[str]:
+        """Returns pool names in config order."""
+        return list(self._pools)
+
+    def units(self, pool: str = None) -> list[AbstractUnit]:
+        """Returns units of the pool or of all pools in config order."""
+        if pool is not None:
+            return [self._units[node] for node in self._pools.get(pool, [])]
+        return [self._units[node] for nodes in self._pools.values() for node in nodes]
+
+    def distributors(self) -> list[str]:
+        """Returns distributors of the applications in config order."""
+        return list(self._distributors)
+
+    def applications(self, distributor: str) -> list[Application]:
+        """Returns applications of the distributor in config order."""
+        return [self._units[node] for node in self._distributors.get(distributor, [])]
+
+    def holders(self, distributor: str, package: str) -> list[Application]:
+        """Returns applications containing the distributor package."""
+        return [self._units[node] for node in self._packages.get((distributor, package), [])]
+
+    def items(self, distributor: str, case: str) -> list[tuple[Application, str]]:
+        """Returns applications with their packages having the case (e.g. 'apt' items 'to_install').
+
+        Items are in the order their cases were set.
+        """
+        return [
+            (self._units[node], package)
+            for node, package in self._cases.get((distributor, ItemCase(case)), {})
+        ]
+
+    def count(self, distributor: str, case: str) -> int:
+        """Returns number of the distributor items having the case."""
+        return len(self._cases.get((distributor, ItemCase(case)), {}))
+
+
+@dataclass()
+class RunOptions:
+    """Run options model."""
+
+    # Limit of concurrently running probes.
+    workers: int = 4
+    # Directory of on-disk caches, 'None' disables caching.
+    cache_dir: Path = None
+    # Evaluates all units, ignores units converged at the previous runs.
+    full: bool = False
+    # Executes commands of a group with one long-lived shell.
+    persistent_shell: bool = False
+    # Downloads packages to install in the background while earlier units are synchronized.
+    prefetch: bool = True
+    # Chrome trace-event file, 'None' disables tracing.
+    trace: Path = None
+    # Prometheus textfile, 'None' disables metrics.
+    metrics: Path = None
+    # Plan file written by 'plan'.
+    out: Path = None
+    # Plan file applied by 'apply' while the system is unchanged.
+    plan: Path = None
+    # Remote hosts to synchronize instead of this host, 'None' for this host.
+    hosts: list[str] = None
+    # Limit of concurrently synchronized hosts (and their open connections).
+    fanout: int = 8
+    # Transport to the hosts (see transports.TRANSPORTS).
+    transport: str = "ssh"
+    # Seconds without changes before the agent synchronizes (changes in between are coalesced).
+    debounce: float = 1.0
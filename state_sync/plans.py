@@ -0,0 +1,189 @@
+"""Provides saved plan functionality."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from metrics import Metrics
+from models import Application, ItemCase, Stack
+from storage import default_signals, stamp
+
+
+class PlanFile:
+    """Item cases of the stack saved by 'plan' to be applied by 'apply'.
+
+    Plan stays valid while the config is the same and the state files
+    of the planned distributors (see storage.default_signals) are unchanged
+    since the plan was made, so 'apply' doesn't probe packages again.
+    """
+
+    VERSION = 1
+
+    def __init__(self, config: str, fingerprint: dict[str, str], cases: list[list[dict[str, str]]]):
+        # Digest of the stack units (see PlanFile.config_digest).
+        self.config = config
+        # Distributor state files stamps (see PlanFile.fingerprint).
+        self.fingerprint = fingerprint
+        # Item cases of every unit in stack order.
+        self.cases = cases
+
+    @staticmethod
+    def config_digest(stack: Stack) -> str:
+        """Returns digest of the stack units (item cases are not included)."""
+        units = [[pool, [unit.digest() for unit in stack.units(pool)]] for pool in stack.pools()]
+        return hashlib.sha256(json.dumps(units).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def fingerprint(stack: Stack) -> dict[str, str]:
+        """Returns inventory fingerprint of the stack distributors.
+
+        Fingerprint is taken from modification times of the distributor
+        state files, so it needs neither processes nor package queries.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack of all pools.
+
+        Returns
+        -------
+        dict[str, str]
+            Distributor with its state files stamp.
+        """
+        signals = default_signals()
+        return {distributor: stamp(signals.get(distributor, [])) for distributor in sorted(stack.distributors())}
+
+    @classmethod
+    def create(cls, stack: Stack, fingerprint: dict[str, str]) -> 'PlanFile':
+        """Creates plan of the stack with defined item cases.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack with update cases (see StateManager.sync_from).
+        fingerprint : dict[str, str]
+            Inventory fingerprint taken before the cases were defined.
+
+        Returns
+        -------
+        PlanFile
+            Plan.
+        """
+        return cls(
+            config=cls.config_digest(stack),
+            fingerprint=fingerprint,
+            cases=[[dict(unit.items) for unit in stack.units(pool)] for pool in stack.pools()]
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> 'PlanFile':
+        """Reads plan file.
+
+        Raises
+        ----------
+        RuntimeError
+            When the file can't be read or is not a plan of this version.
+        """
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as error:
+            raise RuntimeError(f"Can't read plan file '{path}' --> {repr(error)}") from error
+
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            raise RuntimeError(f"'{path}' is not a plan file of this StateSync version.")
+
+        cases = data.get("cases") or []
+        if not cls._valid_cases(cases):
+            raise RuntimeError(f"'{path}' is not a plan file of this StateSync version.")
+
+        return cls(
+            config=data.get("config"),
+            fingerprint=data.get("fingerprint") or {},
+            cases=cases
+        )
+
+    @staticmethod
+    def _valid_cases(cases: any) -> bool:
+        """Returns whether the cases are units items of pools with known item cases."""
+        known = set(ItemCase)
+        return isinstance(cases, list) and all(
+            isinstance(units, list) and all(
+                isinstance(items, dict) and all(
+                    isinstance(item, str) and case in known for item, case in items.items()
+                )
+                for items in units
+            )
+            for units in cases
+        )
+
+    def save(self, path: Path) -> None:
+        """Writes plan file atomically.
+
+        Raises
+        ----------
+        OSError
+            When the file can't be written.
+        """
+        path = Path(path)
+        data = {
+            "version": self.VERSION,
+            "config": self.config,
+            "fingerprint": self.fingerprint,
+            "cases": self.cases
+        }
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            temporary.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(temporary, path)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+
+    def drift(self, stack: Stack) -> str | None:
+        """Returns why the plan doesn't match the stack and the system, 'None' when it matches.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack of all pools.
+
+        Returns
+        -------
+        str | None
+            Drift reason.
+        """
+        if self.config != self.config_digest(stack):
+            return "config changed"
+
+        signals = default_signals()
+        changed = [
+            distributor for distributor, planned in sorted(self.fingerprint.items())
+            if stamp(signals.get(distributor, [])) != planned
+        ]
+        if changed:
+            return f"{", ".join(changed)} changed"
+        return None
+
+    def apply_to(self, stack: Stack) -> Stack:
+        """Sets planned item cases (the plan must match the stack, see 'drift').
+
+        Application items are counted by the run metrics, as 'plan' counted them.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack of all pools.
+
+        Returns
+        -------
+        Stack
+            Stack with update cases.
+        """
+        for pool, cases in zip(stack.pools(), self.cases):
+            for unit, items in zip(stack.units(pool), cases):
+                for item, case in items.items():
+                    unit.set_item_sync_case(item=item, case=case)
+                    if isinstance(unit, Application):
+                        Metrics.count_item(unit.additionally.get("distributor"), ItemCase(case))
+        return stack
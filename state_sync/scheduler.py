@@ -0,0 +1,204 @@
+"""Provides apply scheduling functionality."""
+
+from collections.abc import Awaitable, Callable
+
+from helpers import LazyModule
+from logs import ConsoleLog as Console
+from tracing import Tracer
+
+asyncio = LazyModule("asyncio")
+
+
+class LaneScheduler:
+    """Runs lanes concurrently, jobs inside a lane strictly one after another.
+
+    Lane is a lock domain (e.g. distributor), so jobs of different
+    lanes never wait for each other's lock. All lanes share one event loop.
+    Jobs are either given per lane (see 'run') or started for the nodes
+    of a dependency graph once their dependencies are done (see 'run_ready').
+    """
+
+    def __init__(self):
+        self._console = Console()
+        self._stop = None
+
+    @property
+    def stopped(self) -> bool:
+        """Whether a job of the current run failed (long jobs may stop early, e.g. bisection)."""
+        return self._stop is not None and self._stop.is_set()
+
+    async def run(self, lanes: dict[str, list[Callable[[], Awaitable]]], workers: int = None) -> None:
+        """Runs lanes and waits for all of them.
+
+        After the first failure no more jobs are started in any lane,
+        jobs already running are completed.
+
+        Parameters
+        ----------
+        lanes : dict[str, list[Callable[[], Awaitable]]]
+            Lane name with its jobs.
+        workers : int
+            Limit of concurrently running jobs, not limited by default.
+
+        Raises
+        ----------
+        RuntimeError
+            The first error raised by a job (other exceptions are raised as they are).
+        """
+        stop = self._stop = asyncio.Event()
+        errors = []
+        slots = asyncio.Semaphore(max(1, workers or len(lanes)))
+
+        async def lane(name: str, jobs: list[Callable[[], Awaitable]]) -> None:
+            Tracer.track(name)
+            for job in jobs:
+                if stop.is_set():
+                    self._console.log(
+                        level="warning",
+                        message=f"[{name}] --> Stopped after failure in another lane."
+                    )
+                    return
+                with Tracer.span("slot wait", lane=name):
+                    await slots.acquire()
+                try:
+                    # Lanes waiting for a slot are stopped too.
+                    if stop.is_set():
+                        continue
+                    await job()
+                except Exception as error:
+                    errors.append(error)
+                    stop.set()
+                    return
+                finally:
+                    slots.release()
+
+        await asyncio.gather(
+            *(lane(name, jobs) for name, jobs in lanes.items() if jobs)
+        )
+
+        if errors:
+            raise errors[0]
+
+    async def run_ready(
+            self,
+            dependencies: list[set[int]],
+            lanes: list[str | None],
+            job: Callable[[str, list[int]], Awaitable],
+            workers: int = None,
+            domains: dict[str, str] = None,
+            cancellable: set[str] = None
+    ) -> None:
+        """Runs every node once its dependencies are done, without waiting for unrelated nodes.
+
+        Nodes of one lane never run at once: ready nodes of a busy lane wait for it
+        and are then passed to one job together (e.g. one transaction of a distributor).
+        Lanes of one lock domain never run at once either. Lanes with ready nodes
+        are started in node order. After the first failure no more jobs are started,
+        jobs already running are completed (jobs of cancellable lanes are cancelled).
+
+        Parameters
+        ----------
+        dependencies : list[set[int]]
+            Nodes every node depends on.
+        lanes : list[str | None]
+            Lane of every node, 'None' for nodes with nothing to run (done once ready).
+        job : Callable[[str, list[int]], Awaitable]
+            Runs ready nodes of the lane.
+        workers : int
+            Limit of concurrently running jobs, not limited by default.
+        domains : dict[str, str]
+            Lock domain of the lanes, every lane is its own domain by default.
+        cancellable : set[str]
+            Lanes whose work nothing else needs after a failure (e.g. downloads).
+
+        Raises
+        ----------
+        RuntimeError
+            The first error raised by a job (other exceptions are raised as they are).
+        """
+        stop = self._stop = asyncio.Event()
+        errors = []
+        limit = max(1, workers or len(lanes))
+        domains = domains or {}
+        cancellable = cancellable or set()
+
+        # Number of unfinished dependencies of every node.
+        remaining = [len(nodes) for nodes in dependencies]
+        dependents = [[] for _ in dependencies]
+        for node, nodes in enumerate(dependencies):
+            for dependency in nodes:
+                dependents[dependency].append(node)
+
+        # Lane with its ready nodes, lanes are started in order of their first ready node.
+        ready: dict[str, list[int]] = {}
+        running: dict['asyncio.Task', list[int]] = {}
+
+        def release(nodes: list[int]) -> None:
+            """Marks nodes done, nodes without lane are done as soon as they are ready."""
+            pending = list(nodes)
+            while pending:
+                node = pending.pop()
+                for dependent in dependents[node]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        if lanes[dependent] is None:
+                            pending.append(dependent)
+                        else:
+                            ready.setdefault(lanes[dependent], []).append(dependent)
+
+        async def lane(name: str, nodes: list[int]) -> None:
+            Tracer.track(name)
+            await job(name, nodes)
+
+        for node, count in enumerate(remaining):
+            if count == 0:
+                if lanes[node] is None:
+                    release([node])
+                else:
+                    ready.setdefault(lanes[node], []).append(node)
+
+        try:
+            while True:
+                busy = {domains.get(lanes[nodes[0]], lanes[nodes[0]]) for nodes in running.values()}
+                for name in sorted(ready, key=lambda name: min(ready[name])):
+                    if stop.is_set() or len(running) >= limit:
+                        break
+                    if domains.get(name, name) not in busy:
+                        busy.add(domains.get(name, name))
+                        nodes = sorted(ready.pop(name))
+                        running[asyncio.create_task(lane(name, nodes))] = nodes
+
+                if not running:
+                    break
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    nodes = running.pop(task)
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        stop.set()
+                    else:
+                        release(nodes)
+
+                if stop.is_set():
+                    for task, nodes in running.items():
+                        if lanes[nodes[0]] in cancellable:
+                            task.cancel()
+        finally:
+            # Jobs are cancelled only when the run itself is cancelled.
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+        for name in ready:
+            if name in cancellable:
+                continue
+            self._console.log(
+                level="warning",
+                message=f"[{name}] --> Stopped after failure in another lane."
+            )
+
+        if errors:
+            raise errors[0]
@@ -1,46 +1,103 @@
 """Module with core StateSync functionality."""
 
-import subprocess
+import sys
 
+from backends import native_backends
+from graph import UnitGraph
+from helpers import LazyModule
+from inventory import Inventory
 from logs import ConsoleLog as Console
-from models import Application, Command
+from metrics import Metrics
+from models import Application, Command, ItemCase, RunOptions, Stack
+from scheduler import LaneScheduler
+from shell import ShellWorker
+from storage import InventoryStore, StateJournal
+from tracing import Tracer
+
+# Loaded on the first use, 'plan' without drift needs neither processes nor an event loop.
+asyncio = LazyModule("asyncio")
+subprocess = LazyModule("subprocess")
 
 
 class StateManager:
     """Defines the stack state without synchronization."""
 
-    def __init__(self):
-        self._run = CommandRunner()
+    def __init__(self, options: RunOptions = None, transport=None):
+        self._options = options or RunOptions()
+        # Native backends read this host only.
+        self._run = CommandRunner(
+            backends=native_backends() if transport is None else None,
+            transport=transport
+        )
+        self._inventory = Inventory(
+            runner=self._run,
+            store=InventoryStore(self._options.cache_dir / "inventory.sqlite3")
+            if self._options.cache_dir else None
+        )
+        self._journal = StateJournal(self._options.cache_dir / "journal.sqlite3") \
+            if self._options.cache_dir and not self._options.full else None
         self._console = Console()
 
-    def sync_from(self, stack: list[dict], plan_only: bool) -> list[dict]:
+    def sync_from(self, stack: Stack, plan_only: bool, units: list = None) -> Stack:
         """Defines unit item synchronization case.
 
+        Units converged at the previous runs (same config and inventory generation)
+        are skipped without probing.
+
         Parameters
         ----------
-        stack: list[dict]
+        stack: Stack
             Stack of all pools.
         plan_only: bool
-            'True' for console output only.
-            'False' for pre sync checking where sets update case.
+            'True' for console output.
+            'False' for pre sync checking.
+        units: list
+            Units of the stack to define, all units by default (cases of others are kept).
 
         Returns
         ----------
-        list[dict]
-            Returns updated stack if 'plan_only' is 'False'.
+        Stack
+            Returns stack with update cases (also when 'plan_only' is 'True', e.g. for the plan file).
 
         Raises
         ----------
         RuntimeError
             From applications: When distributor failure.
         """
-        for pool in stack:
-            for unit in pool.get("units"):
+        selected = None if units is None else {id(unit) for unit in units}
+
+        # Queries all distributors concurrently, cases are defined from the index in stack order.
+        self._inventory.prefetch(
+            distributors=stack.distributors() if selected is None else [
+                unit.additionally.get("distributor")
+                for unit in units
+                if isinstance(unit, Application)
+            ],
+            workers=self._options.workers
+        )
 
-                if pool.get("name") == "applications":
+        for pool in stack.pools():
+            for unit in stack.units(pool):
+                if selected is not None and id(unit) not in selected:
+                    continue
+
+                if pool == "applications":
+
+                    journal_key = self._journal_key(unit)
+                    if journal_key and self._journal.converged(*journal_key):
+                        self._skip(
+                            unit=unit,
+                            message=f"{unit.name} --> no needs to be updated (unchanged since last sync).",
+                            plan_only=plan_only
+                        )
+                        for _ in unit.items:
+                            Metrics.count_item(unit.additionally.get("distributor"), ItemCase.IGNORE)
+                        continue
+
+                    cases = []
 
                     for item in unit.items:
-                        # Creates Unit context for self._run.app_unit_install().
+                        # Creates Unit context for self._inventory.contains().
                         unit_context = {
                             "package": item,
                             "distributor": unit.additionally.get("distributor")
@@ -48,40 +105,46 @@ class StateManager:
                         # Gets desired unit state.
                         needs_to_be_presented = unit.additionally.get("presented")
 
-                        # Gets actual unit state.
+                        # Gets actual unit state from the distributor inventory.
                         try:
-                            presented = self._run.app_item_installation_check(unit_context)
+                            presented = self._inventory.contains(unit_context)
                         except RuntimeError:
                             raise
 
                         if not presented and needs_to_be_presented:
                             message = f"{unit.name} ({item}) --> will be installed."
-                            case = "to_install"
+                            case = ItemCase.TO_INSTALL
                             level = "warning"
 
                         elif not needs_to_be_presented and presented:
                             message = f"{unit.name} ({item}) --> will be removed."
-                            case = "to_remove"
+                            case = ItemCase.TO_REMOVE
                             level = "warning"
 
                         else:
                             message = f"{unit.name} ({item}) --> no needs to be updated."
-                            case = "ignore"
+                            case = ItemCase.IGNORE
                             level = "info"
 
+                        cases.append(case)
+                        Metrics.count_item(unit_context.get("distributor"), case)
+
                         if plan_only:
                             self._console.log(
                                 level=level,
                                 message=message
                             )
-                        else:
-                            unit.set_item_sync_case(
-                                item=item,
-                                case=case
-                            )
+                        unit.set_item_sync_case(
+                            item=item,
+                            case=case
+                        )
+
+                    if journal_key and all(case == ItemCase.IGNORE for case in cases):
+                        self._journal.record(*journal_key)
 
-                if pool.get("name") == "commands":
+                if pool == "commands":
 
+                    # Commands have no observed state, so groups are never skipped by the journal.
                     if unit.additionally.get("execute"):
                         message = f"{unit.name} (commands) --> will be executed."
                         level = "warning"
@@ -97,20 +160,86 @@ class StateManager:
 
         return stack
 
+    def invalidate(self, distributor: str) -> None:
+        """Drops the distributor inventory, so the next sync queries it again (see Inventory.invalidate)."""
+        self._inventory.invalidate(distributor)
+
+    def _journal_key(self, unit: Application) -> tuple[str, int | None] | None:
+        """Returns application digest and the inventory generation of its distributor.
+
+        Parameters
+        ----------
+        unit: Application
+            Application unit.
+
+        Returns
+        ----------
+        tuple[str, int | None] | None
+            Journal key or 'None' when the journal is not used.
+        """
+        if self._journal is None:
+            return None
+
+        try:
+            generation = self._inventory.generation(unit.additionally.get("distributor"))
+        except RuntimeError:
+            # Distributor failure is raised by the probe with the package context.
+            return None
+        return unit.digest(), generation
+
+    def _skip(self, unit, message: str, plan_only: bool) -> None:
+        """Marks all unit items as not needed to be updated.
+
+        Parameters
+        ----------
+        unit: Application | Command
+            Stack unit.
+        message: str
+            Plan message.
+        plan_only: bool
+            'True' for console output.
+        """
+        if plan_only:
+            self._console.log(
+                level="info",
+                message=message
+            )
+        for item in unit.items:
+            unit.set_item_sync_case(
+                item=item,
+                case=ItemCase.IGNORE
+            )
+
 
 class SyncManager:
     """Manages stack synchronization with OS."""
 
-    def __init__(self):
-        self._run = CommandRunner()
+    def __init__(self, options: RunOptions = None, transport=None):
+        self._options = options or RunOptions()
+        # Native backends change this host only.
+        self._backends = native_backends() if transport is None else {}
+        self._transport = transport
+        self._run = self._runner()
+        self._scheduler = LaneScheduler()
+        # Distributors with at least one successful removing (their cleanup is deferred).
+        self._removed: set[str] = set()
         self._console = Console()
 
-    def state_from(self, stack: list[dict]) -> None:
+    def _runner(self, lane: str = None) -> 'AsyncCommandRunner':
+        """Returns runner of the lane (output is prefixed with the lane name)."""
+        return AsyncCommandRunner(
+            prefix=lane,
+            persistent_shell=self._options.persistent_shell,
+            backends=self._backends,
+            transport=self._transport
+        )
+
+    def state_from(self, stack: Stack) -> None:
         """Manages synchronization flows based on update case.
 
         Parameters
         ----------
-        stack: list[dict]
+        stack: Stack
             Stack of all pools.
 
         Raises
@@ -119,91 +248,415 @@ class SyncManager:
             From Application: When distributor failure or command executed with error.
             From Commands: When executing failed.
         """
-        for pool in stack:
-            for unit in pool.get("units"):
+        asyncio.run(self._state_from(stack))
 
-                if isinstance(unit, Application):
+        self._console.log(
+            level="info",
+            message="DONE"
+        )
 
-                    packages = unit.items
+    async def _state_from(self, stack: Stack) -> None:
+        """Synchronizes every unit once its dependencies are done inside one event loop,
+        then cleans up distributors after removings (also when a unit failed).
+        Packages to install are downloaded ahead (see SyncManager._prefetch).
 
-                    for package, update_case in packages.items():
-                        # Creates Unit context for self._run.app_unit_install().
-                        unit_context = {
-                            "package": package,
-                            "distributor": unit.additionally.get("distributor"),
-                            "classic": unit.additionally.get("classic")
+        Parameters
+        ----------
+        stack: Stack
+            Stack of all pools.
+
+        Raises
+        ----------
+        RuntimeError
+            From Application: When distributor failure or command executed with error.
+            From Commands: When executing failed.
+            From UnitGraph: When units dependencies are invalid.
+        """
+        self._removed = set()
+
+        try:
+            await self._apply_graph(UnitGraph(stack))
+        except RuntimeError:
+            try:
+                await self._cleanup()
+            except RuntimeError as error:
+                self._console.log(
+                    level="error",
+                    message=f"{repr(error)} --> Cleanup failed."
+                )
+            raise
+
+        await self._cleanup()
+
+    def _prefetch(
+            self,
+            graph: UnitGraph,
+            dependencies: list[set[int]],
+            lanes: list[str | None]
+    ) -> dict[int, int]:
+        """Adds download node of every application with packages to install.
+
+        Download waits only for the commands groups the application depends on
+        (e.g. the group adding its repository), so it runs while earlier units are applied.
+        Download lane of a distributor shares its lock domain, so downloads never run
+        with changes of their distributor; installation waits for its download.
+
+        Parameters
+        ----------
+        graph: UnitGraph
+            Dependency graph of the stack.
+        dependencies: list[set[int]]
+            Dependencies of every node, download nodes are added.
+        lanes: list[str | None]
+            Lane of every node, download nodes are added.
+
+        Returns
+        ----------
+        dict[int, int]
+            Download node with its application node.
+        """
+        units = graph.units()
+        nodes = {id(unit): node for node, unit in enumerate(units)}
+        # Commands groups every unit depends on (transitively), in dependency order.
+        groups: dict[int, set[int]] = {}
+        for wave in graph.waves():
+            for unit in wave:
+                node = nodes[id(unit)]
+                groups[node] = {
+                    dependency for dependency in dependencies[node] if isinstance(units[dependency], Command)
+                }.union(*(groups[dependency] for dependency in dependencies[node]))
+
+        downloads = {}
+        for node, unit in enumerate(units):
+            distributor = unit.additionally.get("distributor")
+            backend = self._backends.get(distributor)
+            if not isinstance(unit, Application) or distributor not in self._run.DOWNLOAD \
+                    or (backend is not None and backend.can_change()) \
+                    or ItemCase.TO_INSTALL not in unit.items.values():
+                continue
+
+            download = len(lanes)
+            lanes.append(f"{distributor} download")
+            dependencies.append(groups[node])
+            dependencies[node].add(download)
+            downloads[download] = node
+
+        return downloads
+
+    async def _download(self, units: list[Application], run: 'AsyncCommandRunner') -> None:
+        """Downloads packages the applications install, a failed download is left to the installation.
+
+        Parameters
+        ----------
+        units: list[Application]
+            Applications of one distributor.
+        run: AsyncCommandRunner
+            Runner of the download lane.
+        """
+        distributor = units[0].additionally.get("distributor")
+        packages = list(dict.fromkeys(
+            package for unit in units for package, case in unit.items.items() if case == ItemCase.TO_INSTALL
+        ))
+
+        self._console.log(
+            level="info",
+            message=f"{run.prefix}{distributor} ({", ".join(packages)}) --> Download starts:"
+        )
+        try:
+            with Tracer.span("download", distributor=distributor, packages=packages):
+                await run.app_items_download(context={"distributor": distributor, "packages": packages})
+        except RuntimeError as error:
+            self._console.log(
+                level="warning",
+                message=f"{run.prefix}{repr(error)} --> Packages are downloaded by the installation."
+            )
+
+    async def _cleanup(self) -> None:
+        """Runs cleanup once per distributor with successful removings, distributors concurrently.
+
+        Raises
+        ----------
+        RuntimeError
+            The first cleanup error.
+        """
+        distributors = sorted(
+            distributor for distributor in self._removed
+            if self._run.CLEANUP.get(distributor)
+        )
+        self._removed = set()
+
+        jobs = {}
+        for distributor in distributors:
+            run = self._runner(distributor) if len(distributors) > 1 else self._run
+
+            jobs[distributor] = [lambda distributor=distributor, run=run: self._clean(distributor, run)]
+
+        await self._scheduler.run(jobs, workers=self._options.workers)
+
+    async def _clean(self, distributor: str, run: 'AsyncCommandRunner') -> None:
+        """Runs cleanup of the distributor.
+
+        Raises
+        ----------
+        RuntimeError
+            When command executed with error.
+        """
+        self._console.log(
+            level="warning",
+            message=f"{run.prefix}{distributor} --> Cleanup starts:"
+        )
+
+        with Tracer.span("cleanup", distributor=distributor):
+            await run.app_cleanup(distributor)
+
+    async def _execute_group(self, unit: Command, run: 'AsyncCommandRunner') -> None:
+        """Executes commands group.
+
+        Parameters
+        ----------
+        unit: Command
+            Commands group.
+        run: AsyncCommandRunner
+            Runner of the group lane.
+
+        Raises
+        ----------
+        RuntimeError
+            When executing failed.
+        """
+        self._console.log(
+            level="warning",
+            message=f"{run.prefix}{unit.name} (commands) --> Executing starts:"
+        )
+
+        try:
+            with Tracer.span("commands", group=unit.name):
+                await run.commands_execute(
+                    item=unit.name,
+                    commands=unit.items
+                )
+        except RuntimeError:
+            raise
+
+    @staticmethod
+    def _transactions_from(units: list) -> list[dict]:
+        """Groups application items by update case, distributor and flags.
+
+        Parameters
+        ----------
+        units: list
+            Pool units.
+
+        Returns
+        ----------
+        list[dict]
+            Transactions contexts. Removals go before installations,
+            every classic snap is installed with its own transaction.
+        """
+        transactions = {}
+
+        for case in (ItemCase.TO_REMOVE, ItemCase.TO_INSTALL):
+            for unit in units:
+                if not isinstance(unit, Application):
+                    continue
+
+                distributor = unit.additionally.get("distributor")
+                # Only snap installation depends on the '--classic' flag.
+                classic = unit.additionally.get("classic") if distributor == "snap" else None
+
+                for package, update_case in unit.items.items():
+                    if update_case != case:
+                        continue
+
+                    # snap installs classic snaps one by one (mode flags need a single snap name).
+                    key = (case, distributor, classic, package if classic and case == ItemCase.TO_INSTALL else None)
+                    transaction = transactions.setdefault(
+                        key,
+                        {
+                            "case": case,
+                            "distributor": distributor,
+                            "classic": classic,
+                            "packages": [],
+                            # Cleanup runs once after all removings (see SyncManager._cleanup).
+                            **({"deferred_cleanup": True} if case == ItemCase.TO_REMOVE else {})
                         }
+                    )
+                    if package not in transaction["packages"]:
+                        transaction["packages"].append(package)
+
+        return list(transactions.values())
 
-                        match update_case:
-                            case "to_install":
-                                self._console.log(
-                                    level="warning",
-                                    message=f"{unit.name} ({package}) --> Installation starts:"
-                                )
-                                try:
-                                    self._run.app_item_install(
-                                        context=unit_context
-                                    )
-                                except RuntimeError:
-                                    raise
-                            case "to_remove":
-                                self._console.log(
-                                    level="warning",
-                                    message=f"{unit.name} ({package}) --> Removing starts:"
-                                )
-                                try:
-                                    self._run.app_item_remove(
-                                        context=unit_context
-                                    )
-                                except RuntimeError:
-                                    raise
-                            case _:
-                                pass
+    async def _apply_graph(self, graph: UnitGraph) -> None:
+        """Applies every unit once its dependencies are done (see LaneScheduler.run_ready).
 
+        Application items run in one lane per distributor (distributors have their own locks),
+        applications of a distributor ready at once are applied with the same transactions.
+        Every commands group runs in its own lane. Lanes are limited by the workers option.
+        While several lanes are used, output of each lane is prefixed with the lane name.
+        Downloads run in lanes of their own, they are cancelled after a failure.
+
+        Parameters
+        ----------
+        graph: UnitGraph
+            Dependency graph of the stack.
+
+        Raises
+        ----------
+        RuntimeError
+            The first error from any lane.
+        """
+        units = graph.units()
+        dependencies = graph.dependencies()
+        lanes = [self._lane(unit) for unit in units]
+        changes = {lane for lane in lanes if lane is not None}
+        downloads = self._prefetch(graph, dependencies, lanes) if self._options.prefetch else {}
+
+        runners = {}
+        for lane in dict.fromkeys(lanes):
+            if lane is not None:
+                # Downloads are always prefixed.
+                runners[lane] = self._runner(lane) if len(changes) > 1 or lane not in changes else self._run
+
+        async def job(lane: str, nodes: list[int]) -> None:
+            if nodes[0] in downloads:
+                await self._download([units[downloads[node]] for node in nodes], runners[lane])
+                return
+
+            ready = [units[node] for node in nodes]
+            for transaction in self._transactions_from(ready):
+                await self._apply(transaction, runners[lane])
+            for unit in ready:
                 if isinstance(unit, Command):
+                    await self._execute_group(unit, runners[lane])
+
+        await self._scheduler.run_ready(
+            dependencies,
+            lanes,
+            job,
+            workers=self._options.workers,
+            # Download lane shares the lock of its distributor lane.
+            domains={lanes[node]: lanes[downloads[node]] for node in downloads},
+            cancellable={lanes[node] for node in downloads}
+        )
 
-                    if unit.additionally.get("execute"):
-                        self._console.log(
-                            level="warning",
-                            message=f"{unit.name} (commands) --> Executing starts:"
-                        )
+    @staticmethod
+    def _lane(unit) -> str | None:
+        """Returns lane of the unit (distributor, commands group name), 'None' when it has nothing to apply."""
+        if isinstance(unit, Command):
+            return unit.name if unit.additionally.get("execute") else None
+        if any(case in (ItemCase.TO_INSTALL, ItemCase.TO_REMOVE) for case in unit.items.values()):
+            return unit.additionally.get("distributor")
+        return None
 
-                        try:
-                            self._run.commands_execute(
-                                item=unit.name,
-                                commands=unit.items
-                            )
-                        except RuntimeError:
-                            raise
+    async def _apply(self, transaction: dict, run: 'AsyncCommandRunner') -> None:
+        """Applies transaction, bisects it on failure to find the failing package.
 
+        Parameters
+        ----------
+        transaction: dict
+            Transaction context.
+        run: AsyncCommandRunner
+            Runner of the transaction lane.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor failure or command executed with error.
+        """
+        packages = transaction.get("packages")
+        action = {
+            "to_install": ("install", "Installation", run.app_items_install),
+            "to_remove": ("remove", "Removing", run.app_items_remove)
+        }
+        span, title, execute = action[transaction.get("case")]
 
         self._console.log(
-            level="info",
-            message="DONE"
+            level="warning",
+            message=f"{run.prefix}{transaction.get("distributor")} ({", ".join(packages)}) --> {title} starts:"
         )
 
+        with Tracer.span(span, distributor=transaction.get("distributor"), packages=packages):
+            try:
+                await execute(context=transaction)
+                if transaction.get("case") == "to_remove":
+                    self._removed.add(transaction.get("distributor"))
+            except RuntimeError as error:
+                # Bisection stops after failure in another lane too.
+                if len(packages) == 1 or self._scheduler.stopped:
+                    raise
+
+                self._console.log(
+                    level="warning",
+                    message=f"{run.prefix}{repr(error)} --> Splitting transaction to find the failing package."
+                )
+                middle = len(packages) // 2
+                for part in (packages[:middle], packages[middle:]):
+                    await self._apply({**transaction, "packages": part}, run)
+
 
 class CommandRunner:
     """Defines and execute commands."""
 
-    def __init__(self):
+    # Removes what is left unused after packages removing (dependencies, runtimes).
+    CLEANUP = {
+        "apt": ["sudo apt autoremove -y"],
+        "flatpak": ["sudo flatpak uninstall -y --unused"]
+    }
+    # Downloads packages into the distributor cache without installing them.
+    # snap is not here: snapd installs only what it downloads itself.
+    DOWNLOAD = {
+        "apt": "sudo apt-get install --download-only {packages} -y",
+        "flatpak": "sudo flatpak install --no-deploy flathub {packages} -y"
+    }
+
+    def __init__(
+            self,
+            prefix: str = None,
+            persistent_shell: bool = False,
+            backends: dict = None,
+            transport=None
+    ):
+        # Lane name, output of AsyncCommandRunner is logged with it as the prefix.
+        self._prefix = prefix
+        # When set, commands of a group are executed by one long-lived shell.
+        self._persistent_shell = persistent_shell
+        # Native inventory backends by distributor, used instead of the distributor CLI while available.
+        self._backends = backends or {}
+        # When set, commands are executed on the remote host of the transport (see transports).
+        self._transport = transport
+        self._console = Console()
         self._map = {
             "apt": {
                 "check": "dpkg -l | grep",
+                "inventory": "dpkg-query -W -f='${Package} ${Status}\\n'",
                 "install": "apt install"
             },
             "snap": {
                 "check": "snap list",
+                "inventory": "snap list",
                 "install": "snap install"
             },
             "flatpak": {
                 "check": "flatpak list | grep",
+                "inventory": "flatpak list --columns=application",
                 "install": "flatpak install flathub"
             }
         }
 
-    @staticmethod
-    def _execute(item: str, commands: list[str]) -> bool:
+    @property
+    def prefix(self) -> str:
+        """Returns output prefix ('[lane] ') or empty string."""
+        return f"[{self._prefix}] " if self._prefix else ""
+
+    def _remote(self, command: str) -> str:
+        """Returns command that runs the command on the transport host (the command itself locally)."""
+        return self._transport.wrap(command) if self._transport else command
+
+    def _shell(self) -> 'ShellWorker':
+        """Returns long-lived shell (on the transport host)."""
+        return ShellWorker(self._transport.shell() if self._transport else None)
+
+    def _execute(self, item: str, commands: list[str]) -> bool:
         """Execute shell commands.
 
         Parameters
@@ -224,13 +677,15 @@ class CommandRunner:
             When command executed with error.
         """
         for command in commands:
-            process = subprocess.run(
-                args=command,
-                shell=True,
-                check=False
-            )
-            if process.returncode != 0:
-                raise RuntimeError(f"{item} --> Error code: '{process.returncode}' ({process.args})")
+            with Tracer.span("command", item=item, command=command):
+                process = subprocess.run(
+                    args=self._remote(command),
+                    shell=True,
+                    check=False
+                )
+                # Raised inside the span, so the span records the failure.
+                if process.returncode != 0:
+                    raise RuntimeError(f"{item} --> Error code: '{process.returncode}' ({process.args})")
         return True
 
     def app_item_installation_check(self, context: dict) -> bool:
@@ -251,14 +706,11 @@ class CommandRunner:
         RuntimeError
             When distributor failure.
         """
-        if context["distributor"] not in self._map:
-            raise RuntimeError(
-                f"{context.get("package")} --> Distributor '{context.get("distributor")}' not supported yet."
-            )
+        backend = self._backend(context.get("distributor"))
+        if backend is not None:
+            return context.get("package") in backend.inventory()
 
-        command_to_execute = [
-            f"{self._map[context["distributor"]]["check"]} {context["package"]} > /dev/null 2>&1"
-        ]
+        command_to_execute = [self._remote(self._check_command(context))]
         process = subprocess.run(
             args=command_to_execute,
             shell=True,
@@ -268,6 +720,113 @@ class CommandRunner:
             return False
         return True
 
+    def _check_command(self, context: dict) -> str:
+        """Returns package check command.
+
+        Parameters
+        ----------
+        context : dict
+            Unit context.
+
+        Returns
+        -------
+        str
+            Command that succeeds if the package is installed.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor not supported.
+        """
+        if context["distributor"] not in self._map:
+            raise RuntimeError(
+                f"{context.get("package")} --> Distributor '{context.get("distributor")}' not supported yet."
+            )
+
+        return f"{self._map[context["distributor"]]["check"]} {context["package"]} > /dev/null 2>&1"
+
+    def _backend(self, distributor: str):
+        """Returns native inventory backend of the distributor or 'None' when it is not available."""
+        backend = self._backends.get(distributor)
+        if backend is not None and backend.available():
+            return backend
+        return None
+
+    def app_inventory(self, distributor: str) -> set[str]:
+        """Queries all installed packages of the distributor at once.
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+
+        Returns
+        -------
+        set[str]
+            Names of installed packages.
+            Empty if the distributor query failed (e.g. distributor is absent in OS).
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor not supported or native backend failure.
+        """
+        if distributor not in self._map:
+            raise RuntimeError(f"Distributor '{distributor}' not supported yet.")
+
+        backend = self._backend(distributor)
+        if backend is not None:
+            return backend.inventory()
+
+        process = subprocess.run(
+            args=self._remote(self._map[distributor]["inventory"]),
+            shell=True,
+            check=False,
+            capture_output=True,
+            text=True
+        )
+        if process.returncode != 0:
+            return set()
+
+        return self._parse_inventory(distributor, process.stdout)
+
+    @staticmethod
+    def _parse_inventory(distributor: str, output: str) -> set[str]:
+        """Parses output of the distributor inventory query.
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+        output : str
+            Query output.
+
+        Returns
+        -------
+        set[str]
+            Names of installed packages.
+        """
+        installed = set()
+
+        for line in output.splitlines():
+            fields = line.split()
+            if not fields:
+                continue
+
+            match distributor:
+                case "apt":
+                    # Package name and 'Status' (want, error flag, status) fields.
+                    if len(fields) == 4 and fields[3] == "installed":
+                        installed.add(fields[0])
+                case "snap":
+                    # Skips table header.
+                    if fields[0] != "Name":
+                        installed.add(fields[0])
+                case "flatpak":
+                    installed.add(fields[0])
+
+        return installed
+
     def app_item_install(self, context: dict) -> bool:
         """Prepares commands for Application unit installation
         and transmit it to execute method.
@@ -287,35 +846,111 @@ class CommandRunner:
         RuntimeError
             When distributor failure or command executed with error
         """
+        return self.app_items_install(
+            context={**context, "packages": [context.get("package")]}
+        )
+
+    def app_items_install(self, context: dict) -> bool:
+        """Prepares one installation transaction for several packages
+        and transmit it to execute method.
+
+        Parameters
+        ----------
+        context : dict
+            Transaction context ('packages' of one distributor).
+
+        Returns
+        -------
+        bool
+            Is installation command executed successfully or not.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor failure or command executed with error
+        """
+        try:
+            self._execute(
+                item=" ".join(context.get("packages")),
+                commands=self._install_commands(context)
+            )
+        except RuntimeError:
+            raise
+        return True
+
+    def _install_commands(self, context: dict) -> list[str]:
+        """Returns installation commands of the transaction.
+
+        Parameters
+        ----------
+        context : dict
+            Transaction context ('packages' of one distributor).
+
+        Returns
+        -------
+        list[str]
+            Commands to execute.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor not supported.
+        """
         commands_to_execute = []
+        packages = " ".join(context.get("packages"))
 
         match context.get("distributor"):
             case "apt":
                 commands_to_execute.append(
-                    f"sudo {self._map["apt"]["install"]} {context.get("package")} -y"
+                    f"sudo {self._map["apt"]["install"]} {packages} -y"
                 )
             case "flatpak":
                 commands_to_execute.append(
-                    f"sudo {self._map["flatpak"]["install"]} {context.get("package")} -y"
+                    f"sudo {self._map["flatpak"]["install"]} {packages} -y"
                 )
             case "snap":
-                command = f"sudo {self._map["snap"]["install"]} {context.get("package")}"
                 if context.get("classic"):
-                    command += " --classic"
-                commands_to_execute.append(command)
+                    # Mode flags need a single snap name.
+                    commands_to_execute.extend(
+                        f"sudo {self._map["snap"]["install"]} {package} --classic"
+                        for package in context.get("packages")
+                    )
+                else:
+                    commands_to_execute.append(f"sudo {self._map["snap"]["install"]} {packages}")
             case _:
                 raise RuntimeError(
-                    f"{context.get("package")} --> Distributor '{context.get("distributor")}' not supported yet."
+                    f"{packages} --> Distributor '{context.get("distributor")}' not supported yet."
                 )
 
-        try:
-            self._execute(
-                item=context.get("package"),
-                commands=commands_to_execute
-            )
-        except RuntimeError:
-            raise
-        return True
+        return commands_to_execute
+
+    def app_items_download(self, context: dict) -> bool:
+        """Downloads packages of one transaction, so their installation
+        doesn't download them (see CommandRunner.DOWNLOAD).
+
+        Parameters
+        ----------
+        context : dict
+            Transaction context ('packages' of one distributor).
+
+        Returns
+        -------
+        bool
+            Is command executed successfully or not ('True' when distributor has no download).
+
+        Raises
+        ----------
+        RuntimeError
+            When command executed with error.
+        """
+        command = self.DOWNLOAD.get(context.get("distributor"))
+        if command is None:
+            return True
+
+        return self._execute(
+            item=" ".join(context.get("packages")),
+            commands=[command.format(packages=" ".join(context.get("packages")))]
+        )
 
     def app_item_remove(self, context: dict) -> bool:
         """Prepares commands for Application unit removing
@@ -336,43 +971,116 @@ class CommandRunner:
         RuntimeError
             When distributor failure or command executed with error.
         """
+        return self.app_items_remove(
+            context={**context, "packages": [context.get("package")]}
+        )
+
+    def app_items_remove(self, context: dict) -> bool:
+        """Prepares one removing transaction for several packages
+        and transmit it to execute method.
+
+        Parameters
+        ----------
+        context : dict
+            Transaction context ('packages' of one distributor).
+
+        Returns
+        ----------
+        bool
+            Is command executed successfully or not.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor failure or command executed with error.
+        """
+        try:
+            self._execute(
+                item=" ".join(context.get("packages")),
+                commands=self._remove_commands(context)
+            )
+        except RuntimeError:
+            raise
+        return True
+
+    @staticmethod
+    def _remove_commands(context: dict) -> list[str]:
+        """Returns removing commands of the transaction.
+
+        Parameters
+        ----------
+        context : dict
+            Transaction context ('packages' of one distributor).
+            Cleanup commands are skipped with 'deferred_cleanup'
+            (see CommandRunner.app_cleanup).
+
+        Returns
+        -------
+        list[str]
+            Commands to execute.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor not supported.
+        """
         commands_to_execute = []
+        packages = " ".join(context.get("packages"))
 
         match context.get("distributor"):
             case "apt":
                 commands_to_execute.append(
-                    f"sudo apt purge {context.get("package")} -y"
-                )
-                commands_to_execute.append(
-                    "sudo apt autoremove -y"
+                    f"sudo apt purge {packages} -y"
                 )
             case "flatpak":
+                for package in context.get("packages"):
+                    commands_to_execute.append(
+                        f"sudo flatpak kill {package}"
+                    )
                 commands_to_execute.append(
-                    f"sudo flatpak kill {context.get("package")}"
-                )
-                commands_to_execute.append(
-                    f"sudo flatpak uninstall -v -y --force-remove --delete-data flathub {context.get("package")}"
-                )
-                commands_to_execute.append(
-                    "sudo flatpak uninstall -y --unused"
+                    f"sudo flatpak uninstall -v -y --force-remove --delete-data flathub {packages}"
                 )
             case "snap":
                 commands_to_execute.append(
-                    f"sudo snap remove --purge {context.get("package")}"
+                    f"sudo snap remove --purge {packages}"
                 )
             case _:
                 raise RuntimeError(
-                    f"{context.get("package")} --> Distributor '{context.get("distributor")}' not supported yet."
+                    f"{packages} --> Distributor '{context.get("distributor")}' not supported yet."
                 )
 
-        try:
-            self._execute(
-                item=context.get("package"),
-                commands=commands_to_execute
-            )
-        except RuntimeError:
-            raise
-        return True
+        if not context.get("deferred_cleanup"):
+            commands_to_execute.extend(CommandRunner.CLEANUP.get(context.get("distributor"), []))
+
+        return commands_to_execute
+
+    def app_cleanup(self, distributor: str) -> bool:
+        """Removes what is left unused after packages removing
+        (once after several transactions with 'deferred_cleanup').
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+
+        Returns
+        ----------
+        bool
+            Is command executed successfully or not ('True' when distributor has no cleanup).
+
+        Raises
+        ----------
+        RuntimeError
+            When command executed with error.
+        """
+        commands = self.CLEANUP.get(distributor)
+        if not commands:
+            return True
+
+        return self._execute(
+            item=f"{distributor} cleanup",
+            commands=commands
+        )
 
     def commands_execute(self, item: str, commands: dict[str, str]) -> bool:
         """Prepares commands for execution.
@@ -399,11 +1107,306 @@ class CommandRunner:
         for command in commands:
             commands_to_execute.append(command)
 
+        execute = self._execute_in_shell if self._persistent_shell else self._execute
+
         try:
-            self._execute(
+            execute(
                 item=item,
                 commands=commands_to_execute
             )
         except RuntimeError:
             raise
         return True
+
+    def _execute_in_shell(self, item: str, commands: list[str]) -> bool:
+        """Execute shell commands with one persistent shell.
+
+        Parameters
+        ----------
+        item: str
+            The name of the item on which the operation is performed.
+        commands: list[str]
+            List of commands that will be executed.
+
+        Returns
+        ----------
+        bool
+            Returns result (is command executed successfully or not).
+
+        Raises
+        ----------
+        RuntimeError
+            When command executed with error.
+        """
+        with self._shell() as shell:
+            for command in commands:
+                with Tracer.span("command", item=item, command=command):
+                    returncode, _ = shell.run(
+                        command=command,
+                        on_line=self._output
+                    )
+                    if returncode != 0:
+                        raise RuntimeError(f"{item} --> Error code: '{returncode}' ({command})")
+        return True
+
+    def _output(self, line: str) -> None:
+        """Shows captured command output line (see AsyncCommandRunner._output)."""
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+class AsyncCommandRunner(CommandRunner):
+    """Defines and execute commands without blocking an event loop.
+
+    Commands are the same as in CommandRunner, stdout and stderr
+    of every process are streamed line by line into the log.
+    """
+
+    # Bytes read from command output at once (and the longest logged line part).
+    OUTPUT_CHUNK = 65536
+
+    async def _execute(self, item: str, commands: list[str]) -> bool:
+        """Execute shell commands.
+
+        Parameters
+        ----------
+        item: str
+            The name of the item on which the operation is performed.
+        commands: list[str]
+            List of commands that will be executed.
+
+        Returns
+        ----------
+        bool
+            Returns result (is command executed successfully or not).
+
+        Raises
+        ----------
+        RuntimeError
+            When command executed with error.
+        """
+        for command in commands:
+            with Tracer.span("command", item=item, command=command):
+                returncode = await self._stream(command)
+                if returncode != 0:
+                    raise RuntimeError(f"{item} --> Error code: '{returncode}' ({command})")
+        return True
+
+    async def _stream(self, command: str, quiet: bool = False) -> int:
+        """Executes shell command, logs its output while it runs.
+
+        Parameters
+        ----------
+        command: str
+            Command that will be executed.
+        quiet: bool
+            Discards output instead of logging.
+
+        Returns
+        ----------
+        int
+            Exit code.
+        """
+        output = asyncio.subprocess.DEVNULL if quiet else asyncio.subprocess.PIPE
+        process = await asyncio.create_subprocess_exec(
+            "/bin/sh", "-c", self._remote(command),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=output,
+            stderr=output
+        )
+        try:
+            if not quiet:
+                try:
+                    await asyncio.gather(
+                        self._log_stream(process.stdout, level="info"),
+                        self._log_stream(process.stderr, level="warning")
+                    )
+                except (OSError, ValueError) as error:
+                    self._console.log(
+                        level="error",
+                        message=f"{self.prefix}{repr(error)} --> Output of '{command}' can't be read."
+                    )
+                    # Output is discarded until the process exits, the caller reports it as a failure.
+                    await asyncio.gather(self._discard(process.stdout), self._discard(process.stderr))
+                    return await process.wait() or 1
+            return await process.wait()
+        except asyncio.CancelledError:
+            # Cancelled command (e.g. download after a failed wave) doesn't outlive the run.
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+            raise
+
+    def _output(self, line: str) -> None:
+        """Logs captured command output line (persistent shell)."""
+        self._console.log(
+            level="info",
+            message=f"{self.prefix}{line.rstrip()}"
+        )
+
+    async def _log_stream(self, stream: 'asyncio.StreamReader', level: str) -> None:
+        """Logs stream lines with the runner prefix.
+
+        Stream is read by chunks, so lines are not limited by the StreamReader buffer,
+        a line longer than 'OUTPUT_CHUNK' is logged in parts.
+        """
+        pending = b""
+        while chunk := await stream.read(self.OUTPUT_CHUNK):
+            *lines, pending = (pending + chunk).split(b"\n")
+            if len(pending) >= self.OUTPUT_CHUNK:
+                lines.append(pending)
+                pending = b""
+            for line in lines:
+                self._log_line(line, level)
+        if pending:
+            self._log_line(pending, level)
+
+    async def _discard(self, stream: 'asyncio.StreamReader') -> None:
+        """Reads stream to the end without logging."""
+        while await stream.read(self.OUTPUT_CHUNK):
+            pass
+
+    def _log_line(self, line: bytes, level: str) -> None:
+        """Logs output line with the runner prefix."""
+        self._console.log(
+            level=level,
+            message=f"{self.prefix}{line.decode("utf-8", errors="replace").rstrip()}"
+        )
+
+    async def app_item_installation_check(self, context: dict) -> bool:
+        """Checks if a package is installed on the system.
+
+        Parameters
+        ----------
+        context : dict
+            Unit context.
+
+        Returns
+        -------
+        bool
+            Is package present in OS or not.
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor failure.
+        """
+        backend = self._backend(context.get("distributor"))
+        if backend is not None:
+            return context.get("package") in backend.inventory()
+
+        return await self._stream(self._check_command(context), quiet=True) == 0
+
+    async def app_inventory(self, distributor: str) -> set[str]:
+        """Queries all installed packages of the distributor at once.
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+
+        Returns
+        -------
+        set[str]
+            Names of installed packages.
+            Empty if the distributor query failed (e.g. distributor is absent in OS).
+
+        Raises
+        ----------
+        RuntimeError
+            When distributor not supported.
+        """
+        if distributor not in self._map:
+            raise RuntimeError(f"Distributor '{distributor}' not supported yet.")
+
+        backend = self._backend(distributor)
+        if backend is not None:
+            return backend.inventory()
+
+        process = await asyncio.create_subprocess_exec(
+            "/bin/sh", "-c", self._remote(self._map[distributor]["inventory"]),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            return set()
+
+        return self._parse_inventory(distributor, stdout.decode("utf-8", errors="replace"))
+
+    async def app_item_install(self, context: dict) -> bool:
+        """Installs one package (see CommandRunner.app_item_install)."""
+        return await self.app_items_install(
+            context={**context, "packages": [context.get("package")]}
+        )
+
+    async def app_items_install(self, context: dict) -> bool:
+        """Installs packages with one transaction (see CommandRunner.app_items_install).
+
+        Native backend installs packages without the distributor CLI when it can.
+        """
+        backend = self._backend(context.get("distributor"))
+        if backend is not None and backend.can_change():
+            await backend.install(context.get("packages"), classic=bool(context.get("classic")))
+            self._output(f"{" ".join(context.get("packages"))} --> Installed by {context.get("distributor")} API.")
+            return True
+
+        return await self._execute(
+            item=" ".join(context.get("packages")),
+            commands=self._install_commands(context)
+        )
+
+    async def app_items_download(self, context: dict) -> bool:
+        """Downloads packages of one transaction (see CommandRunner.app_items_download)."""
+        command = self.DOWNLOAD.get(context.get("distributor"))
+        if command is None:
+            return True
+
+        return await self._execute(
+            item=" ".join(context.get("packages")),
+            commands=[command.format(packages=" ".join(context.get("packages")))]
+        )
+
+    async def app_item_remove(self, context: dict) -> bool:
+        """Removes one package (see CommandRunner.app_item_remove)."""
+        return await self.app_items_remove(
+            context={**context, "packages": [context.get("package")]}
+        )
+
+    async def app_items_remove(self, context: dict) -> bool:
+        """Removes packages with one transaction (see CommandRunner.app_items_remove).
+
+        Native backend removes packages without the distributor CLI when it can.
+        """
+        backend = self._backend(context.get("distributor"))
+        if backend is not None and backend.can_change():
+            await backend.remove(context.get("packages"))
+            self._output(f"{" ".join(context.get("packages"))} --> Removed by {context.get("distributor")} API.")
+            return True
+
+        return await self._execute(
+            item=" ".join(context.get("packages")),
+            commands=self._remove_commands(context)
+        )
+
+    async def app_cleanup(self, distributor: str) -> bool:
+        """Removes what is left unused (see CommandRunner.app_cleanup)."""
+        commands = self.CLEANUP.get(distributor)
+        if not commands:
+            return True
+
+        return await self._execute(
+            item=f"{distributor} cleanup",
+            commands=commands
+        )
+
+    async def commands_execute(self, item: str, commands: dict[str, str]) -> bool:
+        """Executes group commands (see CommandRunner.commands_execute)."""
+        if self._persistent_shell:
+            # Shell worker pipe is blocking, so it is served by a thread.
+            return await asyncio.to_thread(self._execute_in_shell, item, list(commands))
+        return await self._execute(
+            item=item,
+            commands=list(commands)
+        )
@@ -0,0 +1,131 @@
+"""Provides persistent shell functionality."""
+
+import os
+from collections.abc import Callable
+
+from helpers import LazyModule
+
+shlex = LazyModule("shlex")
+signal = LazyModule("signal")
+subprocess = LazyModule("subprocess")
+threading = LazyModule("threading")
+uuid = LazyModule("uuid")
+
+
+class ShellWorker:
+    """Long-lived shell that executes commands sent over a pipe.
+
+    Every command runs in a subshell with '/dev/null' as stdin,
+    so commands don't share 'cd', variables or 'exit' with each other
+    and can't read the next commands from the pipe. Command is passed
+    to 'eval' as one quoted word, so a syntax error is its exit code
+    instead of an unfinished script.
+    """
+
+    # Exit code of a command stopped by the timeout (as of timeout(1)).
+    TIMEOUT_CODE = 124
+
+    def __init__(self, argv: list[str] = None, timeout: float = None):
+        self._argv = argv or ["/bin/sh"]
+        # Seconds to wait for a command, the shell is stopped after it ('None' waits forever).
+        self._timeout = timeout
+        self._process = None
+        self._expired = False
+
+    def __enter__(self) -> 'ShellWorker':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Starts shell process."""
+        self._process = subprocess.Popen(
+            args=self._argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+            # Own process group, so the timeout stops the shell with the running command.
+            start_new_session=True
+        )
+
+    def close(self) -> None:
+        """Stops shell process."""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._process.wait()
+        self._process.stdout.close()
+        self._process = None
+
+    def run(self, command: str, on_line: Callable[[str], None] = None) -> tuple[int, list[str]]:
+        """Executes command in the shell.
+
+        Parameters
+        ----------
+        command: str
+            Command that will be executed.
+        on_line: Callable[[str], None]
+            Receives every output line as soon as it is read.
+
+        Returns
+        ----------
+        tuple[int, list[str]]
+            Exit code and output lines of the command
+            ('TIMEOUT_CODE' when it timed out, the shell can't be used after it).
+        """
+        # Marker separates command output from its exit code.
+        marker = f"__state_sync_{uuid.uuid4().hex}__"
+        output = []
+
+        try:
+            self._process.stdin.write(
+                f"( eval {shlex.quote(command)} ) < /dev/null 2>&1\nprintf '%s %d\\n' '{marker}' \"$?\"\n"
+            )
+            self._process.stdin.flush()
+        except BrokenPipeError:
+            return self._process.wait() or 1, output
+
+        timer = threading.Timer(self._timeout, self._expire) if self._timeout is not None else None
+        if timer:
+            timer.start()
+        try:
+            return self._read(marker, output, on_line)
+        finally:
+            if timer:
+                timer.cancel()
+
+    def _expire(self) -> None:
+        """Kills the shell with its commands, so their output is closed and reading stops."""
+        self._expired = True
+        try:
+            os.killpg(self._process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _read(self, marker: str, output: list[str], on_line: Callable[[str], None]) -> tuple[int, list[str]]:
+        """Reads command output until the marker with the exit code."""
+        for line in self._process.stdout:
+            position = line.find(marker)
+            if position < 0:
+                output.append(line)
+                if on_line:
+                    on_line(line)
+                continue
+
+            # Output without trailing newline is followed by the marker.
+            if position > 0:
+                output.append(line[:position])
+                if on_line:
+                    on_line(line[:position])
+            return int(line[position + len(marker):]), output
+
+        # Shell exited (or was killed by the timeout) before the command was finished.
+        code = self._process.wait()
+        return (self.TIMEOUT_CODE if self._expired else code or 1), output
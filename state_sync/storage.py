@@ -0,0 +1,402 @@
+"""Provides on-disk caches between StateSync runs."""
+
+import json
+import os
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from backends import DpkgStatus, FlatpakInstallations
+from helpers import LazyModule
+
+hashlib = LazyModule("hashlib")
+pickle = LazyModule("pickle")
+sqlite3 = LazyModule("sqlite3")
+
+
+def default_cache_dir() -> Path:
+    """Returns StateSync cache directory (XDG_CACHE_HOME aware)."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "state_sync"
+
+
+@contextmanager
+def connect(path: Path) -> Iterator['sqlite3.Connection']:
+    """Opens SQLite transaction.
+
+    Every call uses its own connection, so stores can be used from threads.
+    """
+    db = sqlite3.connect(path, timeout=30)
+    try:
+        with db:
+            yield db
+    finally:
+        db.close()
+
+
+def migrate(path: Path, version: int, schema: str) -> None:
+    """Creates store schema, drops data of another schema version."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with connect(path) as db:
+        if db.execute("PRAGMA user_version").fetchone()[0] != version:
+            db.executescript(f"{schema}\nPRAGMA user_version = {version};")
+
+
+def default_signals() -> dict[str, list[str]]:
+    """Returns state files of every distributor, they change with its inventory."""
+    return {
+        **InventoryStore.SIGNALS,
+        "apt": [str(DpkgStatus.default_path())],
+        "flatpak": [str(signal) for signal in FlatpakInstallations().signals()]
+    }
+
+
+def stamp(signals: list[str]) -> str:
+    """Returns inode, size and modification time of the state files ('None' for missing files).
+
+    Files are often replaced (new inode) or rewritten within one timestamp tick,
+    so the modification time alone may miss a change.
+    """
+    stamps = []
+    for signal in signals:
+        try:
+            info = os.stat(Path(signal).expanduser())
+            stamps.append([signal, info.st_ino, info.st_size, info.st_mtime_ns])
+        except OSError:
+            stamps.append([signal, None])
+    return json.dumps(stamps)
+
+
+class InventoryStore:
+    """Keeps installed packages of every distributor between runs.
+
+    Cached packages stay valid while the distributor state files are unchanged.
+    Apt packages are refreshed incrementally from 'dpkg.log',
+    other distributors (or unreadable apt log) are fully rescanned.
+    """
+
+    SIGNALS = {
+        "apt": [
+            "/var/lib/dpkg/status"
+        ],
+        "snap": [
+            "/var/lib/snapd/state.json"
+        ],
+        "flatpak": [
+            "/var/lib/flatpak/.changed",
+            "/var/lib/flatpak/app",
+            "/var/lib/flatpak/runtime",
+            "~/.local/share/flatpak/.changed",
+            "~/.local/share/flatpak/app",
+            "~/.local/share/flatpak/runtime"
+        ]
+    }
+    DPKG_LOG = "/var/log/dpkg.log"
+    VERSION = 1
+
+    def __init__(self, path: Path, signals: dict[str, list[str]] = None, dpkg_log: str = None):
+        self._path = Path(path)
+        self._signals = signals or default_signals()
+        self._dpkg_log = Path(dpkg_log or self.DPKG_LOG)
+
+        migrate(self._path, self.VERSION, """
+            DROP TABLE IF EXISTS distributors;
+            DROP TABLE IF EXISTS packages;
+            CREATE TABLE distributors (
+                name TEXT PRIMARY KEY,
+                stamp TEXT,
+                generation INTEGER,
+                log_inode INTEGER,
+                log_offset INTEGER
+            );
+            CREATE TABLE packages (
+                distributor TEXT,
+                name TEXT,
+                PRIMARY KEY (distributor, name)
+            ) WITHOUT ROWID;
+        """)
+
+    def _stamp(self, distributor: str) -> str:
+        """Returns stamp of the distributor state files."""
+        return stamp(self._signals.get(distributor, []))
+
+    def generation(self, distributor: str) -> int | None:
+        """Returns the number of changes seen in the distributor inventory.
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+
+        Returns
+        -------
+        int | None
+            Inventory generation or 'None' if the distributor was never loaded.
+        """
+        with connect(self._path) as db:
+            row = db.execute(
+                "SELECT generation FROM distributors WHERE name = ?", (distributor,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load(self, distributor: str, scan: Callable[[], set[str]]) -> set[str]:
+        """Returns installed packages from cache, refreshes cache if it is invalid.
+
+        Parameters
+        ----------
+        distributor : str
+            Distributor name (apt, snap, flatpak).
+        scan : Callable[[], set[str]]
+            Full distributor query.
+
+        Returns
+        -------
+        set[str]
+            Names of installed packages.
+
+        Raises
+        ----------
+        RuntimeError
+            From scan: When distributor failure.
+        """
+        stamp = self._stamp(distributor)
+
+        with connect(self._path) as db:
+            row = db.execute(
+                "SELECT stamp, generation, log_inode, log_offset FROM distributors WHERE name = ?",
+                (distributor,)
+            ).fetchone()
+            cached = {
+                name for (name,) in db.execute(
+                    "SELECT name FROM packages WHERE distributor = ?", (distributor,)
+                )
+            }
+
+        if row and row[0] == stamp:
+            return cached
+
+        log_position = None
+        installed = None
+
+        if row and distributor == "apt":
+            installed, log_position = self._tail_dpkg_log(cached, inode=row[2], offset=row[3])
+
+        if installed is None:
+            installed = scan()
+            log_position = self._dpkg_log_end() if distributor == "apt" else (None, None)
+
+        generation = row[1] if row else 0
+        if not row or installed != cached:
+            generation += 1
+
+        with connect(self._path) as db:
+            db.execute(
+                "INSERT OR REPLACE INTO distributors VALUES (?, ?, ?, ?, ?)",
+                (distributor, stamp, generation, *log_position)
+            )
+            db.executemany(
+                "DELETE FROM packages WHERE distributor = ? AND name = ?",
+                [(distributor, name) for name in cached - installed]
+            )
+            db.executemany(
+                "INSERT OR IGNORE INTO packages VALUES (?, ?)",
+                [(distributor, name) for name in installed - cached]
+            )
+
+        return installed
+
+    def _dpkg_log_end(self) -> tuple[int | None, int | None]:
+        """Returns inode and size of dpkg log."""
+        try:
+            stat = os.stat(self._dpkg_log)
+        except OSError:
+            return None, None
+        return stat.st_ino, stat.st_size
+
+    def _tail_dpkg_log(self, cached: set[str], inode: int, offset: int) -> tuple[set[str] | None, tuple]:
+        """Applies dpkg log records written after the saved offset.
+
+        Parameters
+        ----------
+        cached : set[str]
+            Cached apt packages.
+        inode : int
+            Inode of the dpkg log at the previous run.
+        offset : int
+            Read position in the dpkg log at the previous run.
+
+        Returns
+        -------
+        tuple[set[str] | None, tuple]
+            Refreshed packages and the new log position.
+            Packages are 'None' when the log can't be trusted (rotated, missing, no new records).
+        """
+        current_inode, size = self._dpkg_log_end()
+        if inode is None or current_inode != inode or size < offset:
+            return None, (None, None)
+
+        with open(self._dpkg_log, "rb") as log:
+            log.seek(offset)
+            chunk = log.read(size - offset)
+
+        # Reads complete lines only, the rest is read by the next run.
+        end = chunk.rfind(b"\n") + 1
+        records = chunk[:end].decode("utf-8", errors="replace").splitlines()
+
+        installed = set(cached)
+        changes = 0
+
+        for record in records:
+            # 'date time status <state> <package>:<arch> <version>'
+            fields = record.split()
+            if len(fields) < 5 or fields[2] != "status":
+                continue
+
+            changes += 1
+            package = fields[4].split(":")[0]
+            if fields[3] == "installed":
+                installed.add(package)
+            else:
+                installed.discard(package)
+
+        # State file changed without log records, the log can't explain the change.
+        if not changes:
+            return None, (None, None)
+
+        return installed, (inode, offset + end)
+
+
+class StateJournal:
+    """Remembers units that are converged with OS.
+
+    Unit is converged for its config digest and the inventory generation
+    of its distributor ('None' for units without inventory).
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path):
+        self._path = Path(path)
+        migrate(self._path, self.VERSION, """
+            DROP TABLE IF EXISTS units;
+            CREATE TABLE units (
+                digest TEXT PRIMARY KEY,
+                generation INTEGER
+            ) WITHOUT ROWID;
+        """)
+
+    def converged(self, digest: str, generation: int | None) -> bool:
+        """Checks if unit was converged against the same inventory generation.
+
+        Parameters
+        ----------
+        digest : str
+            Unit config digest.
+        generation : int | None
+            Current inventory generation.
+
+        Returns
+        -------
+        bool
+            Can unit be skipped or not.
+        """
+        with connect(self._path) as db:
+            row = db.execute(
+                "SELECT 1 FROM units WHERE digest = ? AND generation IS ?", (digest, generation)
+            ).fetchone()
+        return row is not None
+
+    def record(self, digest: str, generation: int | None) -> None:
+        """Saves unit as converged.
+
+        Parameters
+        ----------
+        digest : str
+            Unit config digest.
+        generation : int | None
+            Inventory generation unit converged against.
+        """
+        with connect(self._path) as db:
+            db.execute("INSERT OR REPLACE INTO units VALUES (?, ?)", (digest, generation))
+
+
+class Snapshot:
+    """Keeps a value computed from a file content between runs.
+
+    Snapshot is valid while the content is unchanged, e.g. parsed config
+    fragments and the converted stack skip YAML parsing and units conversion.
+    One snapshot is kept per file.
+    """
+
+    # Bump when models or the stack structure change.
+    VERSION = 2
+
+    def __init__(self, directory: Path):
+        self._directory = Path(directory)
+
+    def _path(self, file: Path) -> Path:
+        """Returns snapshot path of the file."""
+        name = hashlib.sha256(str(Path(file).resolve()).encode("utf-8")).hexdigest()
+        return self._directory / f"{name[:32]}.pickle"
+
+    @staticmethod
+    def _digest(content: bytes) -> str:
+        """Returns content hash."""
+        return hashlib.sha256(content).hexdigest()
+
+    def load(self, file: Path, content: bytes) -> any:
+        """Returns value computed from the same content.
+
+        Parameters
+        ----------
+        file : Path
+            File path.
+        content : bytes
+            Current file content.
+
+        Returns
+        -------
+        any
+            Value or 'None' when the snapshot is absent, outdated or unreadable.
+        """
+        try:
+            with open(self._path(file), "rb") as snapshot_file:
+                snapshot = pickle.load(snapshot_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError, TypeError):
+            # Broken snapshot is replaced by the next save.
+            return None
+
+        if not isinstance(snapshot, dict) \
+                or snapshot.get("version") != self.VERSION \
+                or snapshot.get("digest") != self._digest(content):
+            return None
+        return snapshot.get("value")
+
+    def save(self, file: Path, content: bytes, value: any) -> None:
+        """Saves value computed from the content.
+
+        Snapshot is replaced atomically, so concurrent runs never read a half-written file.
+
+        Parameters
+        ----------
+        file : Path
+            File path.
+        content : bytes
+            Content the value is computed from.
+        value : any
+            Value (e.g. stack before item cases are defined).
+        """
+        path = self._path(file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        with open(temporary, "wb") as snapshot_file:
+            pickle.dump(
+                {"version": self.VERSION, "digest": self._digest(content), "value": value},
+                snapshot_file,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(temporary, path)
@@ -0,0 +1,78 @@
+"""Provides test functionality for Agent class against the simulated package managers."""
+
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from agent import Agent
+from benchmarks.fake_backend import FakeBackend
+from loader import ConfigLoader
+from models import RunOptions
+
+
+class TestAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.backend = FakeBackend(self.root / "backend")
+        self.config = self.root / "config.yml"
+        self.write_config(["vim"])
+
+        self.environ = patch.dict(os.environ, self.backend.environ())
+        self.environ.start()
+
+        self.stop = threading.Event()
+        self.logs = self.assertLogs("StateSync", level="INFO")
+        self.output = self.logs.__enter__()
+        loader = ConfigLoader()
+        stack = loader.stack(self.config)
+        self.agent = threading.Thread(
+            target=Agent(RunOptions(debounce=0.05), loader).run,
+            args=(self.config, stack, self.stop)
+        )
+        self.agent.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.agent.join(timeout=10)
+        self.logs.__exit__(None, None, None)
+        self.environ.stop()
+        self.directory.cleanup()
+
+    def write_config(self, packages: list[str]):
+        self.config.write_text(json.dumps({
+            "global": {"pool_to_synchronize": ["applications"]},
+            "applications": {
+                "test": [{"app": "Editor", "presented": True, "distributor": "apt", "packages": packages}]
+            }
+        }))
+
+    def wait_installed(self, packages: set[str]):
+        deadline = time.monotonic() + 10
+        while self.backend.installed("apt") != packages:
+            self.assertLess(time.monotonic(), deadline, self.output.output)
+            time.sleep(0.02)
+
+    def test__reconciles_drift(self):
+        self.wait_installed({"vim"})
+
+        # Package removed outside StateSync.
+        subprocess.run(["apt", "purge", "vim"], env=self.backend.environ(), check=True)
+        self.assertEqual(self.backend.installed("apt"), set())
+
+        self.wait_installed({"vim"})
+        self.assertEqual(sum("apt (vim) --> Installation starts:" in line for line in self.output.output), 2)
+
+    def test__reconciles_config_change(self):
+        self.wait_installed({"vim"})
+
+        self.write_config(["vim", "git"])
+
+        self.wait_installed({"vim", "git"})
+        self.assertTrue(any("Config reloaded --> 1 units changed." in line for line in self.output.output))
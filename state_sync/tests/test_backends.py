@@ -0,0 +1,289 @@
+"""Provides test functionality for native inventory backends."""
+
+import asyncio
+import http.server
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from backends import DpkgStatus, FlatpakInstallations, SnapdBackend, SnapdClient
+from services import AsyncCommandRunner, CommandRunner as Runner
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class TestDpkgStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.status = DpkgStatus(FIXTURES / "dpkg" / "status")
+
+    def test__inventory__installed_only(self):
+        # Verify config-files, half-installed and unpacked packages are not installed.
+        self.assertEqual(self.status.inventory(), {"bash", "held-package", "libfoo1"})
+
+    def test__index__fields(self):
+        index = self.status.index()
+
+        self.assertEqual(index["bash"], {
+            "status": "install ok installed",
+            "version": "5.2.15-2+b7",
+            "architecture": "amd64"
+        })
+        self.assertEqual(index["removed-package"]["status"], "deinstall ok config-files")
+        # Verify installed architecture wins and description lines are not fields.
+        self.assertEqual(index["libfoo1"]["architecture"], "amd64")
+        self.assertNotIn("not-a-field", index)
+
+    def test__index__reread_after_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "status"
+            path.write_text("Package: vim\nStatus: install ok installed\n")
+            status = DpkgStatus(path)
+            self.assertEqual(status.inventory(), {"vim"})
+
+            path.write_text("Package: vim\nStatus: deinstall ok config-files\n\nPackage: git\nStatus: install ok installed\n")
+            os.utime(path, ns=(0, 1))
+            self.assertEqual(status.inventory(), {"git"})
+
+            path.write_text("")
+            self.assertEqual(status.inventory(), set())
+
+    def test__default_path__dpkg_admindir(self):
+        with patch.dict(os.environ, {"DPKG_ADMINDIR": "/tmp/admin"}):
+            self.assertEqual(DpkgStatus.default_path(), Path("/tmp/admin/status"))
+
+    def test__available__missing_file(self):
+        status = DpkgStatus(FIXTURES / "absent")
+
+        self.assertFalse(status.available())
+        with self.assertRaises(RuntimeError):
+            status.inventory()
+
+    @patch("subprocess.run")
+    def test__command_runner__no_processes(self, mock_run):
+        runner = Runner(backends={"apt": self.status})
+
+        self.assertEqual(runner.app_inventory("apt"), {"bash", "held-package", "libfoo1"})
+        self.assertTrue(runner.app_item_installation_check({"distributor": "apt", "package": "bash"}))
+        self.assertFalse(runner.app_item_installation_check({"distributor": "apt", "package": "removed-package"}))
+        mock_run.assert_not_called()
+
+    @patch("subprocess.run")
+    def test__command_runner__unavailable__cli_fallback(self, mock_run):
+        mock_run.return_value.returncode = 0
+        mock_run.return_value.stdout = "vim install ok installed\n"
+        runner = Runner(backends={"apt": DpkgStatus(FIXTURES / "absent")})
+
+        self.assertEqual(runner.app_inventory("apt"), {"vim"})
+        mock_run.assert_called_once()
+
+
+class TestFlatpakInstallations(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.system = Path(self.directory.name) / "system"
+        self.user = Path(self.directory.name) / "user"
+        self.installations = FlatpakInstallations([self.system, self.user])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def deploy(self, installation: Path, ref: str, active: bool = True):
+        path = installation / ref
+        (path / "abc123").mkdir(parents=True)
+        if active:
+            (path / "active").symlink_to("abc123")
+        installation.joinpath(".changed").touch()
+        os.utime(installation / ".changed", ns=(0, len(list(installation.rglob("active")))))
+
+    def test__inventory__system_and_user(self):
+        self.deploy(self.system, "app/org.gimp.GIMP/x86_64/stable")
+        self.deploy(self.system, "runtime/org.freedesktop.Platform/x86_64/23.08")
+        self.deploy(self.user, "app/org.gimp.GIMP/x86_64/beta")
+        self.deploy(self.user, "app/org.test.Partial/x86_64/stable", active=False)
+        (self.system / "app" / "org.gimp.GIMP" / "current").symlink_to("x86_64/stable")
+
+        self.assertTrue(self.installations.available())
+        self.assertEqual(self.installations.inventory(), {"org.gimp.GIMP", "org.freedesktop.Platform"})
+        self.assertEqual(sorted(self.installations.index()["org.gimp.GIMP"]), [
+            "app/org.gimp.GIMP/x86_64/beta",
+            "app/org.gimp.GIMP/x86_64/stable"
+        ])
+
+    def test__index__rescan_after_change(self):
+        self.deploy(self.system, "app/org.gimp.GIMP/x86_64/stable")
+        self.assertEqual(self.installations.inventory(), {"org.gimp.GIMP"})
+
+        self.deploy(self.system, "app/org.gimp.GIMPx/x86_64/stable")
+        self.assertEqual(self.installations.inventory(), {"org.gimp.GIMP", "org.gimp.GIMPx"})
+
+    def test__available__no_installations(self):
+        self.assertFalse(self.installations.available())
+        self.assertEqual(self.installations.inventory(), set())
+
+    @patch("subprocess.run")
+    def test__command_runner__exact_match(self, mock_run):
+        self.deploy(self.system, "app/org.gimp.GIMPx/x86_64/stable")
+        runner = Runner(backends={"flatpak": self.installations})
+
+        # 'flatpak list | grep' matches substrings.
+        self.assertFalse(runner.app_item_installation_check({"distributor": "flatpak", "package": "org.gimp.GIMP"}))
+        self.assertTrue(runner.app_item_installation_check({"distributor": "flatpak", "package": "org.gimp.GIMPx"}))
+        mock_run.assert_not_called()
+
+
+class FakeSnapd(socketserver.ThreadingUnixStreamServer):
+    """Local snapd stand-in, changes are 'Doing' on the first poll."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, installed: set[str], broken: set[str] = frozenset()):
+        self.installed = set(installed)
+        self.broken = broken
+        self.requests: list[tuple[str, str, dict | None]] = []
+        self.connections = 0
+        self.changes: dict[str, dict] = {}
+        self.lock = threading.Lock()
+        super().__init__(path, FakeSnapdHandler)
+
+
+class FakeSnapdHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, None))
+        if self.path == "/v2/snaps":
+            return self.reply({"type": "sync", "result": [{"name": name} for name in sorted(self.server.installed)]})
+
+        change = self.server.changes.get(self.path.removeprefix("/v2/changes/"))
+        if change is None:
+            return self.reply({"type": "error", "status-code": 404, "result": {"message": "change not found"}})
+
+        change["polls"] += 1
+        if change["polls"] == 1:
+            return self.reply({"type": "sync", "result": {"status": "Doing", "ready": False}})
+        if change["broken"]:
+            return self.reply({"type": "sync", "result": {
+                "status": "Error", "ready": True, "summary": change["summary"], "err": "broken snap"
+            }})
+        change["apply"]()
+        return self.reply({"type": "sync", "result": {"status": "Done", "ready": True}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(("POST", self.path, body))
+        snaps = body.get("snaps") or [self.path.removeprefix("/v2/snaps/")]
+
+        def apply():
+            if body["action"] == "install":
+                self.server.installed.update(snaps)
+            else:
+                self.server.installed.difference_update(snaps)
+
+        with self.server.lock:
+            change = str(len(self.server.changes) + 1)
+            self.server.changes[change] = {
+                "polls": 0,
+                "apply": apply,
+                "summary": f"{body["action"]} {" ".join(snaps)}",
+                "broken": bool(self.server.broken & set(snaps))
+            }
+        self.reply({"type": "async", "status-code": 202, "change": change})
+
+    def reply(self, envelope: dict):
+        data = json.dumps(envelope).encode("utf-8")
+        self.send_response(envelope.get("status-code", 200))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestSnapdBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = str(Path(self.directory.name) / "snapd.socket")
+        self.server = FakeSnapd(self.socket_path, installed={"core", "firefox"}, broken={"broken-snap"})
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = SnapdClient(socket_path=self.socket_path)
+        self.backend = SnapdBackend(client=self.client, poll_interval=0.01)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test__inventory__pooled_connection(self):
+        self.assertTrue(self.backend.available())
+        self.assertEqual(self.backend.inventory(), {"core", "firefox"})
+        self.assertEqual(self.backend.inventory(), {"core", "firefox"})
+        # Verify the keep-alive connection is reused.
+        self.assertEqual(self.server.connections, 1)
+
+    def test__install__one_change(self):
+        asyncio.run(self.backend.install(["firefox", "vlc", "htop"]))
+
+        posts = [request for request in self.server.requests if request[0] == "POST"]
+        self.assertEqual(posts, [("POST", "/v2/snaps", {"action": "install", "snaps": ["vlc", "htop"]})])
+        self.assertEqual(self.server.installed, {"core", "firefox", "vlc", "htop"})
+
+    def test__install__classic__change_per_snap(self):
+        asyncio.run(self.backend.install(["code", "slack"], classic=True))
+
+        posts = sorted(request[1] for request in self.server.requests if request[0] == "POST")
+        self.assertEqual(posts, ["/v2/snaps/code", "/v2/snaps/slack"])
+        self.assertEqual(self.server.installed, {"core", "firefox", "code", "slack"})
+
+    def test__remove__installed_only_purge(self):
+        asyncio.run(self.backend.remove(["firefox", "vlc"]))
+
+        posts = [request for request in self.server.requests if request[0] == "POST"]
+        self.assertEqual(posts, [("POST", "/v2/snaps", {"action": "remove", "snaps": ["firefox"], "purge": True})])
+        self.assertEqual(self.server.installed, {"core"})
+
+    def test__install__failed_change(self):
+        with self.assertRaises(RuntimeError) as error:
+            asyncio.run(self.backend.install(["broken-snap"]))
+
+        self.assertIn("Error", str(error.exception))
+        self.assertNotIn("broken-snap", self.server.installed)
+
+    def test__unavailable(self):
+        backend = SnapdBackend(client=SnapdClient(socket_path=str(Path(self.directory.name) / "absent")))
+
+        self.assertFalse(backend.available())
+        with self.assertRaises(RuntimeError):
+            backend.inventory()
+
+    @patch("os.geteuid", return_value=1000)
+    def test__async_runner__not_root__cli_fallback(self, _):
+        runner = AsyncCommandRunner(backends={"snap": self.backend})
+        with patch.object(runner, "_execute") as mock_execute:
+            asyncio.run(runner.app_items_install({"distributor": "snap", "packages": ["vlc"]}))
+
+        mock_execute.assert_called_once()
+        self.assertFalse([request for request in self.server.requests if request[0] == "POST"])
+
+    @patch("os.geteuid", return_value=0)
+    def test__async_runner__root__api(self, _):
+        runner = AsyncCommandRunner(backends={"snap": self.backend})
+        with patch.object(runner, "_execute") as mock_execute:
+            asyncio.run(runner.app_items_install({"distributor": "snap", "packages": ["vlc"]}))
+
+        mock_execute.assert_not_called()
+        self.assertIn("vlc", self.server.installed)
@@ -0,0 +1,63 @@
+"""Provides test functionality for the command line entry point."""
+
+import importlib.util
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PACKAGE = Path(__file__).resolve().parents[1]
+
+spec = importlib.util.spec_from_file_location("cli", PACKAGE / "__main__.py")
+cli = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cli)
+
+
+class TestParseArgs(unittest.TestCase):
+
+    def test__parse_args__flow_and_options(self):
+        arguments = cli.parse_args(["apply", "config.yml", "--workers", "2", "--no_cache=true", "--trace", "t.json"])
+
+        self.assertEqual(arguments, {
+            "flow": "apply",
+            "config_path": Path("config.yml"),
+            "workers": 2,
+            "no_cache": True,
+            "trace": Path("t.json")
+        })
+
+    def test__hosts_from__list_and_file(self):
+        self.assertEqual(cli.hosts_from("web1, web2,,db1"), ["web1", "web2", "db1"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            hosts = Path(directory) / "hosts"
+            hosts.write_text("web1\n# database\n\ndb1  # primary\n")
+            self.assertEqual(cli.hosts_from(str(hosts)), ["web1", "db1"])
+
+    def test__parse_args__full_parser_needed(self):
+        # Verify help, unknown options and invalid values are left to jsonargparse.
+        self.assertIsNone(cli.parse_args(["--help"]))
+        self.assertIsNone(cli.parse_args(["plan", "config.yml", "--unknown", "1"]))
+        self.assertIsNone(cli.parse_args(["plan", "config.yml", "--full", "maybe"]))
+        self.assertIsNone(cli.parse_args(["plan", "config.yml", "--workers"]))
+        self.assertIsNone(cli.parse_args(["plan"]))
+
+    def test__plan__heavy_modules_not_imported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = Path(directory) / "config.yml"
+            config.write_text(
+                "global:\n  pool_to_synchronize: [commands]\n"
+                "commands:\n  test:\n    - group: Echo\n      commands: [echo]\n      execute: false\n"
+            )
+            process = subprocess.run(
+                args=[sys.executable, "-X", "importtime", str(PACKAGE), "plan", str(config), "--no_cache", "true"],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+
+        imported = {line.split("|")[-1].strip() for line in process.stderr.splitlines() if "|" in line}
+        self.assertIn("yaml.loader", imported)
+        self.assertNotIn("jsonargparse", imported)
+        self.assertNotIn("asyncio.base_events", imported)
@@ -4,8 +4,12 @@ Generated by AI (Claude 3.7 Sonnet).
 Edited by human (Artur Titov).
 """
 
+import asyncio
+import signal
+import time
 import unittest
 from unittest.mock import patch, MagicMock
+from services import AsyncCommandRunner as AsyncRunner
 from services import CommandRunner as Runner
 
 
@@ -222,6 +226,74 @@ class TestCommandRunner(unittest.TestCase):
         self.assertIn(expected_error, str(context_manager.exception))
 
 
+    @patch('subprocess.run')
+    def test__app_inventory__apt__installed_only(self, mock_run):
+        self.mock_process.returncode = 0
+        self.mock_process.stdout = (
+            "test-package install ok installed\n"
+            "removed-package deinstall ok config-files\n"
+            "broken-package install ok half-installed\n"
+        )
+        mock_run.return_value = self.mock_process
+
+        result = self.command_runner.app_inventory("apt")
+
+        # Verify one bulk query was executed.
+        mock_run.assert_called_once_with(
+            args="dpkg-query -W -f='${Package} ${Status}\\n'",
+            shell=True,
+            check=False,
+            capture_output=True,
+            text=True
+        )
+
+        # Verify only fully installed packages are in the inventory.
+        self.assertEqual(result, {"test-package"})
+
+    @patch('subprocess.run')
+    def test__app_inventory__snap__skips_header(self, mock_run):
+        self.mock_process.returncode = 0
+        self.mock_process.stdout = (
+            "Name         Version  Rev  Tracking       Publisher  Notes\n"
+            "hello-world  6.4      29   latest/stable  canonical  -\n"
+        )
+        mock_run.return_value = self.mock_process
+
+        result = self.command_runner.app_inventory("snap")
+
+        self.assertEqual(result, {"hello-world"})
+
+    @patch('subprocess.run')
+    def test__app_inventory__flatpak__installed(self, mock_run):
+        self.mock_process.returncode = 0
+        self.mock_process.stdout = "org.test.package\norg.test.package.Locale\n"
+        mock_run.return_value = self.mock_process
+
+        result = self.command_runner.app_inventory("flatpak")
+
+        self.assertEqual(result, {"org.test.package", "org.test.package.Locale"})
+
+    @patch('subprocess.run')
+    def test__app_inventory__query_failure__empty(self, mock_run):
+        self.mock_process.returncode = 127
+        self.mock_process.stdout = ""
+        mock_run.return_value = self.mock_process
+
+        result = self.command_runner.app_inventory("snap")
+
+        # Verify absent distributor means nothing is installed.
+        self.assertEqual(result, set())
+
+    def test__app_inventory__unknown_distributor__failure(self):
+        with self.assertRaises(RuntimeError) as context_manager:
+            self.command_runner.app_inventory("unknown")
+
+        self.assertEqual(
+            str(context_manager.exception),
+            "Distributor 'unknown' not supported yet."
+        )
+
+
     @patch.object(Runner, attribute='_execute')
     def test__app_item_install__apt__success(self, mock_execute):
         # Set up mock to return True
@@ -307,6 +379,46 @@ class TestCommandRunner(unittest.TestCase):
             ]
         )
 
+    @patch.object(Runner, attribute='_execute')
+    def test__app_items_install__apt__one_transaction(self, mock_execute):
+        mock_execute.return_value = True
+
+        context = {
+            "distributor": "apt",
+            "packages": ["first", "second", "third"]
+        }
+
+        self.command_runner.app_items_install(context)
+
+        # Verify all packages were installed with one command.
+        mock_execute.assert_called_once_with(
+            item="first second third",
+            commands=[
+                "sudo apt install first second third -y"
+            ]
+        )
+
+    @patch.object(Runner, attribute='_execute')
+    def test__app_items_install__snap_classic__command_per_snap(self, mock_execute):
+        mock_execute.return_value = True
+
+        context = {
+            "distributor": "snap",
+            "packages": ["first", "second"],
+            "classic": True
+        }
+
+        self.command_runner.app_items_install(context)
+
+        # Verify every classic snap is installed with its own command.
+        mock_execute.assert_called_once_with(
+            item="first second",
+            commands=[
+                "sudo snap install first --classic",
+                "sudo snap install second --classic"
+            ]
+        )
+
     def test__app_item_install__unknown_distributor__failure(self):
         # Test with unknown distributor
         context = {
@@ -386,6 +498,27 @@ class TestCommandRunner(unittest.TestCase):
             ]
         )
 
+    @patch.object(Runner, attribute='_execute')
+    def test__app_items_remove__flatpak__one_transaction(self, mock_execute):
+        mock_execute.return_value = True
+
+        context = {
+            "distributor": "flatpak",
+            "packages": ["org.first.app", "org.second.app"]
+        }
+
+        self.command_runner.app_items_remove(context)
+
+        mock_execute.assert_called_once_with(
+            item="org.first.app org.second.app",
+            commands=[
+                "sudo flatpak kill org.first.app",
+                "sudo flatpak kill org.second.app",
+                "sudo flatpak uninstall -v -y --force-remove --delete-data flathub org.first.app org.second.app",
+                "sudo flatpak uninstall -y --unused"
+            ]
+        )
+
     def test__app_item_remove__unknown_distributor__failure(self):
         # Test with unknown distributor
         context = {
@@ -425,3 +558,106 @@ class TestCommandRunner(unittest.TestCase):
                 "echo 'world'"
             ]
         )
+
+
+class TestAsyncCommandRunner(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.command_runner = AsyncRunner(prefix="apt")
+
+    async def test__execute__output_streamed_to_log(self):
+        with self.assertLogs("StateSync", level="INFO") as logs:
+            result = await self.command_runner._execute(
+                item="Test",
+                commands=["echo 'hello'; echo 'world' >&2"]
+            )
+
+        self.assertTrue(result)
+        self.assertIn("INFO:StateSync:[apt] hello", logs.output)
+        self.assertIn("WARNING:StateSync:[apt] world", logs.output)
+
+    async def test__execute__failure(self):
+        with self.assertRaises(RuntimeError) as context_manager:
+            await self.command_runner._execute(item="Test", commands=["exit 3", "echo 'never'"])
+
+        self.assertEqual(str(context_manager.exception), "Test --> Error code: '3' (exit 3)")
+
+    async def test__execute__long_line_output(self):
+        with self.assertLogs("StateSync", level="INFO") as logs:
+            result = await self.command_runner._execute(
+                item="Test",
+                commands=["head -c 200000 /dev/zero | tr '\\0' a; echo; echo 'end'"]
+            )
+
+        self.assertTrue(result)
+        # Verify the line longer than the reader limit is logged in parts.
+        self.assertEqual("".join(line.partition("[apt] ")[2] for line in logs.output), "a" * 200000 + "end")
+        self.assertIn("INFO:StateSync:[apt] end", logs.output)
+
+    @patch.object(AsyncRunner, attribute='_log_stream', side_effect=ValueError("Separator is not found"))
+    async def test__execute__output_read_failure(self, _):
+        with self.assertRaises(RuntimeError) as context_manager, self.assertLogs("StateSync", level="ERROR"):
+            await self.command_runner._execute(item="Test", commands=["sleep 0.1; echo 'lost'"])
+
+        self.assertEqual(str(context_manager.exception), "Test --> Error code: '1' (sleep 0.1; echo 'lost')")
+
+    async def test__execute__cancelled_command_terminated(self):
+        processes = []
+        create = asyncio.create_subprocess_exec
+
+        async def spawn(*args, **kwargs):
+            processes.append(await create(*args, **kwargs))
+            return processes[-1]
+
+        with patch("asyncio.create_subprocess_exec", side_effect=spawn):
+            task = asyncio.create_task(self.command_runner._execute(item="Test", commands=["exec sleep 30"]))
+            while not processes:
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self.assertEqual(processes[0].returncode, -signal.SIGTERM)
+
+    async def test__execute__runs_concurrently(self):
+        started = time.monotonic()
+
+        await asyncio.gather(*(
+            self.command_runner._execute(item="Test", commands=["sleep 0.3"])
+            for _ in range(5)
+        ))
+
+        # Verify processes did not block each other.
+        self.assertLess(time.monotonic() - started, 1.2)
+
+    @patch.object(AsyncRunner, attribute='_execute')
+    async def test__app_items_install__same_commands(self, mock_execute):
+        mock_execute.return_value = True
+
+        await self.command_runner.app_items_install({
+            "distributor": "snap",
+            "packages": ["first", "second"],
+            "classic": True
+        })
+
+        mock_execute.assert_awaited_once_with(
+            item="first second",
+            commands=["sudo snap install first --classic", "sudo snap install second --classic"]
+        )
+
+    @patch.object(AsyncRunner, attribute='_stream')
+    async def test__app_item_installation_check__not_installed(self, mock_stream):
+        mock_stream.return_value = 1
+
+        result = await self.command_runner.app_item_installation_check({
+            "distributor": "apt",
+            "package": "test_package"
+        })
+
+        mock_stream.assert_awaited_once_with("dpkg -l | grep test_package > /dev/null 2>&1", quiet=True)
+        self.assertFalse(result)
+
+    async def test__app_inventory__unknown_distributor__failure(self):
+        with self.assertRaises(RuntimeError):
+            await self.command_runner.app_inventory("unknown")
@@ -0,0 +1,185 @@
+"""Provides end-to-end test functionality against the simulated package managers."""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks.fake_backend import FakeBackend
+from dispatcher import Dispatcher as Dispatch
+from models import RunOptions
+
+
+class TestEndToEnd(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.backend = FakeBackend(self.root / "backend")
+        self.config = self.root / "config.yml"
+        self.config.write_text(json.dumps({
+            "global": {"pool_to_synchronize": ["applications", "commands"]},
+            "applications": {
+                "test": [
+                    {"app": "Editor", "presented": True, "distributor": "apt", "packages": ["vim", "git"]},
+                    {"app": "Old", "presented": False, "distributor": "snap", "packages": ["old-snap"]},
+                    {"app": "Player", "presented": True, "distributor": "flatpak", "packages": ["org.test.Player"]}
+                ]
+            },
+            "commands": {
+                "test": [
+                    {"group": "Marker", "commands": [f"touch {self.root / "marker"}"], "execute": True}
+                ]
+            }
+        }))
+        self.backend.preinstall("apt", ["git"])
+        self.backend.preinstall("snap", ["old-snap"])
+
+        self.environ = patch.dict(os.environ, self.backend.environ())
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+        self.directory.cleanup()
+
+    def test__apply__converges_state(self):
+        with self.assertLogs("StateSync", level="INFO"):
+            Dispatch().now(file=self.config, arg="apply")
+
+        self.assertEqual(self.backend.installed("apt"), {"vim", "git"})
+        self.assertEqual(self.backend.installed("snap"), set())
+        self.assertEqual(self.backend.installed("flatpak"), {"org.test.Player"})
+        self.assertTrue((self.root / "marker").exists())
+
+    def test__apply__writes_trace(self):
+        trace = self.root / "trace.json"
+        with self.assertLogs("StateSync", level="INFO"):
+            Dispatch(options=RunOptions(trace=trace)).now(file=self.config, arg="apply")
+
+        spans = [event for event in json.loads(trace.read_text())["traceEvents"] if event["ph"] == "X"]
+        names = {span["name"] for span in spans}
+        self.assertTrue({"parse", "convert", "probe", "install", "remove", "commands", "command"} <= names)
+        install = next(span for span in spans if span["name"] == "install" and span["args"]["distributor"] == "apt")
+        self.assertEqual(install["args"]["packages"], ["vim"])
+
+    def test__plan__writes_metrics(self):
+        textfile = self.root / "state_sync.prom"
+        with self.assertLogs("StateSync", level="INFO"):
+            Dispatch(options=RunOptions(metrics=textfile)).now(file=self.config, arg="plan")
+
+        text = textfile.read_text()
+        self.assertIn('state_sync_run_success{flow="plan"} 1', text)
+        self.assertIn('state_sync_items{flow="plan",distributor="apt",case="to_install"} 1', text)
+        self.assertIn('state_sync_items{flow="plan",distributor="snap",case="to_remove"} 1', text)
+        self.assertIn('state_sync_probe_duration_seconds_count{flow="plan",distributor="flatpak"} 1', text)
+
+    def test__plan__config_snapshot(self):
+        options = RunOptions(cache_dir=self.root / "cache")
+        with self.assertLogs("StateSync", level="INFO"):
+            Dispatch(options=options).now(file=self.config, arg="plan")
+
+        # Verify unchanged config is not parsed again.
+        with patch("tools.Parsers.yaml") as parse, self.assertLogs("StateSync", level="INFO") as logs:
+            Dispatch(options=options).now(file=self.config, arg="plan")
+        parse.assert_not_called()
+        self.assertTrue(any("Editor (vim) --> will be installed." in line for line in logs.output))
+
+        self.config.write_text(self.config.read_text().replace("vim", "nano"))
+        with self.assertLogs("StateSync", level="INFO") as logs:
+            Dispatch(options=options).now(file=self.config, arg="plan")
+        self.assertTrue(any("Editor (nano) --> will be installed." in line for line in logs.output))
+
+    def test__plan__no_changes(self):
+        with self.assertLogs("StateSync", level="INFO") as logs:
+            Dispatch().now(file=self.config, arg="plan")
+
+        self.assertTrue(any("Editor (vim) --> will be installed." in line for line in logs.output))
+        self.assertTrue(any("Old (old-snap) --> will be removed." in line for line in logs.output))
+        # Verify plan only queried inventories.
+        self.assertEqual(self.backend.installed("apt"), {"git"})
+        # apt and flatpak inventories are read from their databases without processes.
+        self.assertEqual(sorted(call.split()[0] for call in self.backend.calls()), ["snap"])
+
+    def test__apply__plan_file(self):
+        plan = self.root / "plan.json"
+        with self.assertLogs("StateSync", level="INFO"):
+            Dispatch(options=RunOptions(out=plan)).now(file=self.config, arg="plan")
+        planned = len(self.backend.calls())
+
+        with self.assertLogs("StateSync", level="INFO") as logs:
+            Dispatch(options=RunOptions(plan=plan)).now(file=self.config, arg="apply")
+
+        self.assertTrue(any("is up to date --> Packages are not probed." in line for line in logs.output))
+        # Verify apply only downloaded and changed packages.
+        self.assertEqual(
+            sorted(call.split()[0] for call in self.backend.calls()[planned:]),
+            ["apt", "apt-get", "flatpak", "flatpak", "snap", "sudo", "sudo", "sudo", "sudo", "sudo"]
+        )
+        self.assertEqual(self.backend.installed("apt"), {"vim", "git"})
+        self.assertEqual(self.backend.installed("snap"), set())
+        self.assertTrue((self.root / "marker").exists())
+
+    def test__apply__downloads_while_earlier_units_install(self):
+        config = self.root / "slow.yml"
+        config.write_text(json.dumps({
+            "global": {"pool_to_synchronize": ["commands", "applications"]},
+            "commands": {
+                "test": [{"group": "Repository", "commands": ['touch "$FAKE_PM_ROOT/repository"'], "execute": True}]
+            },
+            "applications": {
+                "test": [
+                    {"app": "Player", "presented": True, "distributor": "snap", "packages": ["player"]},
+                    {"app": "Old", "presented": False, "distributor": "apt", "packages": ["old"]},
+                    {
+                        "app": "Editor", "presented": True, "distributor": "apt",
+                        "packages": ["vim", "git"], "after": ["Player"]
+                    }
+                ]
+            }
+        }))
+        backend = FakeBackend(self.root / "slow", install_cost=0.5, download_cost=0.1)
+        backend.preinstall("apt", ["old"])
+        trace = self.root / "trace.json"
+
+        with patch.dict(os.environ, backend.environ()), self.assertLogs("StateSync", level="INFO") as logs:
+            Dispatch(options=RunOptions(trace=trace)).now(file=config, arg="apply")
+
+        self.assertEqual(backend.installed("apt"), {"vim", "git"})
+        self.assertEqual(backend.installed("snap"), {"player"})
+        # Fake apt fails on the held lock, so the download never ran with the apt removal.
+        self.assertFalse(any("Could not get lock" in line for line in logs.output))
+        self.assertFalse(any("Packages are downloaded by the installation" in line for line in logs.output))
+
+        spans = [event for event in json.loads(trace.read_text())["traceEvents"] if event["ph"] == "X"]
+
+        def span(name: str, distributor: str = None) -> tuple[float, float]:
+            found = next(
+                span for span in spans
+                if span["name"] == name and span["args"].get("distributor", distributor) == distributor
+            )
+            return found["ts"], found["ts"] + found["dur"]
+
+        group = span("commands")
+        download = span("download", "apt")
+        snap = span("install", "snap")
+        apt = span("install", "apt")
+        # Verify the download waited for the group and ran while the earlier snap was installed.
+        self.assertGreaterEqual(download[0], group[1])
+        self.assertLess(download[0], snap[1])
+        self.assertGreater(download[1], snap[0])
+        self.assertGreaterEqual(apt[0], snap[1])
+
+    def test__apply__plan_file__drift(self):
+        plan = self.root / "plan.json"
+        with self.assertLogs("StateSync", level="INFO"):
+            Dispatch(options=RunOptions(out=plan)).now(file=self.config, arg="plan")
+        self.backend.preinstall("apt", ["vim"])
+
+        with self.assertLogs("StateSync", level="INFO") as logs:
+            Dispatch(options=RunOptions(plan=plan)).now(file=self.config, arg="apply")
+
+        self.assertTrue(any("is outdated (apt changed)" in line for line in logs.output))
+        # Verify vim installed after the plan is not installed again.
+        self.assertFalse([call for call in self.backend.calls() if call.startswith("apt install")])
+        self.assertEqual(self.backend.installed("snap"), set())
@@ -0,0 +1,107 @@
+"""Provides test functionality for Fleet class."""
+
+import json
+import shlex
+import tempfile
+import unittest
+from pathlib import Path
+from benchmarks.fake_backend import FakeFleet
+from dispatcher import Dispatcher as Dispatch
+from models import RunOptions
+from transports import SshTransport
+
+
+class TestFleet(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.config = self.root / "config.yml"
+        self.config.write_text(json.dumps({
+            "global": {"pool_to_synchronize": ["applications", "commands"]},
+            "applications": {
+                "test": [
+                    {"app": "Editor", "presented": True, "distributor": "apt", "packages": ["vim", "git"]},
+                    {"app": "Old", "presented": False, "distributor": "snap", "packages": ["old-snap"]}
+                ]
+            },
+            "commands": {
+                "test": [
+                    {"group": "Marker", "commands": ['touch "$FAKE_PM_ROOT/marker"'], "execute": True}
+                ]
+            }
+        }))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test__apply__every_host(self):
+        fleet = FakeFleet(self.root / "fleet", hosts=3)
+        fleet.backends["host-1"].preinstall("snap", ["old-snap"])
+        options = RunOptions(hosts=fleet.hosts, fanout=2)
+
+        with self.assertLogs("StateSync", level="INFO") as logs:
+            Dispatch(options=options, transport=fleet.transport).now(file=self.config, arg="apply")
+
+        for host, backend in fleet.backends.items():
+            self.assertEqual(backend.installed("apt"), {"vim", "git"}, host)
+            self.assertEqual(backend.installed("snap"), set(), host)
+            self.assertTrue((backend.root / "marker").exists(), host)
+        self.assertLessEqual(fleet.max_open, 2)
+
+        # Verify output of every host is printed at once with the host prefix.
+        hosts = [line.split("[")[1].split("]")[0] for line in logs.output if "[host-" in line]
+        self.assertEqual(len(set(hosts)), 3)
+        self.assertEqual(hosts, sorted(hosts, key=hosts.index))
+        self.assertTrue(any("[host-1] [snap] snap (old-snap) --> Removing starts:" in line for line in logs.output))
+        self.assertEqual(sum("--> apply succeeded." in line for line in logs.output), 3)
+
+    def test__apply__failed_host(self):
+        fleet = FakeFleet(self.root / "fleet", hosts=2)
+        fleet.backends["host-0"].broken.append("vim")
+        options = RunOptions(hosts=fleet.hosts)
+
+        with self.assertLogs("StateSync", level="INFO") as logs, self.assertRaises(SystemExit):
+            Dispatch(options=options, transport=fleet.transport).now(file=self.config, arg="apply")
+
+        self.assertTrue(any("host-0 --> apply failed:" in line for line in logs.output))
+        self.assertEqual(fleet.backends["host-1"].installed("apt"), {"vim", "git"})
+
+    def test__apply__host_transport_error(self):
+        fleet = FakeFleet(self.root / "fleet", hosts=2)
+
+        def transport(host: str):
+            if host == "host-0":
+                raise OSError("Connection refused")
+            return fleet.transport(host)
+
+        with self.assertLogs("StateSync", level="INFO") as logs, self.assertRaises(SystemExit):
+            Dispatch(options=RunOptions(hosts=fleet.hosts), transport=transport).now(file=self.config, arg="apply")
+
+        # Verify the error is recorded for its host, with the host output, and other hosts are synchronized.
+        self.assertTrue(any("[host-0] OSError('Connection refused')" in line for line in logs.output))
+        self.assertTrue(any("host-0 --> apply failed: OSError('Connection refused')" in line for line in logs.output))
+        self.assertEqual(fleet.backends["host-1"].installed("apt"), {"vim", "git"})
+
+    def test__plan__no_changes_on_hosts(self):
+        fleet = FakeFleet(self.root / "fleet", hosts=2)
+
+        with self.assertLogs("StateSync", level="INFO"):
+            Dispatch(options=RunOptions(hosts=fleet.hosts), transport=fleet.transport).now(
+                file=self.config, arg="plan"
+            )
+
+        for backend in fleet.backends.values():
+            self.assertEqual(backend.installed("apt"), set())
+            self.assertFalse([call for call in backend.calls() if "install" in call])
+
+    def test__ssh_transport__multiplexed_commands(self):
+        transport = SshTransport("web1", control_dir=self.root / "control")
+
+        command = shlex.split(transport.wrap("dpkg -l | grep 'vim'"))
+
+        self.assertEqual(command[0], "ssh")
+        self.assertIn("ControlMaster=auto", command)
+        self.assertIn(f"ControlPath={self.root / "control" / "%C"}", command)
+        self.assertEqual(command[-3:], ["web1", "--", "dpkg -l | grep 'vim'"])
+        self.assertEqual(transport.shell()[-3:], ["web1", "--", "/bin/sh"])
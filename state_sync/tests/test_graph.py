@@ -0,0 +1,83 @@
+"""Provides test functionality for UnitGraph class."""
+
+import unittest
+from graph import UnitGraph as Graph
+from models import Application, Command, Stack
+
+
+def app(name: str, **dependencies) -> Application:
+    return Application.create_from_config({
+        "app": name, "distributor": "apt", "presented": True, "packages": [name], **dependencies
+    })
+
+
+def group(name: str, **dependencies) -> Command:
+    return Command.create_from_config({
+        "group": name, "commands": [f"echo {name}"], "execute": True, **dependencies
+    })
+
+
+def names(waves: list[list]) -> list[list[str]]:
+    return [[unit.name for unit in wave] for wave in waves]
+
+
+class TestUnitGraph(unittest.TestCase):
+
+    def test__waves__config_order_without_declarations(self):
+        stack = Stack({
+            "applications": [app("a"), app("b")],
+            "commands": [group("x"), group("y")]
+        })
+
+        # Verify applications go first and commands one after another.
+        self.assertEqual(names(Graph(stack).waves()), [["a", "b"], ["x"], ["y"]])
+
+    def test__waves__declared_dependencies(self):
+        stack = Stack({
+            "applications": [app("a"), app("b", after=["x"])],
+            "commands": [
+                group("x", after=[]),
+                group("y", requires=["a"]),
+                group("z", after=["not_in_stack"])
+            ]
+        })
+
+        # Verify pools order is kept, 'b' goes after 'x' of the later pool.
+        self.assertEqual(names(Graph(stack).waves()), [["a"], ["x"], ["b"], ["y", "z"]])
+
+    def test__waves__declared_dependencies_keep_pools_order(self):
+        stack = Stack({
+            "applications": [app("a"), app("b")],
+            "commands": [group("x"), group("y", requires=["x"]), group("z", after=[])]
+        })
+
+        # Verify groups with declarations still go after all applications.
+        self.assertEqual(names(Graph(stack).waves()), [["a", "b"], ["x", "z"], ["y"]])
+
+    def test__init__cycle__failure(self):
+        stack = Stack({
+            "applications": [app("a", after=["y"])],
+            "commands": [group("x", requires=["a"]), group("y", after=["x"])]
+        })
+
+        with self.assertRaises(RuntimeError) as context_manager:
+            Graph(stack)
+
+        self.assertEqual(str(context_manager.exception), "Units dependencies have a cycle: a, x, y.")
+
+    def test__init__required_unit_not_found__failure(self):
+        stack = Stack({"commands": [group("x", requires=["a"])]})
+
+        with self.assertRaises(RuntimeError) as context_manager:
+            Graph(stack)
+
+        self.assertEqual(str(context_manager.exception), "x --> Required unit 'a' not found in stack.")
+
+    def test__init__ambiguous_name__failure(self):
+        stack = Stack({
+            "applications": [app("a"), app("a")],
+            "commands": [group("x", after=["a"])]
+        })
+
+        with self.assertRaises(RuntimeError):
+            Graph(stack)
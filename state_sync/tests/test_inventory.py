@@ -0,0 +1,162 @@
+"""Provides test functionality for Inventory and StateManager classes."""
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from inventory import Inventory
+from models import Application, Command, RunOptions, Stack
+from services import StateManager as State
+
+
+class TestInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = MagicMock()
+        self.runner.app_inventory.return_value = {"test-package"}
+        self.inventory = Inventory(self.runner)
+
+    def test__contains__exact_match(self):
+        context = {
+            "distributor": "apt",
+            "package": "test"
+        }
+
+        # Verify substring of installed package is not matched.
+        self.assertFalse(self.inventory.contains(context))
+
+        context["package"] = "test-package"
+        self.assertTrue(self.inventory.contains(context))
+
+    def test__contains__one_query_per_distributor(self):
+        for package in ["a", "b", "c"]:
+            self.inventory.contains({"distributor": "apt", "package": package})
+        self.inventory.contains({"distributor": "snap", "package": "a"})
+
+        # Verify every distributor was queried once.
+        self.assertEqual(self.runner.app_inventory.call_count, second=2)
+        self.runner.app_inventory.assert_any_call("apt")
+        self.runner.app_inventory.assert_any_call("snap")
+
+    def test__contains__unknown_distributor__failure(self):
+        self.runner.app_inventory.side_effect = RuntimeError(
+            "Distributor 'unknown' not supported yet."
+        )
+
+        with self.assertRaises(RuntimeError) as context_manager:
+            self.inventory.contains({"distributor": "unknown", "package": "test_package"})
+
+        expected_error = "test_package --> Distributor 'unknown' not supported yet."
+        self.assertEqual(str(context_manager.exception), expected_error)
+
+
+    def test__prefetch__queries_concurrently(self):
+        barrier = threading.Barrier(parties=3, timeout=5)
+
+        def query(distributor):
+            # Passes only when all distributors are queried at the same time.
+            barrier.wait()
+            return {distributor}
+
+        self.runner.app_inventory.side_effect = query
+
+        self.inventory.prefetch(["apt", "snap", "apt", "flatpak"], workers=3)
+
+        self.assertEqual(self.runner.app_inventory.call_count, second=3)
+        self.assertTrue(self.inventory.contains({"distributor": "flatpak", "package": "flatpak"}))
+
+    def test__prefetch__failure_raised_on_lookup(self):
+        self.runner.app_inventory.side_effect = RuntimeError(
+            "Distributor 'unknown' not supported yet."
+        )
+
+        self.inventory.prefetch(["unknown"], workers=1)
+
+        with self.assertRaises(RuntimeError):
+            self.inventory.contains({"distributor": "unknown", "package": "test_package"})
+
+
+class TestStateManager(unittest.TestCase):
+
+    @patch('services.CommandRunner.app_inventory')
+    def test__sync_from__sets_cases_from_inventory(self, mock_inventory):
+        mock_inventory.return_value = {"installed", "unwanted"}
+
+        present = Application.create_from_config({
+            "app": "Present",
+            "distributor": "apt",
+            "presented": True,
+            "packages": ["installed", "missing"]
+        })
+        absent = Application.create_from_config({
+            "app": "Absent",
+            "distributor": "apt",
+            "presented": False,
+            "packages": ["unwanted", "never_installed"]
+        })
+        stack = Stack({"applications": [present, absent]})
+
+        State().sync_from(stack=stack, plan_only=False)
+
+        # Verify apt inventory was queried once for all items.
+        mock_inventory.assert_called_once_with("apt")
+
+        self.assertEqual(present.items, {"installed": "ignore", "missing": "to_install"})
+        self.assertEqual(absent.items, {"unwanted": "to_remove", "never_installed": "ignore"})
+
+    @patch('services.CommandRunner.app_inventory')
+    def test__sync_from__journal__skips_converged_units(self, mock_inventory):
+        mock_inventory.return_value = {"installed"}
+
+        with tempfile.TemporaryDirectory() as directory:
+            options = RunOptions(cache_dir=Path(directory))
+
+            def stack():
+                unit = Application.create_from_config({
+                    "app": "Present",
+                    "distributor": "apt",
+                    "presented": True,
+                    "packages": ["installed"]
+                })
+                return Stack({"applications": [unit]}), unit
+
+            # First run probes and records converged unit.
+            first, _ = stack()
+            with patch('inventory.Inventory.contains', return_value=True) as mock_contains:
+                State(options).sync_from(stack=first, plan_only=False)
+            mock_contains.assert_called_once()
+
+            # Second run skips unit without probing.
+            second, unit = stack()
+            with patch('inventory.Inventory.contains') as mock_contains:
+                State(options).sync_from(stack=second, plan_only=False)
+            mock_contains.assert_not_called()
+            self.assertEqual(unit.items, {"installed": "ignore"})
+
+            # Full run probes again.
+            third, _ = stack()
+            with patch('inventory.Inventory.contains', return_value=True) as mock_contains:
+                State(RunOptions(cache_dir=Path(directory), full=True)).sync_from(
+                    stack=third, plan_only=False
+                )
+            mock_contains.assert_called_once()
+
+    def test__sync_from__journal__does_not_skip_applied_commands(self):
+        with tempfile.TemporaryDirectory() as directory:
+            options = RunOptions(cache_dir=Path(directory))
+            unit = Command.create_from_config({
+                "group": "Echo",
+                "commands": ["echo 'hello'"],
+                "execute": True
+            })
+            stack = Stack({"commands": [unit]})
+
+            State(options).sync_from(stack=stack, plan_only=False)
+            self.assertEqual(unit.items, {"echo 'hello'": "as_unit"})
+
+            # Verify the group is executed again (e.g. to fix drift), even when it is in the journal.
+            State(options)._journal.record(unit.digest(), None)
+
+            State(options).sync_from(stack=stack, plan_only=False)
+            self.assertEqual(unit.items, {"echo 'hello'": "as_unit"})
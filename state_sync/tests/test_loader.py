@@ -0,0 +1,125 @@
+"""Provides test functionality for ConfigLoader class."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from loader import ConfigLoader as Loader
+from models import Stack
+from tools import Parsers
+
+
+def fragment(path: Path, pools: list[str] = None, include: list[str] = None, **units) -> None:
+    config = {"global": {"pool_to_synchronize": pools}} if pools else {}
+    if include:
+        config["include"] = include
+    for name, section in units.items():
+        config.setdefault("applications", {})[name] = section
+    path.write_text(json.dumps(config))
+
+
+def unit(name: str, packages: list[str]) -> dict:
+    return {"app": name, "presented": True, "distributor": "apt", "packages": packages}
+
+
+def names(stack: Stack) -> list[str]:
+    return [unit.name for unit in stack]
+
+
+class TestConfigLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.loader = Loader(cache_dir=self.root / "cache")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test__stack__directory_in_name_order(self):
+        (self.root / "teams").mkdir()
+        fragment(self.root / "teams" / "b.yml", editors=[unit("Vim", ["vim"])])
+        fragment(self.root / "teams" / "a.yaml", pools=["applications"], tools=[unit("Git", ["git"])])
+        (self.root / "teams" / "notes.txt").write_text("not a config")
+
+        stack = self.loader.stack(self.root / "teams")
+
+        self.assertEqual(names(stack), ["Git", "Vim"])
+
+    def test__stack__includes_after_including_file(self):
+        (self.root / "parts").mkdir()
+        fragment(self.root / "parts" / "one.yml", include=["../shared.yml"], one=[unit("One", ["a"])])
+        fragment(self.root / "parts" / "two.yml", two=[unit("Two", ["b"])])
+        fragment(self.root / "shared.yml", shared=[unit("Shared", ["c"])])
+        fragment(
+            self.root / "main.yml", pools=["applications"], include=["parts/*.yml"], main=[unit("Main", ["d"])]
+        )
+
+        stack = self.loader.stack(self.root / "main.yml")
+
+        self.assertEqual(names(stack), ["Main", "One", "Shared", "Two"])
+
+    def test__stack__missing_include(self):
+        fragment(self.root / "main.yml", pools=["applications"], include=["absent.yml"])
+
+        with self.assertRaises(RuntimeError) as context:
+            self.loader.stack(self.root / "main.yml")
+        self.assertIn("'absent.yml' not found", str(context.exception))
+
+    def test__stack__duplicate_units(self):
+        fragment(self.root / "a.yml", pools=["applications"], one=[unit("Editor", ["vim"])])
+        fragment(self.root / "b.yml", two=[unit("Editor", ["vim"])])
+        # Verify equal definitions are merged.
+        self.assertEqual(names(self.loader.stack(self.root)), ["Editor"])
+
+        fragment(self.root / "b.yml", two=[unit("Editor", ["nano"])])
+        with self.assertRaises(RuntimeError) as context:
+            self.loader.stack(self.root)
+        self.assertIn("a.yml", str(context.exception))
+        self.assertIn("b.yml", str(context.exception))
+
+    def test__stack__shared_packages_deduplicated(self):
+        fragment(self.root / "a.yml", pools=["applications"], one=[unit("Editor", ["vim", "git"])])
+        fragment(self.root / "b.yml", two=[unit("Tools", ["git", "curl"]), unit("Vcs", ["git"])])
+
+        stack = self.loader.stack(self.root)
+
+        # Verify every package is kept in the first unit only.
+        self.assertEqual([list(unit.items) for unit in stack], [["vim", "git"], ["curl"], []])
+        self.assertEqual(stack.count("apt", "not_defined"), 3)
+
+    def test__stack__shared_packages_kept_in_first_synchronized_unit(self):
+        fragment(self.root / "a.yml", pools=["applications"], one=[
+            {**unit("Editor", ["vim", "git"]), "after": ["Tools"]},
+            unit("Tools", ["git", "curl"])
+        ])
+
+        stack = self.loader.stack(self.root)
+
+        # Verify 'git' is kept in 'Tools', it is synchronized before 'Editor'.
+        self.assertEqual([list(unit.items) for unit in stack], [["vim"], ["git", "curl"]])
+
+    def test__stack__contradictory_package_states__failure(self):
+        fragment(self.root / "a.yml", pools=["applications"], one=[unit("Editor", ["vim"]), unit("Tools", ["vim"])])
+        fragment(self.root / "b.yml", two=[{**unit("Cleanup", ["vim", "nano"]), "presented": False}])
+
+        with self.assertRaises(RuntimeError) as context:
+            self.loader.stack(self.root)
+        self.assertEqual(
+            str(context.exception),
+            "Contradictory package states --> vim (apt) presented in 'Editor', 'Tools', not presented in 'Cleanup'."
+        )
+
+    def test__stack__only_changed_fragment_parsed(self):
+        fragment(self.root / "a.yml", pools=["applications"], one=[unit("One", ["a"])])
+        fragment(self.root / "b.yml", two=[unit("Two", ["b"])])
+        self.loader.stack(self.root)
+
+        fragment(self.root / "b.yml", two=[unit("Two", ["b", "c"])])
+        with patch("tools.Parsers.yaml", side_effect=Parsers.yaml) as parse:
+            stack = self.loader.stack(self.root)
+
+        parse.assert_called_once()
+        self.assertEqual(parse.call_args.args[0].name, "b.yml")
+        self.assertEqual(list(stack.units("applications")[1].items), ["b", "c"])
@@ -0,0 +1,62 @@
+"""Provides test functionality for Metrics class."""
+
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from metrics import Metrics
+from services import CommandRunner
+from tracing import Tracer
+
+
+class TestMetrics(unittest.TestCase):
+
+    def tearDown(self):
+        Metrics.stop()
+
+    def test__render__from_spans_and_items(self):
+        metrics = Metrics.start(flow="plan")
+        with Tracer.span("parse"):
+            pass
+        with Tracer.span("probe", distributor="apt"):
+            pass
+        with self.assertRaises(RuntimeError):
+            CommandRunner()._execute(item="group", commands=["true", "false", "true"])
+        Metrics.count_item("apt", "to_install")
+        Metrics.count_item("apt", "to_install")
+        Metrics.stop()
+
+        text = metrics.render(succeeded=False)
+
+        self.assertIn('state_sync_run_success{flow="plan"} 0', text)
+        self.assertIn('state_sync_phase_duration_seconds{flow="plan",phase="parse"}', text)
+        self.assertIn('state_sync_probe_duration_seconds_bucket{flow="plan",distributor="apt",le="+Inf"} 1', text)
+        self.assertIn('state_sync_probe_duration_seconds_count{flow="plan",distributor="apt"} 1', text)
+        self.assertIn('state_sync_items{flow="plan",distributor="apt",case="to_install"} 2', text)
+        self.assertIn('# TYPE state_sync_commands_executed gauge', text)
+        self.assertIn('state_sync_commands_executed{flow="plan"} 2', text)
+        self.assertIn('state_sync_commands_failed{flow="plan"} 1', text)
+
+    def test__stop__unsubscribes_from_spans(self):
+        metrics = Metrics.start(flow="plan")
+        Metrics.stop()
+
+        with Tracer.span("command"):
+            pass
+        Metrics.count_item("apt", "ignore")
+
+        self.assertIn('state_sync_commands_executed{flow="plan"} 0', metrics.render(succeeded=True))
+        self.assertNotIn("state_sync_items{", metrics.render(succeeded=True))
+
+    def test__save__replaces_file_atomically(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "state_sync.prom"
+            path.write_text("old")
+
+            Metrics(flow="apply").save(path, succeeded=True)
+
+            self.assertIn('state_sync_run_success{flow="apply"} 1', path.read_text())
+            # Verify no temporary files left and the exporter can read the file.
+            self.assertEqual(os.listdir(directory), ["state_sync.prom"])
+            self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o644)
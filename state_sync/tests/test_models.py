@@ -0,0 +1,57 @@
+"""Provides test functionality for Stack class."""
+
+import copy
+import pickle
+import unittest
+from models import Application, Command, ItemCase, Stack
+
+
+def app(name: str, distributor: str, packages: list[str]) -> Application:
+    return Application.create_from_config({
+        "app": name, "distributor": distributor, "presented": True, "packages": packages
+    })
+
+
+class TestStack(unittest.TestCase):
+
+    def setUp(self):
+        self.editor = app("Editor", "apt", ["vim", "git"])
+        self.player = app("Player", "snap", ["vlc"])
+        self.tools = app("Tools", "apt", ["git", "curl"])
+        self.group = Command.create_from_config({"group": "Echo", "commands": ["echo 1"], "execute": True})
+        self.stack = Stack({
+            "applications": [self.editor, self.player, self.tools],
+            "commands": [self.group]
+        })
+
+    def test__indexes(self):
+        self.assertEqual(self.stack.pools(), ["applications", "commands"])
+        self.assertEqual(list(self.stack), [self.editor, self.player, self.tools, self.group])
+        self.assertEqual(self.stack.units("commands"), [self.group])
+        self.assertEqual(self.stack.distributors(), ["apt", "snap"])
+        self.assertEqual(self.stack.applications("apt"), [self.editor, self.tools])
+        self.assertEqual(self.stack.holders("apt", "git"), [self.editor, self.tools])
+        self.assertEqual(self.stack.count("apt", ItemCase.NOT_DEFINED), 4)
+
+    def test__items__follow_case_changes(self):
+        self.tools.set_item_sync_case(item="curl", case="to_install")
+        self.editor.set_item_sync_case(item="vim", case=ItemCase.TO_INSTALL)
+        self.editor.set_item_sync_case(item="git", case="to_remove")
+        self.editor.set_item_sync_case(item="git", case="ignore")
+
+        self.assertEqual(self.stack.items("apt", "to_install"), [(self.tools, "curl"), (self.editor, "vim")])
+        self.assertEqual(self.stack.items("apt", "to_remove"), [])
+        self.assertEqual(self.stack.count("apt", "not_defined"), 1)
+        self.assertEqual(self.stack.count("snap", "to_install"), 0)
+
+    def test__copies__keep_own_indexes(self):
+        for copied in (copy.deepcopy(self.stack), pickle.loads(pickle.dumps(self.stack))):
+            self.assertEqual(copied, self.stack)
+            copied.units("applications")[1].set_item_sync_case(item="vlc", case="to_install")
+
+            self.assertEqual(copied.count("snap", "to_install"), 1)
+            self.assertEqual(self.stack.count("snap", "to_install"), 0)
+
+        # Verify unit belongs to one stack.
+        with self.assertRaises(RuntimeError):
+            Stack({"applications": [self.editor]})
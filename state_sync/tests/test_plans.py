@@ -0,0 +1,73 @@
+"""Provides test functionality for PlanFile class."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from metrics import Metrics
+from models import Application, Stack
+from plans import PlanFile
+
+
+def stack_of(*packages: str) -> Stack:
+    unit = Application.create_from_config({
+        "app": "Editor", "presented": True, "distributor": "apt", "packages": list(packages)
+    })
+    return Stack({"applications": [unit]})
+
+
+class TestPlanFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "plan.json"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @patch("plans.stamp", return_value="stamp")
+    def test__save_load__apply_to(self, _):
+        stack = stack_of("vim", "git")
+        unit = stack.units("applications")[0]
+        unit.set_item_sync_case(item="vim", case="to_install")
+        unit.set_item_sync_case(item="git", case="ignore")
+        PlanFile.create(stack, PlanFile.fingerprint(stack)).save(self.path)
+
+        fresh = stack_of("vim", "git")
+        plan = PlanFile.load(self.path)
+
+        metrics = Metrics.start(flow="apply")
+        try:
+            self.assertIsNone(plan.drift(fresh))
+            self.assertEqual(plan.apply_to(fresh).units()[0].items, {"vim": "to_install", "git": "ignore"})
+        finally:
+            Metrics.stop()
+
+        # Verify planned items are counted as the state manager counts them.
+        text = metrics.render(succeeded=True)
+        self.assertIn('state_sync_items{flow="apply",distributor="apt",case="to_install"} 1', text)
+        self.assertIn('state_sync_items{flow="apply",distributor="apt",case="ignore"} 1', text)
+
+    @patch("plans.stamp", return_value="stamp")
+    def test__drift(self, mock_stamp):
+        plan = PlanFile.create(stack_of("vim"), PlanFile.fingerprint(stack_of("vim")))
+
+        self.assertEqual(plan.drift(stack_of("nano")), "config changed")
+        mock_stamp.return_value = "changed"
+        self.assertEqual(plan.drift(stack_of("vim")), "apt changed")
+
+    def test__load__not_a_plan(self):
+        self.path.write_text("[]")
+
+        with self.assertRaises(RuntimeError):
+            PlanFile.load(self.path)
+        with self.assertRaises(RuntimeError):
+            PlanFile.load(self.path.with_name("absent.json"))
+
+    def test__load__invalid_cases(self):
+        for cases in ([[{"vim": "to_upgrade"}]], [{"vim": "to_install"}], [[["vim"]]], {"vim": "ignore"}):
+            self.path.write_text(json.dumps({"version": PlanFile.VERSION, "config": "", "cases": cases}))
+
+            with self.assertRaises(RuntimeError):
+                PlanFile.load(self.path)
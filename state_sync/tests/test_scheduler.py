@@ -0,0 +1,133 @@
+"""Provides test functionality for LaneScheduler class."""
+
+import asyncio
+import unittest
+from scheduler import LaneScheduler as Scheduler
+
+
+class TestLaneScheduler(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+
+    async def test__run__lanes_concurrently_jobs_serially(self):
+        barrier = asyncio.Barrier(2)
+        order = []
+
+        def job(lane: str, number: int):
+            async def run():
+                order.append((lane, number))
+                # First jobs of both lanes must run at the same time.
+                if number == 0:
+                    await asyncio.wait_for(barrier.wait(), timeout=5)
+            return run
+
+        await self.scheduler.run({
+            "apt": [job("apt", 0), job("apt", 1)],
+            "snap": [job("snap", 0), job("snap", 1)]
+        })
+
+        # Verify every lane kept its own order.
+        self.assertEqual([n for lane, n in order if lane == "apt"], [0, 1])
+        self.assertEqual([n for lane, n in order if lane == "snap"], [0, 1])
+
+    async def test__run__first_failure_stops_other_lanes(self):
+        failed = asyncio.Event()
+        executed = []
+
+        async def failing():
+            failed.set()
+            raise RuntimeError("apt --> Error code: '100' (apt)")
+
+        async def waiting():
+            # Waits until the other lane failed.
+            await asyncio.wait_for(failed.wait(), timeout=5)
+            executed.append("first")
+
+        async def append(name: str):
+            executed.append(name)
+
+        with self.assertRaises(RuntimeError) as context_manager:
+            with self.assertLogs("StateSync", level="WARNING") as logs:
+                await self.scheduler.run({
+                    "snap": [waiting, lambda: append("second")],
+                    "apt": [failing, lambda: append("apt")]
+                })
+
+        # Verify running job was completed and no more jobs were started.
+        self.assertEqual(executed, ["first"])
+        self.assertEqual(str(context_manager.exception), "apt --> Error code: '100' (apt)")
+        self.assertIn("[snap] --> Stopped after failure in another lane.", logs.output[0])
+
+    async def test__run__other_exception_stops_other_lanes(self):
+        executed = []
+
+        async def failing():
+            raise OSError("No space left on device")
+
+        async def append(name: str):
+            await asyncio.sleep(0)
+            executed.append(name)
+
+        with self.assertRaises(OSError), self.assertLogs("StateSync", level="WARNING"):
+            await self.scheduler.run({
+                "snap": [lambda: append("first"), lambda: append("second")],
+                "apt": [failing]
+            })
+
+        # Verify the error is not lost and the other lane was stopped.
+        self.assertEqual(executed, ["first"])
+        self.assertTrue(self.scheduler.stopped)
+
+    async def test__run_ready__ready_node_does_not_wait_for_unrelated_nodes(self):
+        # 0 (slow) and 1 are independent, 2 depends on 1 only.
+        fast_done = asyncio.Event()
+        order = []
+
+        async def job(lane: str, nodes: list[int]):
+            if nodes == [0]:
+                # Passes only when node 2 runs while node 0 still runs.
+                await asyncio.wait_for(fast_done.wait(), timeout=5)
+            order.append(nodes)
+            if nodes == [2]:
+                fast_done.set()
+
+        await self.scheduler.run_ready([set(), set(), {1}], ["slow", "fast", "next"], job)
+
+        self.assertEqual(order, [[1], [2], [0]])
+
+    async def test__run_ready__ready_nodes_of_busy_lane_batched(self):
+        release = asyncio.Event()
+        jobs = []
+
+        async def job(lane: str, nodes: list[int]):
+            jobs.append((lane, nodes))
+            if nodes == [0]:
+                await asyncio.wait_for(release.wait(), timeout=5)
+            elif lane == "group":
+                release.set()
+
+        # 1 and 2 become ready after the group while 'apt' runs 0, 4 has nothing to run.
+        await self.scheduler.run_ready(
+            [set(), {3}, {3, 4}, set(), set()],
+            ["apt", "apt", "apt", "group", None],
+            job
+        )
+
+        self.assertEqual(jobs, [("apt", [0]), ("group", [3]), ("apt", [1, 2])])
+
+    async def test__run_ready__failure_stops_dependents_and_other_lanes(self):
+        jobs = []
+
+        async def job(lane: str, nodes: list[int]):
+            jobs.append(nodes)
+            if lane == "apt":
+                raise RuntimeError("apt --> Error code: '100' (apt)")
+
+        with self.assertRaises(RuntimeError), self.assertLogs("StateSync", level="WARNING") as logs:
+            await self.scheduler.run_ready([set(), {0}, set()], ["apt", "snap", "flatpak"], job, workers=1)
+
+        # Verify neither the dependent nor the lane waiting for a worker were started.
+        self.assertEqual(jobs, [[0]])
+        self.assertIn("[flatpak] --> Stopped after failure in another lane.", logs.output[0])
+        self.assertTrue(self.scheduler.stopped)
@@ -0,0 +1,75 @@
+"""Provides test functionality for ShellWorker class."""
+
+import asyncio
+import subprocess
+import unittest
+from unittest.mock import patch
+from services import AsyncCommandRunner as AsyncRunner
+from shell import ShellWorker as Shell
+
+
+class TestShellWorker(unittest.TestCase):
+
+    def test__run__exit_code_and_output_per_command(self):
+        with Shell() as shell:
+            first = shell.run("echo 'hello'; echo 'world' >&2")
+            second = shell.run("printf 'no newline'; exit 4")
+            third = shell.run("cat; echo $?")
+
+        self.assertEqual(first, (0, ["hello\n", "world\n"]))
+        self.assertEqual(second, (4, ["no newline"]))
+        # Verify commands can't read the shell pipe.
+        self.assertEqual(third, (0, ["0\n"]))
+
+    def test__run__commands_are_isolated(self):
+        with Shell() as shell:
+            shell.run("cd /tmp; VALUE=1; exit 1")
+            result = shell.run("pwd; echo \"${VALUE:-unset}\"")
+
+        self.assertEqual(result[0], 0)
+        self.assertEqual(result[1][1], "unset\n")
+        self.assertNotEqual(result[1][0], "/tmp\n")
+
+    def test__run__malformed_command(self):
+        with Shell() as shell:
+            code, output = shell.run('echo "foo')
+            result = shell.run("echo 'next'")
+
+        # Verify syntax error is the exit code and the shell keeps working.
+        self.assertNotEqual(code, 0)
+        self.assertTrue(output)
+        self.assertEqual(result, (0, ["next\n"]))
+
+    def test__run__timeout(self):
+        with Shell(timeout=0.3) as shell:
+            code, _ = shell.run("echo 'started'; sleep 10")
+
+        self.assertEqual(code, Shell.TIMEOUT_CODE)
+
+    def test__run__one_process_for_all_commands(self):
+        with patch('subprocess.Popen', wraps=subprocess.Popen) as mock_popen:
+            with Shell() as shell:
+                for number in range(10):
+                    self.assertEqual(shell.run(f"echo {number}"), (0, [f"{number}\n"]))
+
+        mock_popen.assert_called_once()
+
+
+class TestCommandRunnerPersistentShell(unittest.TestCase):
+
+    @patch('subprocess.run')
+    def test__commands_execute__failure_stops_group(self, mock_run):
+        runner = AsyncRunner(prefix="commands", persistent_shell=True)
+
+        with self.assertRaises(RuntimeError) as context_manager:
+            with self.assertLogs("StateSync", level="INFO") as logs:
+                asyncio.run(runner.commands_execute(
+                    item="Test unit",
+                    commands={"echo 'first'": "as_unit", "exit 2": "as_unit", "echo 'third'": "as_unit"}
+                ))
+
+        # Verify no process per command was started.
+        mock_run.assert_not_called()
+        self.assertEqual(str(context_manager.exception), "Test unit --> Error code: '2' (exit 2)")
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("[commands] first", logs.output[0])
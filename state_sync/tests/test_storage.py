@@ -0,0 +1,161 @@
+"""Provides test functionality for InventoryStore class."""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+from storage import InventoryStore as Store
+from storage import StateJournal as Journal
+from storage import Snapshot
+from models import Application, Stack
+
+
+class TestInventoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.status = self.root / "status"
+        self.status.write_text("")
+        self.dpkg_log = self.root / "dpkg.log"
+        self.dpkg_log.write_text("2025-01-01 10:00:00 status installed bash:amd64 5.2-1\n")
+
+        self.store = Store(
+            path=self.root / "cache" / "inventory.sqlite3",
+            signals={"apt": [str(self.status)], "snap": [str(self.root / "state.json")]},
+            dpkg_log=str(self.dpkg_log)
+        )
+        self.scan = MagicMock(return_value={"bash", "vim"})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def touch_status(self):
+        """Changes modification time of dpkg status file."""
+        stat = os.stat(self.status)
+        os.utime(self.status, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def append_log(self, *records: str):
+        with open(self.dpkg_log, "a", encoding="utf-8") as log:
+            for record in records:
+                log.write(f"2025-01-02 10:00:00 {record}\n")
+
+    def test__load__unchanged__served_from_cache(self):
+        self.assertEqual(self.store.load("apt", self.scan), {"bash", "vim"})
+        self.assertEqual(self.store.load("apt", self.scan), {"bash", "vim"})
+
+        # Verify distributor was queried once.
+        self.scan.assert_called_once()
+        self.assertEqual(self.store.generation("apt"), 1)
+
+    def test__load__dpkg_log__incremental_refresh(self):
+        self.store.load("apt", self.scan)
+
+        self.append_log(
+            "startup packages remove",
+            "status half-configured vim:amd64 9.1",
+            "status not-installed vim:amd64 <none>",
+            "status installed git:amd64 2.45",
+            "status config-files curl:amd64 8.5"
+        )
+        self.touch_status()
+
+        self.assertEqual(self.store.load("apt", self.scan), {"bash", "git"})
+
+        # Verify refresh came from the log only.
+        self.scan.assert_called_once()
+        self.assertEqual(self.store.generation("apt"), 2)
+
+    def test__load__no_log_records__rescan(self):
+        self.store.load("apt", self.scan)
+        self.touch_status()
+        self.scan.return_value = {"bash"}
+
+        self.assertEqual(self.store.load("apt", self.scan), {"bash"})
+        self.assertEqual(self.scan.call_count, second=2)
+
+    def test__load__rotated_log__rescan(self):
+        self.store.load("apt", self.scan)
+
+        self.dpkg_log.rename(self.root / "dpkg.log.1")
+        self.dpkg_log.write_text("2025-01-02 10:00:00 status installed git:amd64 2.45\n")
+        self.touch_status()
+        self.scan.return_value = {"bash", "vim", "git"}
+
+        self.assertEqual(self.store.load("apt", self.scan), {"bash", "vim", "git"})
+        self.assertEqual(self.scan.call_count, second=2)
+
+    def test__load__signal_appeared__rescan(self):
+        self.scan.return_value = set()
+        self.store.load("snap", self.scan)
+
+        # Verify same content does not change generation.
+        (self.root / "state.json").write_text("{}")
+        self.store.load("snap", self.scan)
+        self.assertEqual(self.scan.call_count, second=2)
+        self.assertEqual(self.store.generation("snap"), 1)
+
+        (self.root / "state.json").write_text("{ }")
+        os.utime(self.root / "state.json", ns=(0, 1))
+        self.scan.return_value = {"hello-world"}
+        self.assertEqual(self.store.load("snap", self.scan), {"hello-world"})
+        self.assertEqual(self.store.generation("snap"), 2)
+
+
+class TestStateJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = Journal(Path(self.directory.name) / "journal.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test__converged__same_digest_and_generation(self):
+        self.journal.record("digest", 3)
+
+        self.assertTrue(self.journal.converged("digest", 3))
+        self.assertFalse(self.journal.converged("digest", 4))
+        self.assertFalse(self.journal.converged("other", 3))
+
+    def test__converged__without_generation(self):
+        self.journal.record("digest", None)
+
+        self.assertTrue(self.journal.converged("digest", None))
+        self.assertFalse(self.journal.converged("digest", 1))
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.snapshots = Snapshot(self.root / "stacks")
+        self.config = self.root / "config.yml"
+        self.stack = Stack({
+            "applications": [Application.create_from_config({"app": "Editor", "distributor": "apt", "packages": ["vim"]})]
+        })
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test__load__same_content(self):
+        self.snapshots.save(self.config, b"content", self.stack)
+
+        self.assertEqual(self.snapshots.load(self.config, b"content"), self.stack)
+        # Verify changed config and another file are not served.
+        self.assertIsNone(self.snapshots.load(self.config, b"changed"))
+        self.assertIsNone(self.snapshots.load(self.root / "other.yml", b"content"))
+
+    def test__load__other_version_or_broken(self):
+        self.snapshots.save(self.config, b"content", self.stack)
+        Snapshot.VERSION, version = Snapshot.VERSION + 1, Snapshot.VERSION
+        try:
+            self.assertIsNone(self.snapshots.load(self.config, b"content"))
+        finally:
+            Snapshot.VERSION = version
+
+        for path in (self.root / "stacks").iterdir():
+            path.write_bytes(b"broken")
+        self.assertIsNone(self.snapshots.load(self.config, b"content"))
@@ -0,0 +1,334 @@
+"""Provides test functionality for SyncManager class."""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+from models import Application, Command, RunOptions, Stack
+from services import SyncManager as Sync
+
+
+def application(name: str, distributor: str, items: dict, classic: bool = None) -> Application:
+    """Creates application unit with already defined update cases."""
+    unit = Application.create_from_config({
+        "app": name,
+        "distributor": distributor,
+        "classic": classic,
+        "presented": True
+    })
+    unit.items.update(items)
+    return unit
+
+
+class TestSyncManager(unittest.TestCase):
+
+    def setUp(self):
+        # Downloads are checked by 'test__state_from__downloads_while_earlier_waves_run'.
+        download = patch('services.AsyncCommandRunner.app_items_download', return_value=True)
+        self.mock_download = download.start()
+        self.addCleanup(download.stop)
+
+    def test__transactions_from__groups_by_distributor_and_flags(self):
+        units = [
+            application("First", "apt", {"a": "to_install", "b": "ignore"}),
+            application("Second", "snap", {"c": "to_install"}),
+            application("Third", "snap", {"d": "to_install", "h": "to_install"}, classic=True),
+            application("Fourth", "apt", {"e": "to_install", "f": "to_remove"}),
+            application("Fifth", "snap", {"g": "to_install"})
+        ]
+
+        transactions = Sync._transactions_from(units)
+
+        self.assertEqual(
+            [(t["case"], t["distributor"], t["classic"], t["packages"]) for t in transactions],
+            [
+                ("to_remove", "apt", None, ["f"]),
+                ("to_install", "apt", None, ["a", "e"]),
+                ("to_install", "snap", None, ["c", "g"]),
+                ("to_install", "snap", True, ["d"]),
+                ("to_install", "snap", True, ["h"])
+            ]
+        )
+
+    @patch('services.AsyncCommandRunner.app_items_install')
+    def test__state_from__one_transaction_per_distributor(self, mock_install):
+        stack = Stack({
+            "applications": [
+                application("First", "apt", {"a": "to_install", "b": "to_install"}),
+                application("Second", "apt", {"c": "to_install"})
+            ]
+        })
+
+        Sync().state_from(stack)
+
+        mock_install.assert_called_once_with(context={
+            "case": "to_install",
+            "distributor": "apt",
+            "classic": None,
+            "packages": ["a", "b", "c"]
+        })
+
+    @patch('services.AsyncCommandRunner.app_items_install')
+    def test__state_from__lane_per_distributor(self, mock_install):
+        stack = Stack({
+            "applications": [
+                application("First", "apt", {"a": "to_install"}),
+                application("Second", "snap", {"b": "to_install"}),
+                application("Third", "flatpak", {"c": "to_install"})
+            ]
+        })
+
+        with self.assertLogs("StateSync", level="WARNING") as logs:
+            Sync().state_from(stack)
+
+        self.assertEqual(mock_install.call_count, second=3)
+
+        # Verify lanes output is prefixed.
+        self.assertTrue(any("[apt] apt (a) --> Installation starts:" in line for line in logs.output))
+        self.assertTrue(any("[snap] snap (b) --> Installation starts:" in line for line in logs.output))
+
+    @patch('services.AsyncCommandRunner.app_items_install')
+    def test__state_from__bisects_failed_transaction(self, mock_install):
+        def install(context):
+            if "c" in context["packages"]:
+                raise RuntimeError(f"{" ".join(context["packages"])} --> Error code: '100' (apt)")
+            return True
+
+        mock_install.side_effect = install
+        stack = Stack({"applications": [application("First", "apt", {p: "to_install" for p in "abcd"})]})
+
+        with self.assertRaises(RuntimeError) as context_manager:
+            Sync().state_from(stack)
+
+        # Verify the failing package was found: [abcd] -> [ab] ok, [cd] -> [c] fails.
+        self.assertEqual(
+            [call.kwargs["context"]["packages"] for call in mock_install.call_args_list],
+            [["a", "b", "c", "d"], ["a", "b"], ["c", "d"], ["c"]]
+        )
+        self.assertEqual(str(context_manager.exception), "c --> Error code: '100' (apt)")
+
+    @patch('services.AsyncCommandRunner.app_items_install')
+    def test__state_from__no_bisection_after_failure_in_another_lane(self, mock_install):
+        sync = Sync(RunOptions(workers=2, prefetch=False))
+
+        async def install(context):
+            if context["distributor"] == "snap":
+                raise RuntimeError("b --> Error code: '1' (snap)")
+            # Fails after the snap lane failed.
+            while not sync._scheduler.stopped:
+                await asyncio.sleep(0.01)
+            raise RuntimeError(f"{" ".join(context["packages"])} --> Error code: '100' (apt)")
+
+        mock_install.side_effect = install
+        stack = Stack({
+            "applications": [
+                application("First", "apt", {p: "to_install" for p in "acd"}),
+                application("Second", "snap", {"b": "to_install"})
+            ]
+        })
+
+        with self.assertLogs("StateSync", level="WARNING"), self.assertRaises(RuntimeError):
+            sync.state_from(stack)
+
+        self.assertEqual(
+            [call.kwargs["context"]["packages"] for call in mock_install.call_args_list if
+             call.kwargs["context"]["distributor"] == "apt"],
+            [["a", "c", "d"]]
+        )
+
+    @patch('services.AsyncCommandRunner.commands_execute')
+    def test__state_from__independent_groups_concurrently(self, mock_execute):
+        barrier = asyncio.Barrier(2)
+
+        async def execute(item, commands):
+            # Passes only when both groups are executed at the same time.
+            await asyncio.wait_for(barrier.wait(), timeout=5)
+            return True
+
+        mock_execute.side_effect = execute
+        groups = [
+            Command.create_from_config({"group": name, "commands": ["true"], "execute": True, "after": []})
+            for name in ("First", "Second")
+        ]
+
+        with self.assertLogs("StateSync", level="WARNING"):
+            Sync(RunOptions(workers=2)).state_from(Stack({"commands": groups}))
+
+        self.assertEqual(mock_execute.await_count, second=2)
+
+    @patch('services.AsyncCommandRunner.commands_execute')
+    def test__state_from__ready_units_do_not_wait_for_unrelated_units(self, mock_execute):
+        finished = asyncio.Event()
+        events = []
+
+        async def execute(item, commands):
+            if item == "Slow":
+                # Passes only when 'Next' is executed while this group runs.
+                await asyncio.wait_for(finished.wait(), timeout=5)
+            events.append(item)
+            if item == "Next":
+                finished.set()
+            return True
+
+        mock_execute.side_effect = execute
+        groups = [
+            Command.create_from_config({"group": name, "commands": ["true"], "execute": True, "after": after})
+            for name, after in (("Slow", []), ("Fast", []), ("Next", ["Fast"]))
+        ]
+
+        with self.assertLogs("StateSync", level="WARNING"):
+            Sync(RunOptions(workers=4)).state_from(Stack({"commands": groups}))
+
+        self.assertEqual(events, ["Fast", "Next", "Slow"])
+
+    @patch('services.AsyncCommandRunner._execute')
+    def test__state_from__cleanup_once_per_distributor(self, mock_execute):
+        stack = Stack({
+            "applications": [
+                application("First", "apt", {"a": "to_remove"}),
+                application("Second", "flatpak", {"b": "to_remove"}),
+                application("Third", "snap", {"c": "to_remove"}),
+                application("Fourth", "apt", {"d": "to_install"})
+            ]
+        })
+        # Removings in two dependency waves.
+        stack.units("applications")[1].additionally["after"] = ["First"]
+
+        with self.assertLogs("StateSync", level="WARNING"):
+            Sync(RunOptions(workers=1)).state_from(stack)
+
+        commands = [command for call in mock_execute.call_args_list for command in call.kwargs["commands"]]
+        self.assertEqual(commands.count("sudo apt autoremove -y"), 1)
+        self.assertEqual(commands.count("sudo flatpak uninstall -y --unused"), 1)
+        # Verify cleanup runs after all removings and installations.
+        self.assertEqual(
+            sorted(commands[-2:]),
+            ["sudo apt autoremove -y", "sudo flatpak uninstall -y --unused"]
+        )
+
+    @patch('services.AsyncCommandRunner._execute')
+    def test__state_from__no_cleanup_after_failed_removing(self, mock_execute):
+        def execute(item, commands):
+            if any("purge" in command for command in commands):
+                raise RuntimeError(f"{item} --> Error code: '100' (apt)")
+            return True
+
+        mock_execute.side_effect = execute
+        stack = Stack({"applications": [application("First", "apt", {"a": "to_remove", "b": "to_install"})]})
+
+        with self.assertLogs("StateSync", level="WARNING"), self.assertRaises(RuntimeError):
+            Sync().state_from(stack)
+
+        commands = [command for call in mock_execute.call_args_list for command in call.kwargs["commands"]]
+        self.assertEqual(commands, ["sudo apt purge a -y"])
+
+    @patch('services.AsyncCommandRunner.commands_execute')
+    @patch('services.AsyncCommandRunner.app_items_install')
+    def test__state_from__downloads_while_earlier_units_run(self, mock_install, mock_execute):
+        events = []
+        downloaded = asyncio.Event()
+
+        async def download(context):
+            events.append(("download", context["distributor"], context["packages"]))
+            if len(events) == 3:
+                downloaded.set()
+            return True
+
+        async def execute(item, commands):
+            # Downloads wait for the group (e.g. adding their repository).
+            await asyncio.sleep(0.05)
+            events.append(("commands", item))
+            return True
+
+        async def install(context):
+            if context["distributor"] == "snap":
+                # Passes only when the downloads run while the snap is installed.
+                await asyncio.wait_for(downloaded.wait(), timeout=5)
+            events.append(("install", context["distributor"], context["packages"]))
+            return True
+
+        self.mock_download.side_effect = download
+        mock_execute.side_effect = execute
+        mock_install.side_effect = install
+        stack = Stack({
+            "commands": [Command.create_from_config({"group": "Repository", "commands": ["true"], "execute": True})],
+            "applications": [
+                application("Player", "snap", {"s": "to_install"}),
+                Application.create_from_config({"app": "Editor", "distributor": "apt", "after": ["Player"]}),
+                Application.create_from_config({"app": "Viewer", "distributor": "flatpak", "after": ["Player"]})
+            ]
+        })
+        stack.units("applications")[1].set_item_sync_case(item="a", case="to_install")
+        stack.units("applications")[2].set_item_sync_case(item="f", case="to_install")
+
+        with self.assertLogs("StateSync", level="INFO"):
+            Sync(RunOptions(workers=4)).state_from(stack)
+
+        self.assertEqual(events[0], ("commands", "Repository"))
+        self.assertEqual(sorted(events[1:3]), [("download", "apt", ["a"]), ("download", "flatpak", ["f"])])
+        self.assertEqual(events[3], ("install", "snap", ["s"]))
+        self.assertEqual(sorted(events[4:]), [("install", "apt", ["a"]), ("install", "flatpak", ["f"])])
+
+    @patch('services.AsyncCommandRunner.app_cleanup', return_value=True)
+    @patch('services.AsyncCommandRunner.app_items_remove')
+    @patch('services.AsyncCommandRunner.app_items_install')
+    def test__state_from__download_never_runs_with_distributor_changes(self, mock_install, mock_remove, _):
+        events = []
+        running = []
+
+        def operation(name: str):
+            async def run(context):
+                # Distributor lock is held by one operation at once.
+                self.assertEqual(running, [])
+                running.append(name)
+                await asyncio.sleep(0.01)
+                running.remove(name)
+                events.append((name, context["packages"]))
+                return True
+            return run
+
+        self.mock_download.side_effect = operation("download")
+        mock_remove.side_effect = operation("remove")
+        mock_install.side_effect = operation("install")
+        stack = Stack({
+            "applications": [
+                application("Old", "apt", {"r": "to_remove"}),
+                application("New", "apt", {"i": "to_install"})
+            ]
+        })
+
+        with self.assertLogs("StateSync", level="INFO"):
+            Sync(RunOptions(workers=4)).state_from(stack)
+
+        self.assertEqual(events, [("remove", ["r"]), ("download", ["i"]), ("install", ["i"])])
+
+    @patch('services.AsyncCommandRunner.app_items_install')
+    def test__state_from__failure_cancels_downloads(self, mock_install):
+        cancelled = []
+
+        async def download(context):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(context["distributor"])
+                raise
+            return True
+
+        async def install(context):
+            raise RuntimeError("s --> Error code: '1' (snap)")
+
+        self.mock_download.side_effect = download
+        mock_install.side_effect = install
+        stack = Stack({
+            "applications": [
+                application("Player", "snap", {"s": "to_install"}),
+                Application.create_from_config({"app": "Editor", "distributor": "apt", "after": ["Player"]})
+            ]
+        })
+        stack.units("applications")[1].set_item_sync_case(item="a", case="to_install")
+
+        with self.assertLogs("StateSync", level="INFO"), self.assertRaises(RuntimeError):
+            Sync(RunOptions(workers=2)).state_from(stack)
+
+        # Verify the run doesn't wait for the download of the units that will not be synchronized.
+        self.assertEqual(cancelled, ["apt"])
+        self.assertEqual([call.kwargs["context"]["distributor"] for call in mock_install.call_args_list], ["snap"])
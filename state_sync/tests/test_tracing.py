@@ -0,0 +1,45 @@
+"""Provides test functionality for Tracer class."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from tracing import Tracer
+
+
+class TestTracer(unittest.TestCase):
+
+    def tearDown(self):
+        Tracer.stop()
+
+    def test__span__not_recorded_when_stopped(self):
+        with Tracer.span("parse"):
+            pass
+
+        self.assertIsNone(Tracer.stop())
+
+    def test__save__chrome_trace_events(self):
+        Tracer.start()
+        with Tracer.span("install", distributor="apt", packages=["vim"], classic=None):
+            pass
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "trace.json"
+            Tracer.stop().save(path)
+            events = json.loads(path.read_text())["traceEvents"]
+
+        span = next(event for event in events if event["ph"] == "X")
+        self.assertEqual(span["name"], "install")
+        # Verify 'None' attributes are dropped.
+        self.assertEqual(span["args"], {"distributor": "apt", "packages": ["vim"]})
+        self.assertGreaterEqual(span["dur"], 0)
+        self.assertTrue(any(event["ph"] == "M" and event["tid"] == span["tid"] for event in events))
+
+    def test__span__records_error(self):
+        tracer = Tracer.start()
+        with self.assertRaises(RuntimeError):
+            with Tracer.span("command"):
+                raise RuntimeError("failed")
+
+        span = next(event for event in tracer._events if event["ph"] == "X")
+        self.assertIn("failed", span["args"]["error"])
@@ -0,0 +1,47 @@
+"""Provides test functionality for Watcher class."""
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from watcher import Watcher
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.status = self.root / "dpkg" / "status"
+        self.status.parent.mkdir()
+        self.status.write_text("Package: vim\n")
+        self.absent = self.root / "flatpak" / ".changed"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test__wait__inotify__replaced_file(self):
+        watcher = Watcher([self.status, self.absent], poll_interval=60)
+        self.assertTrue(watcher.inotify)
+        self.assertEqual(watcher.wait(timeout=0.05), set())
+
+        # Replaced by rename, as dpkg does.
+        replacement = self.status.with_name("status-new")
+        replacement.write_text("Package: git\n")
+        os.replace(replacement, self.status)
+
+        started = time.monotonic()
+        self.assertEqual(watcher.wait(timeout=5), {self.status})
+        self.assertLess(time.monotonic() - started, 1)
+        watcher.close()
+
+    def test__wait__polling(self):
+        watcher = Watcher([self.status, self.absent], poll_interval=0.01, inotify=False)
+        self.assertFalse(watcher.inotify)
+
+        self.absent.parent.mkdir()
+        self.absent.touch()
+
+        self.assertEqual(watcher.wait(timeout=5), {self.absent})
+        self.assertEqual(watcher.wait(timeout=0.05), set())
@@ -1,21 +1,26 @@
 """Tools for Dispatcher."""
 
 from pathlib import Path
-import yaml
-from models import Application, Command
+from graph import UnitGraph
+from helpers import LazyModule
+from models import Application, Command, Stack
+
+yaml = LazyModule("yaml")
 
 
 class Parsers:
     """Defines parsers functionality."""
 
     @staticmethod
-    def yaml(file_path: Path) -> dict:
+    def yaml(file_path: Path, content: bytes = None) -> dict:
         """Returns all data from parsed YAML file as a dict.
 
         Parameters
         ----------
         file_path : str
             Path to file.
+        content : bytes
+            File content if it is already read, the file is not read again.
 
         Returns
         -------
@@ -27,9 +32,14 @@ class Parsers:
         RuntimeError
             When error occurred while reading the file.
         """
+        # libyaml loader is several times faster than the pure-Python one.
+        loader = getattr(yaml, "CSafeLoader", None) or yaml.SafeLoader
         try:
-            with open(file_path, encoding="utf-8") as config:
-                configuration = yaml.safe_load(config)
+            if content is not None:
+                configuration = yaml.load(content, Loader=loader)
+            else:
+                with open(file_path, encoding="utf-8") as config:
+                    configuration = yaml.load(config, Loader=loader)
         except IOError as ioe:
             raise RuntimeError(
                 f"An error occurred while reading the file '{file_path}'."
@@ -42,7 +52,64 @@ class Converters:
     """Defines converters functionality."""
 
     @staticmethod
-    def raw_config_to_stack(config: dict) -> list[dict]:
+    def merge_configs(fragments: list[tuple[str, dict]]) -> dict:
+        """Merges config fragments into one configuration dictionary.
+
+        Pools to synchronize are joined in order of appearance, units of the same
+        pool section are joined in fragments order. Unit defined in several fragments
+        is kept once if all definitions are equal.
+
+        Parameters
+        ----------
+        fragments : list[tuple[str, dict]]
+            Fragment source name with its parsed data.
+
+        Returns
+        -------
+        dict
+            Configuration dictionary.
+
+        Raises
+        -------
+        RuntimeError
+            If units with the same name are defined differently in several fragments.
+        """
+        merged = {"global": {"pool_to_synchronize": []}}
+        pools = merged["global"]["pool_to_synchronize"]
+        # Pool and unit name with the fragment and data of the first definition.
+        defined: dict[tuple[str, str], tuple[str, dict]] = {}
+
+        for source, config in fragments:
+            for record in (config.get("global") or {}).get("pool_to_synchronize") or []:
+                if record not in pools:
+                    pools.append(record)
+
+            for record, sections in config.items():
+                if record in ("global", "include"):
+                    continue
+
+                for section, units in (sections or {}).items():
+                    merged_units = merged.setdefault(record, {}).setdefault(section, [])
+
+                    for unit in units or []:
+                        name = unit.get("app") or unit.get("group") if isinstance(unit, dict) else None
+                        first = defined.setdefault((record, name), (source, unit))
+
+                        # Duplicates inside one fragment are kept as before.
+                        if name is None or first[0] == source:
+                            merged_units.append(unit)
+                        elif first[1] != unit:
+                            raise RuntimeError(
+                                f"Unit '{name}' ({record}) is defined differently in '{first[0]}' and '{source}'."
+                            )
+
+        for record in pools:
+            merged.setdefault(record, {})
+
+        return merged
+
+    @staticmethod
+    def raw_config_to_stack(config: dict) -> Stack:
         """Converts units from configuration
         dictionary to objects.
 
@@ -53,15 +120,15 @@ class Converters:
 
         Returns
         -------
-        list[dict]
-            List of dictionaries with objects.
+        Stack
+            Units of all pools.
 
         Raises
         -------
         RuntimeError
-            If pool model not supported.
+            If pool model not supported or units want contradictory package states.
         """
-        stack = []
+        stack = Stack()
         models_map = {
             "applications": Application,
             "commands": Command
@@ -76,19 +143,67 @@ class Converters:
             if pool_model is None:
                 raise RuntimeError(f"Pool Model for '{record}' not supported yet.")
 
-            pool = {
-                "name": record,
-                "units": []
-            }
+            stack.add_pool(record)
 
             # From all sections in pool.
             for section in config[record]:
                 for unit in config[record][section]:
 
-                    pool["units"].append(
-                        pool_model.create_from_config(unit)
+                    stack.add(
+                        pool=record,
+                        unit=pool_model.create_from_config(unit)
                     )
 
-            stack.append(pool)
+        Converters.deduplicate(stack)
 
         return stack
+
+    @staticmethod
+    def deduplicate(stack: Stack) -> None:
+        """Keeps every distributor package in the application containing it
+        that is synchronized first, so the package is probed and synchronized once.
+
+        Applications are ordered by their dependency waves (see UnitGraph)
+        and then by config order, so the package is synchronized before
+        any unit depending on an application containing it.
+
+        Parameters
+        ----------
+        stack : Stack
+            Stack of all pools.
+
+        Raises
+        -------
+        RuntimeError
+            If applications with the same package want it presented and not presented,
+            all such packages with their applications are reported.
+            Also when units dependencies are invalid (see UnitGraph).
+        """
+        conflicts = []
+        shared = stack.shared()
+        if not shared:
+            return
+
+        # Wave of every unit, units of one wave keep config order.
+        waves = {
+            id(unit): number
+            for number, wave in enumerate(UnitGraph(stack).waves())
+            for unit in wave
+        }
+
+        for (distributor, package), units in shared.items():
+            states = {bool(unit.additionally.get("presented")) for unit in units}
+
+            if len(states) > 1:
+                presented = ", ".join(f"'{unit.name}'" for unit in units if unit.additionally.get("presented"))
+                absent = ", ".join(f"'{unit.name}'" for unit in units if not unit.additionally.get("presented"))
+                conflicts.append(f"{package} ({distributor}) presented in {presented}, not presented in {absent}")
+                continue
+
+            holder = min(units, key=lambda unit: waves[id(unit)])
+            for unit in units:
+                if unit is not holder:
+                    stack.discard(unit, package)
+
+        if conflicts:
+            raise RuntimeError(f"Contradictory package states --> {"; ".join(conflicts)}.")
@@ -0,0 +1,130 @@
+"""Provides timing trace functionality."""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+# Name of the timeline (lane) spans of the current task are shown on.
+_track = contextvars.ContextVar("track", default=None)
+
+
+class Tracer:
+    """Records timing spans in the Chrome trace-event format.
+
+    Saved file can be opened in Perfetto or chrome://tracing.
+    Spans are recorded only while a tracer is started,
+    finished spans are also passed to subscribed listeners (e.g. metrics).
+    """
+
+    _active: 'Tracer' = None
+    _listeners: list[Callable[[str, float, dict], None]] = []
+
+    def __init__(self):
+        self._events = []
+        self._tracks = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    @classmethod
+    def start(cls) -> 'Tracer':
+        """Starts recording."""
+        cls._active = cls()
+        return cls._active
+
+    @classmethod
+    def stop(cls) -> 'Tracer | None':
+        """Stops recording, returns the stopped tracer."""
+        tracer, cls._active = cls._active, None
+        return tracer
+
+    @classmethod
+    def subscribe(cls, listener: Callable[[str, float, dict], None]) -> None:
+        """Passes name, duration (seconds) and attributes of every finished span to the listener."""
+        cls._listeners.append(listener)
+
+    @classmethod
+    def unsubscribe(cls, listener: Callable[[str, float, dict], None]) -> None:
+        """Stops passing finished spans to the listener."""
+        if listener in cls._listeners:
+            cls._listeners.remove(listener)
+
+    @staticmethod
+    def track(name: str) -> None:
+        """Shows spans of the current task (and tasks it creates) on the named timeline."""
+        _track.set(name)
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, **attributes) -> Iterator[None]:
+        """Records duration of the block.
+
+        Parameters
+        ----------
+        name : str
+            Span name (parse, probe, install, command, etc.).
+        attributes : dict
+            Span attributes (distributor, packages, etc.).
+        """
+        tracer = cls._active
+        if tracer is None and not cls._listeners:
+            yield
+            return
+
+        started = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException as error:
+            attributes["error"] = repr(error)
+            raise
+        finally:
+            finished = time.perf_counter_ns()
+            if tracer is not None:
+                tracer._record(name, started, finished, attributes)
+            for listener in list(cls._listeners):
+                listener(name, (finished - started) / 1e9, attributes)
+
+    def _record(self, name: str, started: int, finished: int, attributes: dict) -> None:
+        """Appends complete ('X') event."""
+        track = _track.get() or threading.current_thread().name
+
+        with self._lock:
+            if track not in self._tracks:
+                self._tracks[track] = len(self._tracks) + 1
+                self._events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": self._tracks[track],
+                    "args": {"name": track}
+                })
+
+            self._events.append({
+                "name": name,
+                "cat": "state_sync",
+                "ph": "X",
+                "ts": (started - self._origin) / 1000,
+                "dur": (finished - started) / 1000,
+                "pid": self._pid,
+                "tid": self._tracks[track],
+                "args": {key: value for key, value in attributes.items() if value is not None}
+            })
+
+    def save(self, path: Path) -> None:
+        """Writes trace file.
+
+        Parameters
+        ----------
+        path : Path
+            Trace file path.
+        """
+        with self._lock:
+            events = list(self._events)
+
+        with open(path, "w", encoding="utf-8") as trace:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace)
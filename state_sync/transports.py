@@ -0,0 +1,74 @@
+"""Provides transports that run commands on remote hosts.
+
+Transport turns a shell command into the command that runs it on the host
+('wrap') and returns the arguments of a long-lived shell on the host ('shell',
+see ShellWorker). Every command of CommandRunner goes through the transport,
+so probes and changes run on the host while the config is parsed only once.
+"""
+
+import os
+import shlex
+from pathlib import Path
+
+from helpers import LazyModule
+
+subprocess = LazyModule("subprocess")
+
+
+class SshTransport:
+    """Runs commands over SSH, all of them share one master connection of the host.
+
+    The first command opens the master connection (ControlMaster),
+    the next ones are multiplexed over it as channels, so a host
+    is connected once per run. Channels of one connection are limited
+    by 'MaxSessions' of sshd (10 by default), keep the per-host
+    workers below it. Authentication must not be interactive
+    (keys or agent) and 'sudo' must not ask for a password.
+    """
+
+    def __init__(self, host: str, control_dir: Path = None, persist: int = 60):
+        self.host = host
+        self._control_dir = Path(control_dir) if control_dir else self.default_control_dir()
+        self._persist = persist
+
+    @staticmethod
+    def default_control_dir() -> Path:
+        """Returns directory of master connection sockets (XDG_RUNTIME_DIR aware)."""
+        base = os.environ.get("XDG_RUNTIME_DIR") or Path.home() / ".ssh"
+        return Path(base) / "state_sync"
+
+    def _ssh(self, *arguments: str) -> list[str]:
+        """Returns ssh arguments with the master connection options."""
+        return [
+            "ssh",
+            "-o", "BatchMode=yes",
+            "-o", "ControlMaster=auto",
+            # '%C' is a hash of the connection (host, port, user), it keeps socket paths short.
+            "-o", f"ControlPath={self._control_dir / "%C"}",
+            "-o", f"ControlPersist={self._persist}",
+            *arguments
+        ]
+
+    def wrap(self, command: str) -> str:
+        """Returns command that runs the command on the host."""
+        self._control_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        return shlex.join(self._ssh(self.host, "--", command))
+
+    def shell(self) -> list[str]:
+        """Returns arguments of a long-lived shell on the host."""
+        self._control_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        return self._ssh(self.host, "--", "/bin/sh")
+
+    def close(self) -> None:
+        """Stops the master connection, so only hosts in progress keep their connections."""
+        subprocess.run(
+            args=self._ssh("-O", "exit", self.host),
+            check=False,
+            capture_output=True
+        )
+
+
+# Transports by name (see '--transport').
+TRANSPORTS = {
+    "ssh": SshTransport
+}
@@ -0,0 +1,137 @@
+"""Provides file change watching functionality."""
+
+import os
+import select
+import time
+from pathlib import Path
+
+from helpers import LazyModule
+
+ctypes = LazyModule("ctypes")
+
+
+class Watcher:
+    """Watches files and directories for changes.
+
+    Changes are found by comparing inode, size and modification time
+    of the paths, inotify only wakes the watcher up as soon as something
+    happens next to them. Parent directories are watched, so files
+    replaced by rename (dpkg status, snapd state) and files created later
+    are noticed too. Without inotify (or for paths it can't watch)
+    the paths are polled.
+    """
+
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    # | IN_DELETE_SELF | IN_MOVE_SELF
+    MASK = 0x002 | 0x004 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200 | 0x400 | 0x800
+
+    def __init__(self, paths: list[Path], poll_interval: float = 1.0, inotify: bool = True):
+        self._poll_interval = poll_interval
+        self._libc = None
+        self._fd = self._inotify_init() if inotify else None
+        self._watched: set[Path] = set()
+        self._paths: dict[Path, tuple | None] = {}
+        self.update(paths)
+
+    @property
+    def inotify(self) -> bool:
+        """Whether inotify is used."""
+        return self._fd is not None
+
+    def update(self, paths: list[Path]) -> None:
+        """Sets watched paths, stamps of already watched paths are kept.
+
+        Parameters
+        ----------
+        paths : list[Path]
+            Files or directories (may not exist yet).
+        """
+        paths = [Path(path).expanduser() for path in paths]
+        self._paths = {path: self._paths.get(path, self._stamp(path)) for path in paths}
+
+        if self._fd is None:
+            return
+        for path in paths:
+            for directory in (path.parent, path):
+                if directory not in self._watched and directory.is_dir() and self._add_watch(directory):
+                    self._watched.add(directory)
+
+    def wait(self, timeout: float = None) -> set[Path]:
+        """Waits for changes of the watched paths.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds to wait, not limited by default.
+
+        Returns
+        -------
+        set[Path]
+            Changed paths, empty on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            # Paths without a watched directory are polled.
+            polled = self._fd is None or any(
+                path.parent not in self._watched and path not in self._watched for path in self._paths
+            )
+            pause = remaining
+            if polled:
+                pause = self._poll_interval if remaining is None else min(remaining, self._poll_interval)
+
+            if self._fd is None:
+                time.sleep(pause)
+            elif select.select([self._fd], [], [], pause)[0]:
+                self._drain()
+
+            changed = self._changed()
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        """Stops inotify."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _changed(self) -> set[Path]:
+        """Returns paths changed since the last check."""
+        changed = set()
+        for path, stamp in self._paths.items():
+            current = self._stamp(path)
+            if current != stamp:
+                self._paths[path] = current
+                changed.add(path)
+        return changed
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple | None:
+        """Returns inode, size and modification time of the path ('None' when it doesn't exist)."""
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+        return info.st_ino, info.st_size, info.st_mtime_ns
+
+    def _drain(self) -> None:
+        """Reads pending events, they only wake the watcher up."""
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _inotify_init(self) -> int | None:
+        """Returns inotify descriptor or 'None' when inotify is not available (e.g. not Linux)."""
+        try:
+            self._libc = ctypes.CDLL(None, use_errno=True)
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return fd if fd >= 0 else None
+
+    def _add_watch(self, directory: Path) -> bool:
+        """Watches directory, 'False' when it can't be watched (e.g. watches limit)."""
+        return self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK) >= 0